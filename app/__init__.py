@@ -14,7 +14,10 @@ from .home.routes import home_bp
 from .disease_prediction.routes import pred_bp
 from .cronjob.scheduler import start_sensor_scheduler
 from .utils.logger import setup_logger
-from .firebase_config import *
+from .cli import register_commands
+from .utils.responses import register_response_hooks
+from .metrics import register_metrics
+from .profiling import register_profiling
 
 
 def create_app():
@@ -42,6 +45,11 @@ def create_app():
     app.register_blueprint(predict_bp, url_prefix='/predict')
     app.register_blueprint(home_bp, url_prefix='/home')
     app.register_blueprint(pred_bp, url_prefix='/predict')
+    register_commands(app)
+    # Registered first so its after_request hook runs last and times the whole response.
+    register_metrics(app)
+    register_response_hooks(app)
+    register_profiling(app)
 
     @app.route('/')
     def index():
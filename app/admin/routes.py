@@ -1,10 +1,23 @@
-from flask import Blueprint, jsonify
-from firebase_admin import db, auth
+from flask import Blueprint, jsonify, request, send_file
+from app.datastore import db, auth
 from app.utils.decorators import role_required
+from app.utils.roles import invalidate_role
+from app.datastore.scoped import cached_get
+from app.utils.auth_helper import revoke_user_refresh_tokens
+from app.utils.cow_replica import evict as evict_cow_replica, replica_stats
+from app.utils.live import live_stats
+from app.profiling import list_profiles, profile_file
+from app.utils.aggregates import get_user_aggregates
+from app.utils.cow_index import index_path
+from app.utils.readings import timeseries_paths
+from app.utils.directory import DIRECTORY_FIELDS, get_platform_stats, list_users_by_role, record_user_deleted
 import logging
 
 admin_bp = Blueprint('admin', __name__)
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
 
 @admin_bp.route('/dashboard', methods=['GET'])
 @role_required('admin')
@@ -49,34 +62,24 @@ def dashboard():
             error:
               type: string
               example: Internal server error
+      503:
+        description: The platform index has not been built yet (run `flask platform rebuild`)
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+              example: Platform index not built
     """
     try:
         logging.info("Dashboard accessed by admin.")
 
-        user_ref = db.reference('users')
-        users = user_ref.get()
-    
-        total_cows = 0
-        total_farmers = 0
-        
-        if users and isinstance(users, dict):
-            for user_id, user_data in users.items():
-                if not isinstance(user_data, dict):
-                    continue
-
-                details = user_data.get('details', {})
-                if details and isinstance(details, dict) and details.get('role') == 'farmer':
-                    total_farmers += 1
-
-                cows = user_data.get('cows', {})
-                if isinstance(cows, dict):
-                    cow_count = len(cows)
-                    total_cows += cow_count
-                    logging.debug(f"Farmer {user_id} has {cow_count} cows.")
-                elif isinstance(cows, list):
-                    cow_count = len([cow for cow in cows if cow is not None])
-                    total_cows += cow_count
-                    logging.debug(f"Farmer {user_id} has {cow_count} cows (from list).")
+        stats = get_platform_stats()
+        if stats is None:
+            logging.error("Dashboard unavailable: platform index not built; run `flask platform rebuild`")
+            return jsonify({'error': 'Platform index not built'}), 503
+        total_cows = stats.get('total_cows', 0)
+        total_farmers = stats.get('total_farmers', 0)
 
         logging.info(f"Total Farmers: {total_farmers}, Total Cows: {total_cows}")
 
@@ -92,33 +95,85 @@ def dashboard():
 @admin_bp.route('/users', methods=['GET'])
 @role_required('admin')
 def get_all_user():
+    """
+    List Farmer Users
+    ---
+    tags:
+      - Admin
+    summary: Page through farmer accounts
+    description: >
+      Returns farmers ordered by user ID, one page at a time, from the roles/farmer index.
+      Pass the returned next_cursor as start_after to fetch the following page.
+    security:
+      - bearerAuth: []
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        default: 100
+        description: Page size (max 500).
+      - name: start_after
+        in: query
+        type: string
+        description: Cursor from the previous page (a user ID).
+      - name: fields
+        in: query
+        type: string
+        example: name,email
+        description: Comma-separated fields to return (user_id is always included).
+    responses:
+      200:
+        description: One page of farmers
+        schema:
+          type: object
+          properties:
+            users:
+              type: array
+              items:
+                type: object
+                properties:
+                  user_id:
+                    type: string
+                  email:
+                    type: string
+                  name:
+                    type: string
+                  role:
+                    type: string
+            next_cursor:
+              type: string
+              example: "L25krZy9Pza7vSIB7D0geMAaafa2"
+      400:
+        description: Invalid limit or fields
+      404:
+        description: No farmer users found
+      503:
+        description: The platform index has not been built yet (run `flask platform rebuild`)
+    """
     try:
-        logging.info("Admin requested all farmer users.")
-        users_ref = db.reference('users')
-        users = users_ref.get()
-
-        if not users:
-            logging.warning("No users found in the database.") 
-            return jsonify({'message': 'No users found'}), 404 
-
-        user_list = []
-        for user_id, data in users.items():
-            details = data.get('details', {})
-            role = details.get('role')
-
-            if role == 'farmer':
-                user_list.append({
-                    'user_id': user_id,
-                    'email': details.get('email'),
-                    'name': details.get('name'),
-                    'role': role,
-                })
-
-        if not user_list:
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+
+        fields = None
+        if request.args.get('fields'):
+            fields = [field.strip() for field in request.args['fields'].split(',') if field.strip()]
+            unknown = set(fields) - set(DIRECTORY_FIELDS)
+            if unknown:
+                return jsonify({'error': f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+
+        start_after = request.args.get('start_after')
+        logging.info(f"Admin requested farmer users: limit={limit}, start_after={start_after}")
+        user_list, next_cursor = list_users_by_role('farmer', limit, start_after, fields)
+
+        if not user_list and not start_after:
+            if get_platform_stats() is None:
+                logging.error("User list unavailable: platform index not built; run `flask platform rebuild`")
+                return jsonify({'error': 'Platform index not built'}), 503
             logging.warning("No farmer users found.")
-            return jsonify({'message': 'No farmer users found'}), 404 
+            return jsonify({'message': 'No farmer users found'}), 404
 
-        return jsonify({'users': user_list}), 200
+        return jsonify({'users': user_list, 'next_cursor': next_cursor}), 200
 
     except Exception as e:
         logging.error(f"Error fetching users: {str(e)}", exc_info=True)
@@ -183,12 +238,22 @@ def delete_user(user_id):
     try:
         logging.info(f"Admin attempting to delete user: {user_id}")
 
-        user_ref = db.reference(f'users/{user_id}')
-        if not user_ref.get():
+        # Every registered user has details; only a user without them needs the extra existence check.
+        details = cached_get(f'users/{user_id}/details')
+        if not details and not db.reference(f'users/{user_id}').get(shallow=True):
             logging.warning(f"User {user_id} not found for deletion.")
             return jsonify({'error': 'User not found'}), 404
-        
-        user_ref.delete()
+
+        cow_count = get_user_aggregates(user_id)['cow_count']
+        db.reference().update({
+            f'users/{user_id}': None,
+            index_path(user_id): None,
+            **{path: None for path in timeseries_paths(user_id)},
+        })
+        record_user_deleted(user_id, details, cow_count)
+        invalidate_role(user_id)
+        evict_cow_replica(user_id)
+        revoke_user_refresh_tokens(user_id)
         logging.info(f"User {user_id} deleted successfully.")
 
         try:
@@ -202,3 +267,170 @@ def delete_user(user_id):
         logging.error(f"Error deleting user {user_id}: {str(e)}", exc_info=True)
         return jsonify({'error': 'Internal server error'}), 500    
 
+
+
+@admin_bp.route('/live', methods=['GET'])
+@role_required('admin')
+def live_status():
+    """
+    Live Stream Status
+    ---
+    tags:
+      - Admin
+    summary: Subscribers and throughput of this worker's /cows/<cow_id>/live streams
+    description: >
+      Counters are per process. dropped_subscribers counts clients disconnected because
+      their queue filled up.
+    security:
+      - bearerAuth: []
+    responses:
+      200:
+        description: Live stream statistics
+        content:
+          application/json:
+            example:
+              source: ingest
+              cows: 12
+              subscribers: 30
+              max_subscribers: 1000
+              published: 5400
+              delivered: 13500
+              dropped_subscribers: 2
+    """
+    return jsonify(live_stats()), 200
+
+
+@admin_bp.route('/profiles', methods=['GET'])
+@role_required('admin')
+def get_profiles():
+    """
+    List Request Profiles
+    ---
+    tags:
+      - Admin
+    summary: Request profiles captured by this worker, newest first
+    description: >
+      Requires PROFILING_ENABLED=true. A request is profiled when an admin sends the
+      X-Profile header, when its user is in PROFILE_USER_IDS, or at PROFILE_SAMPLE_RATE.
+      Its response then carries X-Profile-Id.
+    security:
+      - bearerAuth: []
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        default: 100
+    responses:
+      200:
+        description: Profile summaries
+        content:
+          application/json:
+            example:
+              profiles:
+                - id: 20250814T100000-1a2b3c4d
+                  route: /cows/<cow_id>/profile
+                  user_id: abc123
+                  status: 200
+                  duration_ms: 412.5
+                  database_calls: 3
+                  database_ms: 398.1
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', 100)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    return jsonify({'profiles': list_profiles(limit)}), 200
+
+
+@admin_bp.route('/profiles/<profile_id>', methods=['GET'])
+@role_required('admin')
+def get_profile(profile_id):
+    """
+    Get Request Profile
+    ---
+    tags:
+      - Admin
+    summary: One profile's summary, database calls and top functions by cumulative time
+    security:
+      - bearerAuth: []
+    parameters:
+      - name: profile_id
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: Profile summary
+      404:
+        description: Profile not found
+    """
+    path = profile_file(profile_id, '.json')
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(path, mimetype='application/json')
+
+
+@admin_bp.route('/profiles/<profile_id>/download', methods=['GET'])
+@role_required('admin')
+def download_profile(profile_id):
+    """
+    Download Request Profile
+    ---
+    tags:
+      - Admin
+    summary: The raw pstats dump, for pstats, snakeviz or similar tools
+    security:
+      - bearerAuth: []
+    parameters:
+      - name: profile_id
+        in: path
+        type: string
+        required: true
+    produces:
+      - application/octet-stream
+    responses:
+      200:
+        description: pstats file
+      404:
+        description: Profile not found
+    """
+    path = profile_file(profile_id, '.prof')
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True, download_name=f'{profile_id}.prof')
+
+
+@admin_bp.route('/cow-replica', methods=['GET'])
+@role_required('admin')
+def cow_replica_status():
+    """
+    Cow Replica Status
+    ---
+    tags:
+      - Admin
+    summary: Health of this worker's in-memory cow metadata replica
+    description: >
+      Reports how many farmers are replicated, hit/miss/fallback counts, and replication
+      lag (time from a local write until its change event arrived). Counters are per
+      process. Enable the replica with COW_REPLICA_ENABLED=true.
+    security:
+      - bearerAuth: []
+    responses:
+      200:
+        description: Replica statistics
+        content:
+          application/json:
+            example:
+              enabled: true
+              users: 42
+              max_users: 200
+              hits: 1830
+              misses: 42
+              fallbacks: 3
+              evictions: 0
+              lag_p50_ms: 85.2
+              lag_max_ms: 412.7
+              pending_writes: 0
+              oldest_event_age_seconds: 311.4
+    """
+    return jsonify(replica_stats()), 200
@@ -1,7 +1,12 @@
 from flask import Blueprint, request, jsonify 
-from firebase_admin import auth as firebase_auth, db
-from app.utils.auth_helper import generate_token, verify_token
+from app.datastore import auth as firebase_auth, db
+from app.utils.auth_helper import (
+    ACCESS_TOKEN_MINUTES, consume_refresh_token, generate_token, issue_refresh_token, revoke_token, verify_token,
+)
+from app.utils.roles import get_role
+from app.utils.directory import record_user_registered
 from werkzeug.security import generate_password_hash ,check_password_hash
+import jwt
 import logging
 import requests
 import os 
@@ -97,13 +102,15 @@ def register():
         role = data.get('role', 'user')
 
         user = firebase_auth.create_user(email=email, password=password)
-        db.reference(f'users/{user.uid}/details').set({
+        details = {
             'email': email,
             'name': name,
             'role': role,
             "password": generate_password_hash(password),
             'user_id': user.uid
-        })
+        }
+        db.reference(f'users/{user.uid}/details').set(details)
+        record_user_registered(user.uid, details)
 
         logging.info(f"New user registered: {email} with role: {role}")
         return jsonify({
@@ -155,6 +162,12 @@ def login():
             token:
               type: string
               example: eyJhbGciOiJIUzI1NiIs...
+            refresh_token:
+              type: string
+              example: 3q2-7wE0sKm...
+            expires_in:
+              type: integer
+              example: 900
             user_id:
               type: string
               example: U123456
@@ -203,11 +216,14 @@ def login():
             logging.warning(f"Login failed: Invalid password for {email}")
             return jsonify({'error': 'Invalid password'}), 401
 
-        token = generate_token(user.uid)
+        token = generate_token(user.uid, u.get('role'))
+        refresh_token = issue_refresh_token(user.uid)
         logging.info(f"Login successful for user: {email}")
         return jsonify({
             'message': 'Login successful',
             'token': token,
+            'refresh_token': refresh_token,
+            'expires_in': ACCESS_TOKEN_MINUTES * 60,
             'user_id': user.uid,
             'role': u.get('role'),   
         }), 200
@@ -290,12 +306,130 @@ def forgot_password():
          
 
 
-@auth_bp.route('/logout', methods=['POST'])
-def logout():
-    return jsonify({'message': 'Successfully logged out. Please delete the token on client side.'}), 200
-
-
+@auth_bp.route('/refresh', methods=['POST'])
+def refresh():
+    """
+    Refresh Access Token
+    ---
+    tags:
+      - Auth
+    description: >
+      Exchanges a refresh token for a new short-lived access token and a new refresh token.
+      Each refresh token works once; the one sent is invalidated.
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required:
+            - refresh_token
+          properties:
+            refresh_token:
+              type: string
+              example: 3q2-7wE0sKm...
+    responses:
+      200:
+        description: New token pair
+        schema:
+          type: object
+          properties:
+            token:
+              type: string
+              example: eyJhbGciOiJIUzI1NiIs...
+            refresh_token:
+              type: string
+              example: Vb9xQ1pL0aZ...
+            expires_in:
+              type: integer
+              example: 900
+      400:
+        description: Missing refresh token
+      401:
+        description: Refresh token is invalid, expired, already used, or the user no longer exists
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+              example: Invalid refresh token
+      503:
+        description: The token store could not be reached; the refresh token may still be valid
+    """
+    data = request.get_json(silent=True) or {}
+    if not data.get('refresh_token'):
+        return jsonify({'error': 'Missing refresh token'}), 400
 
+    try:
+        uid = consume_refresh_token(data['refresh_token'])
+        role = get_role(uid)
+        if role is None:
+            logging.warning(f"Refresh failed: user {uid} no longer exists")
+            return jsonify({'error': 'Invalid refresh token'}), 401
+        refresh_token = issue_refresh_token(uid)
+    except jwt.InvalidTokenError:
+        return jsonify({'error': 'Invalid refresh token'}), 401
+    except Exception:
+        logging.exception("Refresh failed: token store error")
+        return jsonify({'error': 'Token service unavailable, try again'}), 503
 
+    logging.info(f"Access token refreshed for user_id: {uid}")
+    return jsonify({
+        'token': generate_token(uid, role),
+        'refresh_token': refresh_token,
+        'expires_in': ACCESS_TOKEN_MINUTES * 60,
+    }), 200
 
 
+@auth_bp.route('/logout', methods=['POST'])
+def logout():
+    """
+    Logout
+    ---
+    tags:
+      - Auth
+    description: >
+      Revokes the bearer token so it is rejected by every endpoint until it expires, and
+      invalidates the refresh token if one is sent.
+    security:
+      - bearerAuth: []
+    parameters:
+      - name: body
+        in: body
+        required: false
+        schema:
+          type: object
+          properties:
+            refresh_token:
+              type: string
+              example: 3q2-7wE0sKm...
+    responses:
+      200:
+        description: Logged out
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+              example: Successfully logged out
+      503:
+        description: The token store could not be reached; the tokens may still be valid
+    """
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+    # Already expired, revoked or malformed tokens leave nothing to invalidate.
+    try:
+        if token:
+            try:
+                revoke_token(token)
+            except jwt.InvalidTokenError:
+                pass
+        if refresh_token:
+            try:
+                consume_refresh_token(refresh_token)
+            except jwt.InvalidTokenError:
+                pass
+    except Exception:
+        logging.exception("Logout failed: token store error")
+        return jsonify({'error': 'Token service unavailable, try again'}), 503
+    return jsonify({'message': 'Successfully logged out'}), 200
@@ -0,0 +1,69 @@
+import click
+from flask.cli import AppGroup
+from app.datastore import db
+from app.utils.aggregates import rebuild_user_aggregates
+from app.utils.directory import rebuild_platform_index
+from app.utils.cow_index import rebuild_cow_index
+from app.utils.sensor_data import migrate_legacy_readings
+from app.utils.auth_helper import prune_expired_tokens
+
+aggregates_cli = AppGroup('aggregates', help='Maintain materialized per-farmer aggregates.')
+platform_cli = AppGroup('platform', help='Maintain platform counters and the user directory.')
+cows_cli = AppGroup('cows', help='Maintain per-farmer cow search indexes.')
+readings_cli = AppGroup('readings', help='Maintain stored sensor readings.')
+tokens_cli = AppGroup('tokens', help='Maintain refresh tokens and token revocations.')
+
+
+def _all_user_ids():
+    return sorted((db.reference('users').get(shallow=True) or {}).keys())
+
+
+@aggregates_cli.command('rebuild')
+@click.option('--user', 'user_ids', multiple=True, help='Only rebuild these user IDs (default: all users).')
+def rebuild_aggregates(user_ids):
+    """Recount cows, milk and health statuses from the cows subtree."""
+    for user_id in user_ids or _all_user_ids():
+        aggregates = rebuild_user_aggregates(user_id)
+        click.echo(f"{user_id}: {aggregates['cow_count']} cows, {aggregates['total_milk']} L")
+
+
+@platform_cli.command('rebuild')
+def rebuild_platform():
+    """Recount users, farmers and cows and rewrite the role-indexed user directory."""
+    stats = rebuild_platform_index()
+    click.echo(f"{stats['total_users']} users, {stats['total_farmers']} farmers, {stats['total_cows']} cows")
+
+
+@cows_cli.command('reindex')
+@click.option('--user', 'user_ids', multiple=True, help='Only reindex these user IDs (default: all users).')
+def reindex_cows(user_ids):
+    """Rebuild the secondary indexes used by /cows/search."""
+    for user_id in user_ids or _all_user_ids():
+        rebuild_cow_index(user_id)
+        click.echo(f"{user_id}: reindexed")
+
+
+@readings_cli.command('migrate')
+@click.option('--user', 'user_ids', multiple=True, help='Only migrate these user IDs (default: all users).')
+@click.option('--batch-size', default=500, show_default=True, help='Readings moved per multi-path update.')
+def migrate_readings(user_ids, batch_size):
+    """Move readings from users/{uid}/cows/{cow_id}/readings to readings/{uid}/{cow_id}."""
+    for user_id in user_ids or _all_user_ids():
+        cow_ids = sorted((db.reference(f'users/{user_id}/cows').get(shallow=True) or {}).keys())
+        moved = sum(migrate_legacy_readings(user_id, cow_id, batch_size) for cow_id in cow_ids)
+        click.echo(f"{user_id}: moved {moved} readings from {len(cow_ids)} cows")
+
+
+@tokens_cli.command('prune')
+def prune_tokens():
+    """Delete expired refresh tokens and revocation entries."""
+    refresh_tokens, revocations = prune_expired_tokens()
+    click.echo(f"Removed {refresh_tokens} refresh tokens and {revocations} revocations")
+
+
+def register_commands(app):
+    app.cli.add_command(aggregates_cli)
+    app.cli.add_command(platform_cli)
+    app.cli.add_command(cows_cli)
+    app.cli.add_command(readings_cli)
+    app.cli.add_command(tokens_cli)
@@ -0,0 +1,129 @@
+import re
+import logging
+from datetime import datetime
+from app.datastore import db
+from app.utils.aggregates import apply_cow_changes
+from app.utils.anomaly import forget_cow
+from app.utils.cow_index import index_updates
+from app.utils.cow_replica import note_write
+from app.utils.directory import record_cow_count_change
+from app.utils.readings import timeseries_paths
+
+REQUIRED_FIELDS = ('cow_id', 'name', 'breed', 'age', 'health_status', 'milk_production')
+UPDATABLE_FIELDS = ('name', 'breed', 'age', 'health_status', 'milk_production')
+COW_ID_RE = re.compile(r'^[a-zA-Z0-9_-]+$')
+OPERATIONS = ('create', 'update', 'delete')
+MAX_BULK_OPERATIONS = 500
+
+
+def validate_operation(item):
+    """Normalize one bulk item into (op, cow_id, fields) or raise ValueError with a client-facing message."""
+    if not isinstance(item, dict):
+        raise ValueError('Operation must be an object')
+    op = item.get('op')
+    if op not in OPERATIONS:
+        raise ValueError(f"op must be one of: {', '.join(OPERATIONS)}")
+    if 'cow_id' not in item:
+        raise ValueError('Missing cow_id')
+
+    cow_id = str(item['cow_id']).strip().lower()
+    if not COW_ID_RE.match(cow_id):
+        raise ValueError('Invalid Cow ID format')
+
+    if op == 'create':
+        missing = [field for field in REQUIRED_FIELDS if field not in item]
+        if missing:
+            raise ValueError(f"Missing Cow Data: {', '.join(missing)}")
+        fields = {field: item[field] for field in UPDATABLE_FIELDS}
+    elif op == 'update':
+        fields = {field: item[field] for field in UPDATABLE_FIELDS if field in item}
+        if not fields:
+            raise ValueError('No valid fields to update')
+    else:
+        fields = {}
+    return op, cow_id, fields
+
+
+def plan_operations(user_id, items, existing):
+    """Turn validated items into one multi-path update.
+
+    existing maps cow_id -> current cow for every cow that exists. Returns (updates, changes, results) where changes are (old_cow, new_cow)
+    pairs for the aggregates and results has one entry per item.
+    """
+    updates, changes, results = {}, [], []
+    now = datetime.utcnow().isoformat() + 'Z'
+    seen = set()
+
+    for position, item in enumerate(items):
+        result = {'index': position, 'op': item.get('op') if isinstance(item, dict) else None}
+        try:
+            op, cow_id, fields = validate_operation(item)
+            result['cow_id'] = cow_id
+            if cow_id in seen:
+                raise ValueError('Cow ID appears more than once in this request')
+            seen.add(cow_id)
+
+            cow_path = f'users/{user_id}/cows/{cow_id}'
+            current = existing.get(cow_id)
+            if op == 'create':
+                if current:
+                    raise ValueError('Cow ID already exists')
+                cow = {'cow_id': cow_id, **fields, 'created_at': now}
+                updates[cow_path] = cow
+                updates.update(index_updates(user_id, cow_id, None, cow))
+                changes.append((None, cow))
+                result['status'] = 'created'
+            elif not current:
+                raise LookupError('Cow not found')
+            elif op == 'update':
+                fields['updated_at'] = now
+                cow = {**current, **fields}
+                updates.update({f'{cow_path}/{field}': value for field, value in fields.items()})
+                updates.update(index_updates(user_id, cow_id, current, cow))
+                changes.append((current, cow))
+                result['status'] = 'updated'
+            else:
+                updates[cow_path] = None
+                updates.update(index_updates(user_id, cow_id, current, None))
+                updates.update({path: None for path in timeseries_paths(user_id, cow_id)})
+                changes.append((current, None))
+                result['status'] = 'deleted'
+        except LookupError as e:
+            result.update({'status': 'not_found', 'error': str(e)})
+        except ValueError as e:
+            result.update({'status': 'invalid', 'error': str(e)})
+        results.append(result)
+
+    return updates, changes, results
+
+
+def _written_cows(user_id, updates):
+    """Map each cow_id in a planned update to the metadata fields it writes, or None when it is deleted."""
+    prefix = f'users/{user_id}/cows/'
+    written = {}
+    for path, value in updates.items():
+        if not path.startswith(prefix):
+            continue
+        cow_id, _, field = path[len(prefix):].partition('/')
+        if not field:
+            written[cow_id] = value
+        elif field.split('/')[0] != 'readings':
+            written.setdefault(cow_id, {})[field] = value
+    return written
+
+
+def commit_plan(user_id, updates, changes, results):
+    """Write a planned batch with one multi-location update, then fold it into the derived counters."""
+    if not updates:
+        return
+    note_write(user_id, _written_cows(user_id, updates))
+    db.reference().update(updates)
+
+    apply_cow_changes(user_id, changes)
+    created = sum(1 for old, new in changes if old is None)
+    deleted = sum(1 for old, new in changes if new is None)
+    record_cow_count_change(created - deleted)
+    for result in results:
+        if result.get('status') == 'deleted':
+            forget_cow(user_id, result['cow_id'])
+    logging.info(f"Bulk write for user {user_id}: {len(changes)} cows, {len(updates)} paths")
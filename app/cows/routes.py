@@ -1,12 +1,49 @@
-from flask import Blueprint, request, jsonify,g
-from firebase_admin import auth as firebase_auth, db
+from flask import Blueprint, Response, request, jsonify, g, stream_with_context
+from app.datastore import auth as firebase_auth, db
 from app.utils.auth_helper import generate_token, verify_token
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import re
 from app.utils.decorators import auth_required,role_required
+from app.utils.rollups import RESOLUTIONS, get_rollups
+from app.utils.readings import parse_timestamp, timeseries_paths, vector_magnitude
+from app.utils.block_storage import latest_reading, load_readings
+from app.utils.activity import MIN_BOUT_SECONDS, activity_level, activity_timeline
+from app.utils.anomaly import alerts_path, forget_cow
+from app.utils.aggregates import apply_cow_change, cows_version
+from app.utils.responses import always_etag, conditional_on
+from app.utils.live import reading_event, stream, subscribe
+from app.utils.directory import record_cow_count_change
+from app.datastore.scoped import create_if_absent, delete_if_present, update_if_present
+from app.datastore.local import key_order
+from app.utils.cow_replica import cancel_write, get_cows as get_replicated_cows, note_write
+from app.utils.cow_index import SearchError, index_updates, parse_predicate, search_cows as run_cow_search
+from app.cows.bulk import MAX_BULK_OPERATIONS, commit_plan, plan_operations
+from app.cows.transfer import FORMATS, export_cows, export_readings, import_cows, parse_csv, parse_ndjson
 import logging
 cow_bp = Blueprint('cow_bp', __name__,)
 
+COW_FIELDS = ('cow_id', 'name', 'breed', 'age', 'health_status', 'milk_production', 'created_at', 'updated_at')
+MAX_PAGE_SIZE = 500
+
+
+def cow_metadata(cow_id, cow, fields=None):
+    # Cows written before readings moved to readings/{uid}/{cow_id} may still carry them.
+    cow = {key: value for key, value in cow.items() if key != 'readings'}
+    cow.setdefault('cow_id', cow_id)
+    if fields:
+        cow = {field: cow.get(field) for field in fields}
+    return cow
+
+
+def transfer_format(filename=None):
+    """Pick csv/ndjson from ?format=, then the upload's file extension, then the content type."""
+    fmt = request.args.get('format')
+    if not fmt and filename and '.' in filename:
+        fmt = filename.rsplit('.', 1)[1].lower()
+    if not fmt:
+        fmt = 'ndjson' if 'json' in (request.mimetype or '') else 'csv'
+    return {'jsonl': 'ndjson', 'json': 'ndjson'}.get(fmt, fmt)
+
 @cow_bp.route('/addcow', methods=['POST'])
 @auth_required
 @role_required('farmer')
@@ -87,14 +124,8 @@ def add_cow():
         logging.warning(f"Add cow failed: Invalid cow ID format '{cow_id}'")
         return jsonify({'Error': 'Invalid Cow ID format'}), 400
     
-    existing = db.reference(f'users/{user_id}/cows/{cow_id}').get()
-    if existing:
-        logging.warning(f"Add cow failed: Cow ID '{cow_id}' already exists for user {user_id}")
-        return jsonify({'Error': 'Cow ID already exists'}), 400
-    
     created_at = datetime.utcnow().isoformat() + 'Z'
-    cow_ref = db.reference(f'users/{user_id}/cows/{cow_id}')
-    cow_ref.set({
+    cow = {
         "cow_id": cow_id,
         "name": data['name'],
         "breed": data['breed'],
@@ -102,22 +133,49 @@ def add_cow():
         "health_status": data['health_status'],
         "milk_production": data['milk_production'],
         "created_at": created_at,
-    })
+    }
+    write_id = note_write(user_id, {cow_id: cow})
+    # The existence check and the write are one transaction, so concurrent adds cannot both succeed.
+    if not create_if_absent(f'users/{user_id}/cows/{cow_id}', cow):
+        cancel_write(user_id, write_id)
+        logging.warning(f"Add cow failed: Cow ID '{cow_id}' already exists for user {user_id}")
+        return jsonify({'Error': 'Cow ID already exists'}), 400
+    db.reference().update(index_updates(user_id, cow_id, None, cow))
+    apply_cow_change(user_id, None, cow)
+    record_cow_count_change(1)
     logging.info(f"Cow '{cow_id}' added successfully for user {user_id}")
     return jsonify({'message': 'Cow added successfully'}), 200
 
 @cow_bp.route('/getall', methods=['GET'])
 @auth_required
 @role_required('farmer')
+@conditional_on(lambda: cows_version(g.user['uid']))
 def get_all_cows():
     """
     Get all cows for the authenticated farmer
     ---
     tags:
       - Cows
+    description: >
+      Returns cow metadata only; sensor readings are never included. Without a limit every
+      cow is returned. With limit, cows are returned in cow_id order one page at a time and
+      next_cursor is set when more remain.
     security:
       - bearerAuth: []
-    parameters: []
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        description: Page size (max 500).
+      - name: cursor
+        in: query
+        type: string
+        description: next_cursor from the previous page.
+      - name: fields
+        in: query
+        type: string
+        example: name,breed,health_status
+        description: Comma-separated cow fields to return.
     responses:
       200:
         description: Successfully fetched all cows or no cows found
@@ -171,15 +229,48 @@ def get_all_cows():
               example: Access denied
     """
     user_id = g.user['uid']
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({'Error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+
+    fields = None
+    if request.args.get('fields'):
+        fields = [field.strip() for field in request.args['fields'].split(',') if field.strip()]
+        unknown = set(fields) - set(COW_FIELDS)
+        if unknown:
+            return jsonify({'Error': f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+
     cow_ref = db.reference(f'users/{user_id}/cows')
-    cow_data = cow_ref.get()
+    replica = get_replicated_cows(user_id)
+    if replica is not None:
+        cow_data = {cow_id: cow for cow_id, cow in replica.items() if not cursor or key_order(cow_id) >= key_order(cursor)}
+    elif limit is None and not cursor:
+        cow_data = cow_ref.get()
+    else:
+        query = cow_ref.order_by_key()
+        if cursor:
+            query = query.start_at(cursor)
+        if limit is not None:
+            # start_at is inclusive: one extra row for the cursor, one to detect a next page.
+            query = query.limit_to_first(limit + (2 if cursor else 1))
+        cow_data = query.get()
 
-    if not cow_data:
-        logging.info(f"No cows found for user {user_id}")
+    cow_data = {cow_id: cow for cow_id, cow in (cow_data or {}).items() if cow_id != cursor and isinstance(cow, dict)}
+    if not cow_data and not cursor:
+        logging.info("No cows found for user %s", user_id)
         return jsonify({'Error': 'No cows found'}), 200
-    
-    logging.info(f"All cows fetched for user {user_id}")
-    return jsonify({'data': cow_data}), 200
+
+    # The database's key order, which start_at(cursor) also follows: numeric IDs come first.
+    cow_ids = sorted(cow_data, key=key_order)
+    page = cow_ids[:limit] if limit is not None else cow_ids
+    next_cursor = page[-1] if limit is not None and len(cow_ids) > limit else None
+
+    logging.info("Fetched %d cows for user %s", len(page), user_id)
+    return jsonify({
+        'data': {cow_id: cow_metadata(cow_id, cow_data[cow_id], fields) for cow_id in page},
+        'next_cursor': next_cursor,
+    }), 200
 
 @cow_bp.route('/update/<cow_id>', methods=['PATCH'])
 @auth_required
@@ -189,18 +280,22 @@ def update_cow(cow_id):
     data = request.get_json()
     allowed_fields = ['name', 'breed', 'age', 'health_status', 'milk_production']
 
-    cow_ref = db.reference(f'users/{user_id}/cows/{cow_id}')
-    current_cow_data = cow_ref.get()
-
-    if not current_cow_data:
-        logging.warning(f"Update failed: Cow '{cow_id}' not found for user {user_id}")
-        return jsonify({'Error': 'Cow not found'}), 404
-
     update = {field: data[field] for field in allowed_fields if field in data}
 
     if update:
         update['updated_at'] = datetime.utcnow().isoformat() + 'Z'
-        cow_ref.update(update)
+        write_id = note_write(user_id, {cow_id: update})
+        current_cow_data = update_if_present(f'users/{user_id}/cows/{cow_id}', update)
+        if not current_cow_data:
+            cancel_write(user_id, write_id)
+            logging.warning(f"Update failed: Cow '{cow_id}' not found for user {user_id}")
+            return jsonify({'Error': 'Cow not found'}), 404
+
+        updated_cow = {**current_cow_data, **update}
+        index_changes = index_updates(user_id, cow_id, current_cow_data, updated_cow)
+        if index_changes:
+            db.reference().update(index_changes)
+        apply_cow_change(user_id, current_cow_data, updated_cow)
         logging.info(f"Cow '{cow_id}' updated for user {user_id} with: {update}")
         return jsonify({'message': 'Cow updated successfully'}), 200
     else:
@@ -260,14 +355,21 @@ def delete_cow(cow_id):
               example: Access denied
      """
     user_id = g.user['uid']
-    cow_ref = db.reference(f'users/{user_id}/cows/{cow_id}')
-    current_cow_data = cow_ref.get()
+    write_id = note_write(user_id, {cow_id: None})
+    current_cow_data = delete_if_present(f'users/{user_id}/cows/{cow_id}')
 
     if not current_cow_data:
+        cancel_write(user_id, write_id)
         logging.warning(f"Delete cow failed: Cow '{cow_id}' not found for user {user_id}")
         return jsonify({'Error': 'Cow not found'}), 404
 
-    cow_ref.delete()
+    db.reference().update({
+        **index_updates(user_id, cow_id, current_cow_data, None),
+        **{path: None for path in timeseries_paths(user_id, cow_id)},
+    })
+    forget_cow(user_id, cow_id)
+    apply_cow_change(user_id, current_cow_data, None)
+    record_cow_count_change(-1)
     logging.info(f"Cow '{cow_id}' deleted for user {user_id}")
     return jsonify({'message': f'Cow {cow_id} deleted successfully'}), 200
 
@@ -275,32 +377,100 @@ def delete_cow(cow_id):
 @auth_required
 @role_required('farmer')
 def search_cows():
+    """
+    Search the farmer's cows
+    ---
+    tags:
+      - Cows
+    summary: Multi-field cow search backed by per-user secondary indexes
+    description: >
+      Each filter has the form field + operator + value, with operators =, <, <=, >, >=
+      (numeric fields) and ^= (prefix match on text fields). Filters are combined with AND.
+      Text comparisons are case-insensitive. The legacy field/value pair is still
+      accepted as an equality filter. Searchable fields are name, breed,
+      health_status, age and milk_production.
+    security:
+      - bearerAuth: []
+    parameters:
+      - name: filter
+        in: query
+        type: array
+        items:
+          type: string
+        collectionFormat: multi
+        example: ["breed=Holstein", "milk_production<10", "name^=bes"]
+      - name: field
+        in: query
+        type: string
+      - name: value
+        in: query
+        type: string
+      - name: sort
+        in: query
+        type: string
+        example: -milk_production
+        description: Field to sort by, prefixed with - for descending order.
+      - name: offset
+        in: query
+        type: integer
+        default: 0
+      - name: limit
+        in: query
+        type: integer
+        default: 50
+    responses:
+      200:
+        description: Matching cows
+        schema:
+          type: object
+          properties:
+            results:
+              type: array
+              items:
+                type: object
+            total:
+              type: integer
+              example: 3
+            next_offset:
+              type: integer
+              example: 50
+      400:
+        description: Missing or invalid filter
+    """
     user_id = g.user['uid']
+    filters = request.args.getlist('filter')
     field = request.args.get('field')
     value = request.args.get('value')
+    if field or value:
+        if not field or not value:
+            logging.warning(f"Search cows failed: Missing field/value. Field: {field}, Value: {value}")
+            return jsonify({'Error': 'Missing search field or value'}), 400
+        filters.append(f"{field}={value}")
 
-    if not field or not value:
-        logging.warning(f"Search cows failed: Missing field/value. Field: {field}, Value: {value}")
+    if not filters:
+        logging.warning(f"Search cows failed: No filters given by user {user_id}")
         return jsonify({'Error': 'Missing search field or value'}), 400
 
-    cows_ref = db.reference(f'users/{user_id}/cows')
-    cows = cows_ref.get()
-
-    if not cows:
-        logging.info(f"Search cows: No cows found for user {user_id}")
-        return jsonify({'message': 'No cows found'}), 404
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
 
-    matching_cows = []
-    for cow_id, cow_data in cows.items():
-        if field in cow_data and str(cow_data[field]).lower() == value.lower():
-            matching_cows.append({**cow_data, 'cow_id': cow_id})
+    try:
+        predicates = [parse_predicate(text) for text in filters]
+        matching_cows, total = run_cow_search(
+            user_id, predicates, sort=request.args.get('sort'), offset=offset, limit=limit,
+        )
+    except SearchError as e:
+        logging.warning(f"Search cows failed for user {user_id}: {e}")
+        return jsonify({'Error': str(e)}), 400
 
-    logging.info(f"Search cows: Found {len(matching_cows)} matches for user {user_id}, field='{field}', value='{value}'")
-    return jsonify({'results': matching_cows}), 200
+    next_offset = offset + limit if offset + limit < total else None
+    logging.info("Search cows: Found %s matches for user %s, filters=%s", total, user_id, filters)
+    return jsonify({'results': matching_cows, 'total': total, 'next_offset': next_offset}), 200
 
 @cow_bp.route('/<cow_id>/profile', methods=['GET'])
 @auth_required
 @role_required('farmer')
+@always_etag
 def cow_profile(cow_id):
     """
     Get Cow Profile
@@ -349,16 +519,12 @@ def cow_profile(cow_id):
     """
     user_id = g.user['uid']
 
-    readings_ref = db.reference(f'users/{user_id}/cows/{cow_id}/readings')
-    readings_data = readings_ref.get()
+    # Only the newest reading is fetched, not the whole history.
+    latest_data = latest_reading(user_id, cow_id)
 
-    if not readings_data:
+    if not latest_data:
         return jsonify({'Error': 'No readings found for this cow'}), 404
 
-    # Get the latest reading entry (assuming readings are timestamp-keyed)
-    latest_timestamp = max(readings_data.keys())
-    latest_data = readings_data[latest_timestamp]
-
     if not isinstance(latest_data, dict):
         return jsonify({'Error': 'Invalid reading format. Expected dict, got string'}), 400
 
@@ -369,24 +535,502 @@ def cow_profile(cow_id):
     if temperature is None or accel is None or gyro is None:
         return jsonify({'Error': 'Incomplete reading data'}), 400
 
-    accel_magnitude = (accel['x']**2 + accel['y']**2 + accel['z']**2) ** 0.5
-    gyro_magnitude = (gyro['x']**2 + gyro['y']**2 + gyro['z']**2) ** 0.5
-
-    ACCEL_THRESHOLD = 1.5
-    GYRO_THRESHOLD = 0.8
-
-    if accel_magnitude > ACCEL_THRESHOLD or gyro_magnitude > GYRO_THRESHOLD:
-        activity_level = "High"
-    elif accel_magnitude > (ACCEL_THRESHOLD * 0.5) or gyro_magnitude > (GYRO_THRESHOLD * 0.5):
-        activity_level = "Medium"
-    else:
-        activity_level = "Low"
-
     profile = {
         'cow_id': cow_id,
         'temperature': temperature,
-        'activity_level': activity_level
+        'activity_level': activity_level(vector_magnitude(accel), vector_magnitude(gyro))
     }
 
-    logging.info(f"Cow profile fetched for '{cow_id}' by user {user_id}")
+    logging.info("Cow profile fetched for '%s' by user %s", cow_id, user_id)
     return jsonify(profile), 200
+
+@cow_bp.route('/<cow_id>/live', methods=['GET'])
+@auth_required
+@role_required('farmer')
+def cow_live(cow_id):
+    """
+    Live readings and alerts for a cow
+    ---
+    tags:
+      - Cows
+    summary: Server-Sent Events stream of new readings and anomaly alerts
+    description: >
+      Replaces polling /cows/{cow_id}/profile. The stream starts with the latest reading,
+      then sends a "reading" event (raw values plus activity_level) for every new reading
+      and an "alert" event for every anomaly. Comment heartbeats are sent while idle. The
+      server ends the stream with a "dropped" event if the client falls too far behind,
+      or an "expired" event when the access token expires; reconnect with a valid token.
+    security:
+      - bearerAuth: []
+    parameters:
+      - name: cow_id
+        in: path
+        type: string
+        required: true
+    produces:
+      - text/event-stream
+    responses:
+      200:
+        description: Event stream
+        content:
+          text/event-stream:
+            example: |
+              event: reading
+              data: {"cow_id": "cow123", "timestamp": "2025-08-14T10:00:00Z", "temperature": 38.5, "activity_level": "High", ...}
+      404:
+        description: Cow not found
+      503:
+        description: Too many live subscribers on this server
+    """
+    user_id = g.user['uid']
+    if not db.reference(f'users/{user_id}/cows/{cow_id}').get(shallow=True):
+        return jsonify({'Error': 'Cow not found'}), 404
+
+    latest = latest_reading(user_id, cow_id)
+    try:
+        initial = reading_event(cow_id, latest) if isinstance(latest, dict) else None
+    except (KeyError, TypeError):
+        initial = None
+
+    subscriber = subscribe(user_id, cow_id)
+    if subscriber is None:
+        return jsonify({'Error': 'Too many live subscribers, try again later'}), 503
+
+    logging.info(f"Live stream opened for cow '{cow_id}' by user {user_id}")
+    return Response(
+        stream(subscriber, initial, expires_at=g.user.get('exp')),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+@cow_bp.route('/<cow_id>/rollups', methods=['GET'])
+@auth_required
+@role_required('farmer')
+def cow_rollups(cow_id):
+    """
+    Get aggregated sensor readings for a cow
+    ---
+    tags:
+      - Cows
+    summary: Fetch minute, hour or day aggregates of temperature and motion
+    description: >
+      Returns pre-computed aggregates (count, min, max, mean, sum, sum of squares) of
+      temperature, accelerometer magnitude and gyroscope magnitude, maintained at ingest
+      time. Use this instead of raw readings for charts and long-range queries.
+    parameters:
+      - name: cow_id
+        in: path
+        type: string
+        required: true
+      - name: resolution
+        in: query
+        type: string
+        enum: [minute, hour, day]
+        default: hour
+      - name: start
+        in: query
+        type: string
+        example: 2025-08-01T00:00:00Z
+      - name: end
+        in: query
+        type: string
+        example: 2025-08-14T23:59:59Z
+      - name: limit
+        in: query
+        type: integer
+        description: Return only the most recent N buckets in the range.
+    responses:
+      200:
+        description: Aggregates keyed by bucket
+        content:
+          application/json:
+            example:
+              cow_id: cow_101
+              resolution: hour
+              buckets:
+                2025-08-14T10:
+                  temperature: {count: 720, min: 38.1, max: 38.9, mean: 38.4, sum: 27648.0, sum_sq: 1061683.2}
+      400:
+        description: Invalid resolution, timestamp or limit
+    security:
+      - bearerAuth: []
+    """
+    user_id = g.user['uid']
+    resolution = request.args.get('resolution', 'hour')
+    if resolution not in RESOLUTIONS:
+        return jsonify({'Error': f"Invalid resolution. Use one of: {', '.join(RESOLUTIONS)}"}), 400
+
+    try:
+        limit = request.args.get('limit', type=int)
+        buckets = get_rollups(
+            user_id, cow_id, resolution,
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            limit=limit,
+        )
+    except ValueError:
+        logging.warning(f"Cow rollups failed: Invalid range for cow '{cow_id}': {dict(request.args)}")
+        return jsonify({'Error': 'Invalid start or end timestamp'}), 400
+
+    logging.info("Fetched %d %s rollups for cow '%s' by user %s", len(buckets), resolution, cow_id, user_id)
+    return jsonify({'cow_id': cow_id, 'resolution': resolution, 'buckets': buckets}), 200
+
+@cow_bp.route('/<cow_id>/activity', methods=['GET'])
+@auth_required
+@role_required('farmer')
+def cow_activity(cow_id):
+    """
+    Get a cow's activity timeline
+    ---
+    tags:
+      - Cows
+    summary: Classify every reading in a time range and summarise activity
+    description: >
+      Classifies each sample in the range as Low, Medium or High activity from its
+      accelerometer and gyroscope magnitudes, and returns time spent in each state,
+      the run-length encoded timeline and active bouts (Medium/High stretches lasting
+      at least min_bout_seconds). Defaults to the last 24 hours.
+    parameters:
+      - name: cow_id
+        in: path
+        type: string
+        required: true
+      - name: start
+        in: query
+        type: string
+        example: 2025-08-14T00:00:00Z
+      - name: end
+        in: query
+        type: string
+        example: 2025-08-15T00:00:00Z
+      - name: min_bout_seconds
+        in: query
+        type: number
+        example: 60
+    responses:
+      200:
+        description: Activity summary for the range
+        content:
+          application/json:
+            example:
+              cow_id: cow_101
+              samples: 17280
+              time_in_state: {Low: 70200.0, Medium: 14400.0, High: 1800.0}
+              timeline:
+                - {level: Low, start: "2025-08-14T00:00:00Z", end: "2025-08-14T06:30:00Z", duration_seconds: 23400.0, samples: 4680}
+              bouts:
+                - {level: High, start: "2025-08-14T06:30:00Z", end: "2025-08-14T07:00:00Z", duration_seconds: 1800.0, samples: 360}
+      400:
+        description: Invalid time range
+    security:
+      - bearerAuth: []
+    """
+    user_id = g.user['uid']
+    try:
+        end = parse_timestamp(request.args['end']) if request.args.get('end') else datetime.now(timezone.utc)
+        start = parse_timestamp(request.args['start']) if request.args.get('start') else end - timedelta(days=1)
+        min_bout_seconds = request.args.get('min_bout_seconds', MIN_BOUT_SECONDS, type=float)
+    except ValueError:
+        logging.warning(f"Cow activity failed: Invalid range for cow '{cow_id}': {dict(request.args)}")
+        return jsonify({'Error': 'Invalid start or end timestamp'}), 400
+
+    if start >= end:
+        return jsonify({'Error': 'start must be before end'}), 400
+
+    arrays = load_readings(user_id, cow_id, start, end)
+    summary = activity_timeline(arrays, min_bout_seconds=min_bout_seconds)
+
+    logging.info("Activity timeline for cow '%s' by user %s: %s samples", cow_id, user_id, summary['samples'])
+    return jsonify({'cow_id': cow_id, **summary}), 200
+
+@cow_bp.route('/<cow_id>/alerts', methods=['GET'])
+@auth_required
+@role_required('farmer')
+def cow_alerts(cow_id):
+    """
+    Get recent anomaly alerts for a cow
+    ---
+    tags:
+      - Cows
+    summary: List temperature and activity anomalies flagged at ingest time
+    parameters:
+      - name: cow_id
+        in: path
+        type: string
+        required: true
+      - name: limit
+        in: query
+        type: integer
+        default: 50
+    responses:
+      200:
+        description: Most recent alerts, oldest first
+        content:
+          application/json:
+            example:
+              cow_id: cow_101
+              alerts:
+                - {type: fever, signal: temperature, detector: threshold, score: 39.8, value: 39.8, baseline_mean: 38.6, baseline_std: 0.21, timestamp: "2025-08-14T10:00:00Z"}
+    security:
+      - bearerAuth: []
+    """
+    user_id = g.user['uid']
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    alerts = db.reference(alerts_path(user_id, cow_id)).order_by_key().limit_to_last(limit).get() or {}
+
+    logging.info("Fetched %d alerts for cow '%s' by user %s", len(alerts), cow_id, user_id)
+    return jsonify({'cow_id': cow_id, 'alerts': [alerts[key] for key in sorted(alerts)]}), 200
+
+@cow_bp.route('/bulk', methods=['POST'])
+@auth_required
+@role_required('farmer')
+def bulk_cows():
+    """
+    Create, update and delete many cows in one request
+    ---
+    tags:
+      - Cows
+    summary: Apply a batch of cow operations with a single database write
+    description: >
+      Every operation is validated up front with the same rules as addcow/update/delete,
+      existence is checked with one read, and all valid operations are committed with one
+      multi-location update. Each item gets its own result. With atomic=true nothing is
+      written unless every item is valid.
+    security:
+      - bearerAuth: []
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required:
+            - operations
+          properties:
+            atomic:
+              type: boolean
+              default: false
+            operations:
+              type: array
+              maxItems: 500
+              items:
+                type: object
+                required:
+                  - op
+                  - cow_id
+                properties:
+                  op:
+                    type: string
+                    enum: [create, update, delete]
+                  cow_id:
+                    type: string
+                    example: cow_101
+                  name:
+                    type: string
+                  breed:
+                    type: string
+                  age:
+                    type: number
+                  health_status:
+                    type: string
+                  milk_production:
+                    type: number
+    responses:
+      200:
+        description: Per-item results
+        schema:
+          type: object
+          properties:
+            results:
+              type: array
+              items:
+                type: object
+                properties:
+                  index:
+                    type: integer
+                  op:
+                    type: string
+                  cow_id:
+                    type: string
+                  status:
+                    type: string
+                    example: created
+                  error:
+                    type: string
+            summary:
+              type: object
+      400:
+        description: Malformed request, or atomic batch with failing items
+    """
+    user_id = g.user['uid']
+    data = request.get_json(silent=True) or {}
+    items = data.get('operations')
+
+    if not isinstance(items, list) or not items:
+        return jsonify({'Error': 'operations must be a non-empty list'}), 400
+    if len(items) > MAX_BULK_OPERATIONS:
+        return jsonify({'Error': f'At most {MAX_BULK_OPERATIONS} operations per request'}), 400
+
+    # One read for existence checks. Creates only need keys; updates and deletes need the
+    # current values to keep the aggregates and search index consistent.
+    cows_ref = db.reference(f'users/{user_id}/cows')
+    creates_only = all(isinstance(item, dict) and item.get('op') == 'create' for item in items)
+    existing = get_replicated_cows(user_id)
+    if existing is None:
+        existing = cows_ref.get(shallow=True) if creates_only else cows_ref.get()
+    existing = {cow_id: cow for cow_id, cow in (existing or {}).items() if cow}
+
+    updates, changes, results = plan_operations(user_id, items, existing)
+    failed = [result for result in results if 'error' in result]
+
+    if data.get('atomic') and failed:
+        logging.warning(f"Bulk cows rejected for user {user_id}: {len(failed)} of {len(items)} items failed")
+        return jsonify({'Error': 'Batch rejected', 'results': results}), 400
+
+    commit_plan(user_id, updates, changes, results)
+
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    logging.info(f"Bulk cows for user {user_id}: {summary}")
+    return jsonify({'results': results, 'summary': summary}), 200
+
+@cow_bp.route('/import', methods=['POST'])
+@auth_required
+@role_required('farmer')
+def import_herd():
+    """
+    Import cows from a CSV or NDJSON upload
+    ---
+    tags:
+      - Cows
+    summary: Stream a spreadsheet export into the herd in batched writes
+    description: >
+      The upload is read row by row and written in batches of one multi-location update
+      each, so large files never have to fit in memory. Send the file as the raw request
+      body or as multipart field "file". CSV needs a header row with cow_id, name, breed,
+      age, health_status and milk_production; an optional op column (create, update or
+      delete, default create) allows updates and deletes, where empty cells leave a field
+      unchanged. NDJSON takes one /cows/bulk operation object per line. Invalid rows are
+      skipped and reported with their line number.
+    consumes:
+      - text/csv
+      - application/x-ndjson
+      - multipart/form-data
+    security:
+      - bearerAuth: []
+    parameters:
+      - name: format
+        in: query
+        type: string
+        enum: [csv, ndjson]
+        description: Defaults to the file extension or content type.
+      - name: file
+        in: formData
+        type: file
+        required: false
+    responses:
+      200:
+        description: Import summary
+        content:
+          application/json:
+            example:
+              summary: {created: 1480, updated: 12, invalid: 3}
+              errors:
+                - {line: 17, op: create, cow_id: cow_17, status: invalid, error: "age must be a number"}
+              errors_truncated: false
+      400:
+        description: Unsupported format
+    """
+    user_id = g.user['uid']
+    upload = request.files.get('file')
+    fmt = transfer_format(upload.filename if upload else None)
+    if fmt not in FORMATS:
+        return jsonify({'Error': f"format must be one of: {', '.join(FORMATS)}"}), 400
+
+    stream = upload.stream if upload else request.stream
+    rows = parse_csv(stream) if fmt == 'csv' else parse_ndjson(stream)
+    try:
+        report = import_cows(user_id, rows)
+    except UnicodeDecodeError:
+        logging.warning(f"Cow import failed for user {user_id}: upload is not UTF-8")
+        return jsonify({'Error': 'Upload must be UTF-8 encoded'}), 400
+
+    return jsonify(report), 200
+
+@cow_bp.route('/export', methods=['GET'])
+@auth_required
+@role_required('farmer')
+def export_herd():
+    """
+    Export the herd or its sensor readings
+    ---
+    tags:
+      - Cows
+    summary: Stream cows or readings as CSV or NDJSON
+    description: >
+      The response is generated page by page while it is sent, so memory use does not
+      grow with the size of the farm. what=cows exports cow metadata; what=readings
+      exports sensor readings for one cow (cow_id) or every cow, optionally limited
+      to [start, end].
+    security:
+      - bearerAuth: []
+    parameters:
+      - name: what
+        in: query
+        type: string
+        enum: [cows, readings]
+        default: cows
+      - name: format
+        in: query
+        type: string
+        enum: [csv, ndjson]
+        default: csv
+      - name: cow_id
+        in: query
+        type: string
+      - name: start
+        in: query
+        type: string
+        example: 2025-08-14T00:00:00Z
+      - name: end
+        in: query
+        type: string
+        example: 2025-08-15T00:00:00Z
+    produces:
+      - text/csv
+      - application/x-ndjson
+    responses:
+      200:
+        description: Streamed file
+      400:
+        description: Invalid parameters
+    """
+    user_id = g.user['uid']
+    what = request.args.get('what', 'cows')
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({'Error': f"format must be one of: {', '.join(FORMATS)}"}), 400
+
+    if what == 'cows':
+        chunks = export_cows(user_id, fmt)
+    elif what == 'readings':
+        try:
+            start = parse_timestamp(request.args['start']) if request.args.get('start') else None
+            end = parse_timestamp(request.args['end']) if request.args.get('end') else None
+        except ValueError:
+            return jsonify({'Error': 'Invalid start or end timestamp'}), 400
+        cow_id = request.args.get('cow_id')
+        cow_ids = [cow_id] if cow_id else sorted(db.reference(f'users/{user_id}/cows').get(shallow=True) or {})
+        chunks = export_readings(user_id, cow_ids, fmt, start, end)
+    else:
+        return jsonify({'Error': 'what must be cows or readings'}), 400
+
+    logging.info(f"Exporting {what} as {fmt} for user {user_id}")
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    filename = f"{what}.{'csv' if fmt == 'csv' else 'ndjson'}"
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
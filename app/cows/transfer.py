@@ -0,0 +1,189 @@
+import io
+import csv
+import json
+import math
+import logging
+import numpy as np
+from app.datastore import db
+from app.datastore.local import key_order
+from app.cows.bulk import REQUIRED_FIELDS, commit_plan, plan_operations
+from app.utils.block_storage import COLUMNS, iter_readings
+from app.utils.cow_index import fetch_cows
+
+FORMATS = ('csv', 'ndjson')
+IMPORT_BATCH_SIZE = 200
+EXPORT_PAGE_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+NUMERIC_FIELDS = ('age', 'milk_production')
+COW_COLUMNS = REQUIRED_FIELDS + ('created_at', 'updated_at')
+READING_COLUMNS = ('cow_id', 'timestamp') + COLUMNS
+
+
+def _number(field, text):
+    try:
+        value = float(text)
+    except ValueError:
+        raise ValueError(f"{field} must be a number")
+    # float() also accepts 'nan' and 'inf', which the database cannot store.
+    if not math.isfinite(value):
+        raise ValueError(f"{field} must be a finite number")
+    return int(value) if value.is_integer() else value
+
+
+def parse_csv(stream):
+    """Yield (line, item) for each CSV row; item is a ValueError when the row cannot be parsed."""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        line = reader.line_num
+        # Empty cells mean "not provided", so an update row only touches the columns it fills in.
+        item = {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        try:
+            for field in NUMERIC_FIELDS:
+                if field in item:
+                    item[field] = _number(field, item[field])
+        except ValueError as e:
+            yield line, e
+            continue
+        item.setdefault('op', 'create')
+        yield line, item
+
+
+def _reject_constant(name):
+    raise ValueError(f"{name} is not a valid number")
+
+
+def parse_ndjson(stream):
+    """Yield (line, item) for each non-blank NDJSON line; item is a ValueError for malformed lines."""
+    for line, text in enumerate(io.TextIOWrapper(stream, encoding='utf-8-sig'), start=1):
+        if not text.strip():
+            continue
+        try:
+            item = json.loads(text, parse_constant=_reject_constant)
+        except json.JSONDecodeError as e:
+            yield line, ValueError(f"Invalid JSON: {e.msg}")
+            continue
+        except ValueError as e:
+            yield line, e
+            continue
+        if isinstance(item, dict):
+            item.setdefault('op', 'create')
+        yield line, item
+
+
+def _existing_cows(user_id, items, known_ids):
+    """Existence map for one batch: creates only need known_ids, updates and deletes need current values."""
+    touched = {str(item.get('cow_id')).strip().lower() for item in items
+               if isinstance(item, dict) and item.get('op') != 'create' and 'cow_id' in item}
+    existing = {cow_id: True for cow_id in known_ids}
+    existing.update(fetch_cows(user_id, sorted(touched & known_ids)))
+    return existing
+
+
+def import_cows(user_id, rows, batch_size=IMPORT_BATCH_SIZE):
+    """Validate and write parsed rows in batches of one multi-path update each.
+
+    Memory is bounded by the batch size plus the set of cow ids in the herd.
+    """
+    known_ids = set((db.reference(f'users/{user_id}/cows').get(shallow=True) or {}).keys())
+    summary, errors = {}, []
+
+    def record(line, result):
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+        if 'error' in result and len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'line': line, **{key: value for key, value in result.items() if key != 'index'}})
+
+    def flush(batch):
+        lines, items = zip(*batch)
+        updates, changes, results = plan_operations(user_id, list(items), _existing_cows(user_id, items, known_ids))
+        commit_plan(user_id, updates, changes, results)
+        for line, result in zip(lines, results):
+            if result['status'] == 'created':
+                known_ids.add(result['cow_id'])
+            elif result['status'] == 'deleted':
+                known_ids.discard(result['cow_id'])
+            record(line, result)
+
+    batch = []
+    for line, item in rows:
+        if isinstance(item, Exception):
+            record(line, {'status': 'invalid', 'error': str(item)})
+            continue
+        batch.append((line, item))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    failed = sum(summary.get(status, 0) for status in ('invalid', 'not_found'))
+    logging.info(f"Cow import for user {user_id}: {summary}")
+    return {'summary': summary, 'errors': errors, 'errors_truncated': failed > len(errors)}
+
+
+def iter_cows(user_id, page_size=EXPORT_PAGE_SIZE):
+    """Yield (cow_id, cow) in the database's key order, reading one page of the herd at a time."""
+    cursor = None
+    while True:
+        query = db.reference(f'users/{user_id}/cows').order_by_key()
+        if cursor:
+            query = query.start_at(cursor)
+        page = query.limit_to_first(page_size + 1).get() or {}
+        keys = sorted(page, key=key_order)
+        for cow_id in keys[:page_size]:
+            if isinstance(page[cow_id], dict):
+                yield cow_id, page[cow_id]
+        if len(keys) <= page_size:
+            return
+        cursor = keys[page_size]
+
+
+def _csv_chunk(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def export_cows(user_id, fmt):
+    """Generate the herd as CSV or NDJSON text chunks."""
+    if fmt == 'csv':
+        yield _csv_chunk([COW_COLUMNS])
+    rows = []
+    for cow_id, cow in iter_cows(user_id):
+        cow = {**{key: value for key, value in cow.items() if key != 'readings'}, 'cow_id': cow_id}
+        rows.append(cow)
+        if len(rows) >= EXPORT_PAGE_SIZE:
+            yield _format_cows(rows, fmt)
+            rows = []
+    if rows:
+        yield _format_cows(rows, fmt)
+
+
+def _format_cows(cows, fmt):
+    if fmt == 'csv':
+        return _csv_chunk([[cow.get(column, '') for column in COW_COLUMNS] for cow in cows])
+    return ''.join(json.dumps(cow) + '\n' for cow in cows)
+
+
+def export_readings(user_id, cow_ids, fmt, start=None, end=None):
+    """Generate readings for the given cows as CSV or NDJSON text chunks, one storage page at a time."""
+    if fmt == 'csv':
+        yield _csv_chunk([READING_COLUMNS])
+    for cow_id in cow_ids:
+        for arrays in iter_readings(user_id, cow_id, start, end):
+            timestamps = np.char.add(
+                np.datetime_as_string(arrays['timestamp'].astype('datetime64[ms]'), unit='s'), 'Z'
+            ).tolist()
+            values = {name: np.round(arrays[name].astype(np.float64), 4).tolist() for name in COLUMNS}
+            if fmt == 'csv':
+                yield _csv_chunk(
+                    [cow_id, timestamp] + [values[name][i] for name in COLUMNS]
+                    for i, timestamp in enumerate(timestamps)
+                )
+            else:
+                yield ''.join(json.dumps({
+                    'cow_id': cow_id,
+                    'timestamp': timestamp,
+                    'temperature': values['temperature'][i],
+                    'accelerometer': {axis: values[f'accel_{axis}'][i] for axis in 'xyz'},
+                    'gyroscope': {axis: values[f'gyro_{axis}'][i] for axis in 'xyz'},
+                }) + '\n' for i, timestamp in enumerate(timestamps))
@@ -0,0 +1,188 @@
+import os
+import time
+import logging
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from app.datastore import db
+from app.utils.readings import readings_path
+from app.utils.block_storage import (
+    BLOCK_SECONDS, blocks_path, concat_arrays, decode_block, merge_block, nested_to_arrays,
+    read_blocks, read_nested, slice_arrays, split_into_blocks,
+)
+from app.utils.rollups import BUCKET_SECONDS, RESOLUTIONS, get_rollups, rollup_path, summarize_arrays
+
+load_dotenv()
+
+RETENTION_ENABLED = os.getenv('RETENTION_ENABLED', 'false').lower() == 'true'
+RAW_RETENTION_DAYS = int(os.getenv('RAW_RETENTION_DAYS', 7))
+# When true, expired raw samples are packed into archive/ blocks before being removed.
+RETENTION_ARCHIVE = os.getenv('RETENTION_ARCHIVE', 'false').lower() == 'true'
+RETENTION_INTERVAL_MINUTES = int(os.getenv('RETENTION_INTERVAL_MINUTES', 60))
+RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', 500))
+RETENTION_MAX_BATCHES = int(os.getenv('RETENTION_MAX_BATCHES', 50))
+RETENTION_PAUSE_SECONDS = float(os.getenv('RETENTION_PAUSE_SECONDS', 0.5))
+
+CHECKPOINT_PATH = 'maintenance/retention'
+
+
+def archive_path(user_id, cow_id):
+    return f"archive/reading_blocks/{user_id}/{cow_id}"
+
+
+def _archive_nested(user_id, cow_id, readings):
+    for key, arrays in split_into_blocks(nested_to_arrays(readings)):
+        ref = db.reference(f"{archive_path(user_id, cow_id)}/{key}")
+        ref.transaction(lambda current, key=key, arrays=arrays: merge_block(current, int(key) * 1000, arrays))
+
+
+def _sample_count(bucket):
+    return ((bucket or {}).get('temperature') or {}).get('count', 0)
+
+
+def _ensure_rolled_up(user_id, cow_id, arrays, load):
+    """Rebuild rollup buckets that do not account for every sample in arrays; returns how many.
+
+    Readings ingested before rollups existed, or whose update_rollups call failed, would
+    otherwise leave no aggregate behind once deleted. Such buckets are recomputed from the raw
+    readings still stored, fetched with load(start, end) in one range read.
+    """
+    seconds = arrays['timestamp'] // 1000
+    if not seconds.size:
+        return 0
+
+    stale = []
+    for resolution, width in BUCKET_SECONDS.items():
+        starts, counts = np.unique(seconds // width * width, return_counts=True)
+        first = datetime.fromtimestamp(int(starts[0]), tz=timezone.utc)
+        last = datetime.fromtimestamp(int(starts[-1]), tz=timezone.utc)
+        stored = get_rollups(user_id, cow_id, resolution, first, last)
+        for start, count in zip(starts.tolist(), counts.tolist()):
+            key = datetime.fromtimestamp(start, tz=timezone.utc).strftime(RESOLUTIONS[resolution])
+            if _sample_count(stored.get(key)) < count:
+                stale.append((resolution, key, start, start + width))
+    if not stale:
+        return 0
+
+    span_start = min(start for _, _, start, _ in stale)
+    span_end = max(end for _, _, _, end in stale)
+    raw = load(
+        datetime.fromtimestamp(span_start, tz=timezone.utc),
+        datetime.fromtimestamp(span_end, tz=timezone.utc) - timedelta(milliseconds=1),
+    )
+    updates = {}
+    for resolution, key, start, end in stale:
+        rows = slice_arrays(raw, start * 1000, end * 1000 - 1)
+        if rows['timestamp'].size:
+            updates[f"{rollup_path(user_id, cow_id, resolution)}/{key}"] = summarize_arrays(rows)
+    if updates:
+        db.reference().update(updates)
+        logging.warning(f"Retention rebuilt {len(updates)} rollup buckets for cow '{cow_id}' of user {user_id}")
+    return len(updates)
+
+
+def _compact_nested_batch(user_id, cow_id, cutoff):
+    path = readings_path(user_id, cow_id)
+    cutoff_key = cutoff.strftime('%Y-%m-%dT%H-%M-%SZ')
+    batch = db.reference(path).order_by_key().end_at(cutoff_key).limit_to_first(RETENTION_BATCH_SIZE).get()
+    if not batch:
+        return 0
+
+    _ensure_rolled_up(user_id, cow_id, nested_to_arrays(batch), lambda start, end: read_nested(user_id, cow_id, start, end))
+    if RETENTION_ARCHIVE:
+        _archive_nested(user_id, cow_id, batch)
+    db.reference().update({f"{path}/{key}": None for key in batch})
+    return len(batch)
+
+
+def _compact_block_batch(user_id, cow_id, cutoff):
+    path = blocks_path(user_id, cow_id)
+    # Only blocks that end before the cutoff are removed.
+    last_expired = int(cutoff.timestamp()) // BLOCK_SECONDS * BLOCK_SECONDS - BLOCK_SECONDS
+    if last_expired < 0:
+        return 0
+
+    # Blocks are far larger than samples, so fetch proportionally fewer per batch.
+    limit = max(1, RETENTION_BATCH_SIZE // 100)
+    batch = db.reference(path).order_by_key().end_at(f"{last_expired:010d}").limit_to_first(limit).get()
+    if not batch:
+        return 0
+
+    arrays = concat_arrays([decode_block(batch[key]) for key in sorted(batch)])
+    _ensure_rolled_up(user_id, cow_id, arrays, lambda start, end: read_blocks(user_id, cow_id, start, end))
+    updates = {f"{path}/{key}": None for key in batch}
+    if RETENTION_ARCHIVE:
+        updates.update({f"{archive_path(user_id, cow_id)}/{key}": block for key, block in batch.items()})
+    db.reference().update(updates)
+    return len(batch)
+
+
+def _save_checkpoint(user_id, cow_id, stats):
+    db.reference(CHECKPOINT_PATH).set({
+        'user_id': user_id,
+        'cow_id': cow_id,
+        'deleted': stats['deleted'],
+        'updated_at': datetime.utcnow().isoformat() + 'Z',
+    })
+
+
+def compact_raw_readings():
+    """Delete (or archive) raw readings older than RAW_RETENTION_DAYS.
+
+    Work is done in bounded multi-path updates with a pause between batches and a cap on
+    batches per run. Progress is checkpointed per cow so the next run resumes where this
+    one stopped. Before a batch is removed, any rollup bucket that does not count all of its
+    samples is rebuilt from the raw readings, so deleting raw data never loses aggregates.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=RAW_RETENTION_DAYS)
+    checkpoint = db.reference(CHECKPOINT_PATH).get() or {}
+    resume_user = checkpoint.get('user_id')
+    resume_cow = checkpoint.get('cow_id')
+    stats = {'batches': 0, 'deleted': checkpoint.get('deleted', 0)}
+    started = time.monotonic()
+
+    logging.info(f"Retention run started: cutoff={cutoff.isoformat()}, resume_from={resume_user}/{resume_cow}")
+
+    user_ids = sorted((db.reference('users').get(shallow=True) or {}).keys())
+    for user_id in user_ids:
+        if resume_user and user_id < resume_user:
+            continue
+
+        cow_ids = sorted((db.reference(f'users/{user_id}/cows').get(shallow=True) or {}).keys())
+        for cow_id in cow_ids:
+            if resume_user == user_id and resume_cow and cow_id < resume_cow:
+                continue
+
+            for compact_batch in (_compact_nested_batch, _compact_block_batch):
+                while True:
+                    if stats['batches'] >= RETENTION_MAX_BATCHES:
+                        _save_checkpoint(user_id, cow_id, stats)
+                        logging.info(
+                            f"Retention run paused at {user_id}/{cow_id} after {stats['batches']} batches, "
+                            f"{stats['deleted']} nodes removed in {time.monotonic() - started:.1f}s"
+                        )
+                        return stats
+
+                    removed = compact_batch(user_id, cow_id, cutoff)
+                    if not removed:
+                        break
+                    stats['batches'] += 1
+                    stats['deleted'] += removed
+                    time.sleep(RETENTION_PAUSE_SECONDS)
+
+            _save_checkpoint(user_id, cow_id, stats)
+        resume_user = resume_cow = None
+
+    db.reference(CHECKPOINT_PATH).delete()
+    logging.info(
+        f"Retention pass completed: {stats['deleted']} nodes removed in "
+        f"{time.monotonic() - started:.1f}s"
+    )
+    return stats
+
+
+def run_retention_job():
+    try:
+        compact_raw_readings()
+    except Exception:
+        logging.exception("Retention job failed")
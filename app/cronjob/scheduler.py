@@ -1,11 +1,18 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from app.utils.sensor_data import fetch_thingspeak_data ,ingest_and_save
+from app.cronjob.retention import RETENTION_ENABLED, RETENTION_INTERVAL_MINUTES, run_retention_job
+from app.metrics import timed_job
 
 
 def start_sensor_scheduler():
     scheduler = BackgroundScheduler()
 
     #scheduler.add_job(ingest_and_save,'interval', seconds=5, )
+    if RETENTION_ENABLED:
+        scheduler.add_job(
+            timed_job('raw_readings_retention')(run_retention_job), 'interval', minutes=RETENTION_INTERVAL_MINUTES,
+            id='raw_readings_retention', max_instances=1, coalesce=True,
+        )
     scheduler.start()
 
- 
\ No newline at end of file
+ 
@@ -0,0 +1,73 @@
+import os
+import json
+import threading
+from dotenv import load_dotenv
+from firebase_admin import auth as firebase_auth, db as firebase_db
+from app.datastore.local import LocalAuth, LocalReference, LocalStore
+from app.firebase_config import init_firebase
+from app.metrics import timed_auth, timed_reference
+
+load_dotenv()
+
+# 'firebase' uses the configured Realtime Database and Firebase Auth. 'memory' keeps both in
+# process (optionally seeded from a database JSON export) so the API can run offline.
+BACKENDS = ('firebase', 'memory')
+DATA_BACKEND = os.getenv('DATA_BACKEND', 'firebase')
+DATA_SEED_FILE = os.getenv('DATA_SEED_FILE')
+# Simulated round-trip time per memory-backend call, so load tests see I/O-bound requests.
+DATA_LATENCY_MS = float(os.getenv('DATA_LATENCY_MS', 0))
+
+_local = None
+_lock = threading.Lock()
+
+
+def _new_backend(data):
+    latency = DATA_LATENCY_MS / 1000
+    return LocalStore(data, latency=latency), LocalAuth(latency=latency)
+
+
+def _local_backend():
+    global _local
+    if _local is None:
+        with _lock:
+            if _local is None:
+                seed = None
+                if DATA_SEED_FILE:
+                    with open(DATA_SEED_FILE, encoding='utf-8') as f:
+                        seed = json.load(f)
+                _local = _new_backend(seed)
+    return _local
+
+
+def use_backend(name, data=None):
+    """Switch the active backend at runtime; 'memory' starts from a fresh store holding data."""
+    global DATA_BACKEND, _local
+    if name not in BACKENDS:
+        raise ValueError(f"DATA_BACKEND must be one of: {', '.join(BACKENDS)}")
+    with _lock:
+        DATA_BACKEND = name
+        _local = _new_backend(data) if name == 'memory' else None
+
+
+class _Database:
+    """Drop-in for firebase_admin.db: reference() returns a reference on the active backend."""
+
+    def reference(self, path='/'):
+        if DATA_BACKEND == 'memory':
+            return timed_reference(LocalReference(_local_backend()[0], path), path)
+        init_firebase()
+        return timed_reference(firebase_db.reference(path), path)
+
+
+class _Auth:
+    """Drop-in for firebase_admin.auth, including its exception classes."""
+
+    def __getattr__(self, name):
+        if DATA_BACKEND == 'memory':
+            return timed_auth(name, getattr(_local_backend()[1], name))
+        init_firebase()
+        return timed_auth(name, getattr(firebase_auth, name))
+
+
+db = _Database()
+auth = _Auth()
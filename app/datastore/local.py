@@ -0,0 +1,437 @@
+"""In-process stand-in for the Firebase Realtime Database and Firebase Auth.
+
+Implements the subset of ``firebase_admin.db`` and ``firebase_admin.auth`` the app uses, with
+the same path semantics: nested JSON addressed by '/'-separated paths, nulls and empty objects
+are never stored, multi-location updates, ``.sv`` server values, transactions, ETags, ordered
+queries and listeners. Everything lives in memory, so it is meant for local development, load
+tests and benchmarks, not for production data.
+"""
+import hashlib
+import json
+import threading
+import time
+import uuid
+from firebase_admin import auth as firebase_auth
+
+_MISSING = object()
+
+
+def split_path(path):
+    return [segment for segment in str(path or '').split('/') if segment]
+
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {key: _copy(child) for key, child in value.items()}
+    if isinstance(value, list):
+        return [_copy(child) for child in value]
+    return value
+
+
+def _prune(value):
+    """Drop nulls and empty objects the way the database does when storing a value."""
+    if isinstance(value, dict):
+        pruned = {}
+        for key, child in value.items():
+            child = _prune(child)
+            if child is not None:
+                pruned[str(key)] = child
+        return pruned or None
+    if isinstance(value, list):
+        pruned = [_prune(child) for child in value]
+        return pruned if any(child is not None for child in pruned) else None
+    return value
+
+
+def _etag(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+# Ordering used by order_by_child/order_by_value: null < false < true < numbers < strings < objects.
+def _value_rank(value):
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, int(value))
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, str):
+        return (3, value)
+    return (4, 0)
+
+
+def key_order(key):
+    """Sort key for the database's order_by_key(): 32-bit integer keys first, numerically, then strings.
+
+    firebase_admin re-sorts query results client-side as plain strings, so code that pages by
+    key must order the returned keys with this rather than trust the dict's order.
+    """
+    try:
+        number = int(key)
+        if -2 ** 31 <= number < 2 ** 31 and str(number) == key:
+            return (0, number, '')
+    except ValueError:
+        pass
+    return (1, 0, key)
+
+
+class LocalEvent:
+    def __init__(self, event_type, path, data):
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+
+class ListenerRegistration:
+    def __init__(self, store, listener):
+        self._store = store
+        self._listener = listener
+
+    def close(self):
+        self._store.remove_listener(self._listener)
+
+
+class LocalStore:
+    """A JSON tree guarded by one lock; every reference from this store shares it."""
+
+    def __init__(self, data=None, latency=0):
+        self._root = _prune(_copy(data)) or {}
+        self._lock = threading.RLock()
+        self._listeners = []
+        # Seconds slept (outside the lock) per call, to stand in for a network round trip in load tests.
+        self.latency = latency
+
+    def delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def read(self, segments):
+        node = self._root
+        for segment in segments:
+            if isinstance(node, dict):
+                node = node.get(segment, _MISSING)
+            elif isinstance(node, list) and segment.isdigit() and int(segment) < len(node):
+                node = node[int(segment)]
+            else:
+                return None
+            if node is _MISSING:
+                return None
+        return node
+
+    def _resolve(self, segments, value):
+        """Replace {'.sv': ...} placeholders with their server-side result."""
+        if isinstance(value, dict):
+            if set(value) == {'.sv'}:
+                server_value = value['.sv']
+                if server_value == 'timestamp':
+                    return int(time.time() * 1000)
+                if isinstance(server_value, dict) and 'increment' in server_value:
+                    current = self.read(segments)
+                    if isinstance(current, bool) or not isinstance(current, (int, float)):
+                        current = 0
+                    return current + server_value['increment']
+                raise ValueError(f"Unsupported server value: {server_value}")
+            return {key: self._resolve(segments + [str(key)], child) for key, child in value.items()}
+        return value
+
+    def _write(self, segments, value):
+        value = _prune(self._resolve(segments, _copy(value)))
+        if not segments:
+            self._root = value or {}
+            return
+
+        node, parents = self._root, []
+        for segment in segments[:-1]:
+            child = node.get(segment) if isinstance(node, dict) else None
+            if not isinstance(child, dict):
+                if value is None:
+                    return
+                child = {}
+                node[segment] = child
+            parents.append((node, segment))
+            node = child
+
+        if value is None:
+            node.pop(segments[-1], None)
+            # Removing the last child removes the (now empty) parents as well.
+            while parents and not node:
+                parent, segment = parents.pop()
+                del parent[segment]
+                node = parent
+        else:
+            node[segments[-1]] = value
+
+    def write(self, segments, value):
+        with self._lock:
+            self._write(segments, value)
+            events = self._events([segments])
+        self._dispatch(events)
+
+    def write_many(self, base, updates):
+        paths = {key: base + split_path(key) for key in updates}
+        ordered = sorted(paths.values())
+        for shorter, longer in zip(ordered, ordered[1:]):
+            if longer[:len(shorter)] == shorter:
+                raise ValueError(f"Update paths overlap: {'/'.join(shorter)} and {'/'.join(longer)}")
+
+        with self._lock:
+            for key, value in updates.items():
+                self._write(paths[key], value)
+            events = self._events(list(paths.values()))
+        self._dispatch(events)
+
+    def add_listener(self, segments, callback):
+        listener = (segments, callback)
+        with self._lock:
+            self._listeners.append(listener)
+            initial = LocalEvent('put', '/', _copy(self.read(segments)))
+        callback(initial)
+        return ListenerRegistration(self, listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _events(self, written):
+        events = []
+        for segments, callback in self._listeners:
+            for path in written:
+                if path[:len(segments)] == segments:
+                    relative = path[len(segments):]
+                    events.append((callback, LocalEvent('put', '/' + '/'.join(relative), _copy(self.read(path)))))
+                elif segments[:len(path)] == path:
+                    events.append((callback, LocalEvent('put', '/', _copy(self.read(segments)))))
+        return events
+
+    @staticmethod
+    def _dispatch(events):
+        for callback, event in events:
+            callback(event)
+
+
+class LocalQuery:
+    def __init__(self, reference, order_by, child_path=None):
+        self._reference = reference
+        self._order_by = order_by
+        self._child_path = split_path(child_path)
+        self._start = _MISSING
+        self._end = _MISSING
+        self._limit = None
+
+    def start_at(self, start):
+        self._start = start
+        return self
+
+    def end_at(self, end):
+        self._end = end
+        return self
+
+    def equal_to(self, value):
+        self._start = self._end = value
+        return self
+
+    def limit_to_first(self, limit):
+        self._limit = ('first', limit)
+        return self
+
+    def limit_to_last(self, limit):
+        self._limit = ('last', limit)
+        return self
+
+    def _sort_key(self, key, value):
+        if self._order_by == 'key':
+            return key_order(key)
+        if self._order_by == 'child':
+            node = value
+            for segment in self._child_path:
+                node = node.get(segment) if isinstance(node, dict) else None
+            value = node
+        return _value_rank(value), key_order(key)
+
+    def _bound(self, bound):
+        if self._order_by == 'key':
+            return key_order(str(bound))
+        return _value_rank(bound)
+
+    def get(self):
+        data = self._reference.get()
+        if not isinstance(data, dict):
+            return data if not isinstance(data, list) else dict(enumerate(data))
+
+        entries = []
+        for key, value in data.items():
+            sort_key = self._sort_key(key, value)
+            rank = sort_key if self._order_by == 'key' else sort_key[0]
+            if self._start is not _MISSING and rank < self._bound(self._start):
+                continue
+            if self._end is not _MISSING and rank > self._bound(self._end):
+                continue
+            entries.append((sort_key, key, value))
+        entries.sort(key=lambda entry: entry[0])
+
+        if self._limit:
+            direction, limit = self._limit
+            entries = entries[:limit] if direction == 'first' else entries[-limit:] if limit else []
+        return {key: value for _, key, value in entries}
+
+
+class LocalReference:
+    def __init__(self, store, path=None):
+        self._store = store
+        self._segments = split_path(path)
+
+    @property
+    def key(self):
+        return self._segments[-1] if self._segments else None
+
+    @property
+    def path(self):
+        return '/' + '/'.join(self._segments)
+
+    @property
+    def parent(self):
+        if not self._segments:
+            return None
+        return LocalReference(self._store, '/'.join(self._segments[:-1]))
+
+    def child(self, path):
+        return LocalReference(self._store, '/'.join(self._segments + split_path(path)))
+
+    def get(self, etag=False, shallow=False):
+        self._store.delay()
+        return self._read(etag, shallow)
+
+    def _read(self, etag=False, shallow=False):
+        with self._store._lock:
+            value = self._store.read(self._segments)
+            if shallow and isinstance(value, dict):
+                value = {key: True if isinstance(child, (dict, list)) else child for key, child in value.items()}
+            else:
+                value = _copy(value)
+            if etag:
+                return value, _etag(value)
+            return value
+
+    def get_if_changed(self, etag):
+        value, current = self.get(etag=True)
+        if current == etag:
+            return False, None, None
+        return True, value, current
+
+    def set(self, value):
+        if value is None:
+            raise ValueError('Value must not be None.')
+        self._store.delay()
+        self._store.write(self._segments, value)
+
+    def set_if_unchanged(self, expected_etag, value):
+        if not isinstance(expected_etag, str):
+            raise ValueError('Expected ETag must be a string.')
+        if value is None:
+            raise ValueError('Value must not be none.')
+        self._store.delay()
+        with self._store._lock:
+            current, etag = self._read(etag=True)
+            if etag != expected_etag:
+                return False, current, etag
+            self._store.write(self._segments, value)
+            new_value, new_etag = self._read(etag=True)
+            return True, new_value, new_etag
+
+    def push(self, value=''):
+        # Time-prefixed keys sort in creation order, like Firebase push IDs.
+        key = f"{time.time_ns():020d}{uuid.uuid4().hex[:8]}"
+        child = self.child(key)
+        if value != '':
+            child.set(value)
+        return child
+
+    def update(self, value):
+        if not isinstance(value, dict) or not value:
+            raise ValueError('Value argument must be a non-empty dictionary.')
+        if None in value.keys():
+            raise ValueError('Dictionary must not contain None keys.')
+        self._store.delay()
+        self._store.write_many(self._segments, value)
+
+    def delete(self):
+        self._store.delay()
+        self._store.write(self._segments, None)
+
+    def transaction(self, transaction_update):
+        if not callable(transaction_update):
+            raise ValueError('transaction_update must be a function.')
+        # The store lock makes the read-modify-write atomic, so there is never a retry.
+        self._store.delay()
+        with self._store._lock:
+            new_value = transaction_update(self._read())
+            # firebase_admin commits through set_if_unchanged, which cannot write None.
+            if new_value is None:
+                raise ValueError('Value must not be none.')
+            self._store.write(self._segments, new_value)
+            return new_value
+
+    def listen(self, callback):
+        return self._store.add_listener(self._segments, callback)
+
+    def order_by_child(self, path):
+        return LocalQuery(self, 'child', path)
+
+    def order_by_key(self):
+        return LocalQuery(self, 'key')
+
+    def order_by_value(self):
+        return LocalQuery(self, 'value')
+
+
+class LocalUserRecord:
+    def __init__(self, uid, email):
+        self.uid = uid
+        self.email = email
+
+
+class LocalAuth:
+    """Email/password accounts with the firebase_admin.auth calls and exceptions the app uses."""
+
+    EmailAlreadyExistsError = firebase_auth.EmailAlreadyExistsError
+    UserNotFoundError = firebase_auth.UserNotFoundError
+
+    def __init__(self, latency=0):
+        self._users = {}
+        self._lock = threading.Lock()
+        self.latency = latency
+
+    def _delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def create_user(self, email=None, password=None, uid=None, **kwargs):
+        self._delay()
+        with self._lock:
+            if any(user.email == email for user in self._users.values()):
+                raise self.EmailAlreadyExistsError(f"The user with the provided email already exists ({email}).", None, None)
+            user = LocalUserRecord(uid or uuid.uuid4().hex[:28], email)
+            self._users[user.uid] = user
+            return user
+
+    def get_user(self, uid):
+        self._delay()
+        with self._lock:
+            if uid not in self._users:
+                raise self.UserNotFoundError(f"No user record found for the provided user ID: {uid}.")
+            return self._users[uid]
+
+    def get_user_by_email(self, email):
+        self._delay()
+        with self._lock:
+            for user in self._users.values():
+                if user.email == email:
+                    return user
+        raise self.UserNotFoundError(f"No user record found for the provided email: {email}.")
+
+    def delete_user(self, uid):
+        self._delay()
+        with self._lock:
+            if self._users.pop(uid, None) is None:
+                raise self.UserNotFoundError(f"No user record found for the provided user ID: {uid}.")
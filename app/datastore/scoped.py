@@ -0,0 +1,142 @@
+"""Request-scoped read cache and conditional-write helpers on top of ``db.reference()``.
+
+Reads made through ``cached_get`` are remembered on ``flask.g`` for the rest of the request, and
+a cached ancestor also answers reads of its children. The write helpers fold an existence
+check and the write into one transaction (an ETag-guarded write for deletes), so there is no
+window between check and write.
+"""
+from firebase_admin.db import TransactionAbortedError
+from flask import g, has_request_context
+from app.datastore import db
+from app.datastore.local import split_path
+
+_MISSING = object()
+# Same retry budget as firebase_admin's Reference.transaction().
+_MAX_RETRIES = 25
+
+
+class _Abort(Exception):
+    pass
+
+
+def _cache():
+    if not has_request_context():
+        return None
+    if '_datastore_reads' not in g:
+        g._datastore_reads = {}
+    return g._datastore_reads
+
+
+def _lookup(cache, segments):
+    for depth in range(len(segments), -1, -1):
+        value = cache.get(tuple(segments[:depth]), _MISSING)
+        if value is _MISSING:
+            continue
+        for segment in segments[depth:]:
+            value = value.get(segment) if isinstance(value, dict) else None
+        return value
+    return _MISSING
+
+
+def cached_get(path):
+    """Read path at most once per request."""
+    cache = _cache()
+    if cache is None:
+        return db.reference(path).get()
+    segments = split_path(path)
+    value = _lookup(cache, segments)
+    if value is _MISSING:
+        value = db.reference(path).get()
+        cache[tuple(segments)] = value
+    return value
+
+
+def remember(path, value):
+    """Record a value this request just read or wrote, so later cached_get calls reuse it."""
+    cache = _cache()
+    if cache is not None:
+        invalidate(path)
+        cache[tuple(split_path(path))] = value
+
+
+def invalidate(path):
+    """Drop cached reads of path, its ancestors and its descendants."""
+    cache = _cache()
+    if not cache:
+        return
+    segments = tuple(split_path(path))
+    for key in list(cache):
+        shorter = min(len(key), len(segments))
+        if key[:shorter] == segments[:shorter]:
+            del cache[key]
+
+
+def update(updates):
+    """Multi-location update that keeps the request cache consistent."""
+    db.reference().update(updates)
+    for path in updates:
+        invalidate(path)
+
+
+def _transact(path, change):
+    found = {}
+
+    def transaction(current):
+        found['value'] = current
+        return change(current)
+
+    try:
+        new_value = db.reference(path).transaction(transaction)
+    except _Abort:
+        remember(path, found.get('value'))
+        return found.get('value'), False
+    remember(path, new_value)
+    return found.get('value'), True
+
+
+def create_if_absent(path, value):
+    """Write value only if nothing exists at path; returns True when it was written."""
+    def change(current):
+        if current is not None:
+            raise _Abort()
+        return value
+
+    return _transact(path, change)[1]
+
+
+def update_if_present(path, changes):
+    """Merge changes into the node at path if it exists; returns its previous value, or None if missing."""
+    def change(current):
+        if not isinstance(current, dict):
+            raise _Abort()
+        return {**current, **changes}
+
+    previous, written = _transact(path, change)
+    return previous if written else None
+
+
+def delete_if_present(path):
+    """Delete the node at path if it exists; returns its previous value, or None if it was missing.
+
+    A transaction cannot delete: firebase_admin refuses to write None. Instead this is an
+    ETag-guarded write of an empty object, which the database stores as no node at all.
+    """
+    ref = db.reference(path)
+    current, etag = ref.get(etag=True)
+    for _ in range(_MAX_RETRIES):
+        if current is None:
+            remember(path, None)
+            return None
+        written, latest, etag = ref.set_if_unchanged(etag, {})
+        if written:
+            remember(path, None)
+            return current
+        current = latest
+    raise TransactionAbortedError('Delete aborted after failed retries.')
+
+
+def set_if_unchanged(path, expected_etag, value):
+    """ETag-guarded set; returns (written, current_value, current_etag)."""
+    written, current, etag = db.reference(path).set_if_unchanged(expected_etag, value)
+    remember(path, value if written else current)
+    return written, current, etag
@@ -4,6 +4,7 @@ from flask import Blueprint
 import logging
 from app.utils.decorators import auth_required 
 from app.utils.decorators import role_required
+from app.metrics import INFERENCE_SECONDS
 
 
 pred_bp = Blueprint('pred_bp', __name__)
@@ -26,8 +27,10 @@ def predict_disease():
             if r not in data:
                 return jsonify({"error": f"Missing field: {r}"}), 400
 
-        prediction = model.predict(data)
-        logging.info(f"Prediction: {prediction} for input: {data}")
+        with INFERENCE_SECONDS.time('disease'):
+            prediction = model.predict(data)
+        logging.info("Disease prediction for user %s: %s", user_id, prediction)
+        logging.debug("Disease prediction input: %s", data)
         return jsonify({"prediction": prediction}), 200
 
     except Exception as e:
@@ -1,7 +1,26 @@
+import os
+import threading
 import firebase_admin
-from firebase_admin import credentials , db
+from firebase_admin import credentials
+from dotenv import load_dotenv
 
-cred =credentials.Certificate("jsonkey.json")
-firebase_admin.initialize_app(cred,{
-    'databaseURL' :'https://flask-16046-default-rtdb.firebaseio.com/'
-})
\ No newline at end of file
+load_dotenv()
+
+FIREBASE_CREDENTIALS = os.getenv('FIREBASE_CREDENTIALS', 'jsonkey.json')
+FIREBASE_DATABASE_URL = os.getenv('FIREBASE_DATABASE_URL', 'https://flask-16046-default-rtdb.firebaseio.com/')
+
+_initialized = False
+_lock = threading.Lock()
+
+
+def init_firebase():
+    """Initialize the default Firebase app on first use rather than at import time."""
+    global _initialized
+    if _initialized:
+        return
+    with _lock:
+        if not _initialized:
+            if not firebase_admin._apps:
+                cred = credentials.Certificate(FIREBASE_CREDENTIALS)
+                firebase_admin.initialize_app(cred, {'databaseURL': FIREBASE_DATABASE_URL})
+            _initialized = True
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify, g
 from app.utils.decorators import auth_required, role_required
-from firebase_admin import db
+from app.datastore.scoped import cached_get
+from app.utils.aggregates import cows_version, get_user_aggregates
+from app.utils.responses import conditional_on
 import logging
 
 home_bp = Blueprint('home_bp', __name__)
@@ -9,6 +11,7 @@ home_bp = Blueprint('home_bp', __name__)
 @home_bp.route('/', methods=['GET'])
 @auth_required
 @role_required('farmer')
+@conditional_on(lambda: cows_version(g.user['uid']))
 def home():
     """
     Home Dashboard Summary
@@ -48,39 +51,17 @@ def home():
               example: Unauthorized
     """
     user_id = g.user['uid']
-    logging.info(f"User {user_id} accessed the home route.")
+    logging.debug("User %s accessed the home route.", user_id)
 
-    user_ref = db.reference(f'users/{user_id}')
-    user_data = user_ref.get()
-
-    if not user_data or not isinstance(user_data, dict):
-        logging.warning(f"User data not found for user {user_id}")
+    if not cached_get(f'users/{user_id}/details'):
+        logging.warning("User data not found for user %s", user_id)
         return jsonify({'error': 'User not found'}), 404
 
-    cows = user_data.get('cows', {})
-    total_cows = 0
-    total_milk = 0
-
-    if isinstance(cows, dict):
-        total_cows = len(cows)
-        for cow_id, cow_data in cows.items():
-            if isinstance(cow_data, dict):
-                milk = cow_data.get('milk_production', 0)
-                logging.info(f"Cow {cow_id}: milk_production = {milk} (type: {type(milk)})")
-                if isinstance(milk, (int, float)):
-                    total_milk += milk
-                else:
-                    logging.warning(f"Invalid milk_production value for cow {cow_id}: {milk}")
-    elif isinstance(cows, list):
-        total_cows = len([cow for cow in cows if cow is not None])
-        for cow in cows:
-            if isinstance(cow, dict):
-                milk = cow.get('milk_production', 0)
-                logging.info(f"Cow (list): milk_production = {milk} (type: {type(milk)})")
-                if isinstance(milk, (int, float)):
-                    total_milk += milk
+    aggregates = get_user_aggregates(user_id)
+    total_cows = aggregates['cow_count']
+    total_milk = aggregates['total_milk']
 
-    logging.info(f"User {user_id} has {total_cows} cows with total milk production: {total_milk}Litre")
+    logging.info("User %s has %s cows with total milk production: %sLitre", user_id, total_cows, total_milk)
 
     return jsonify({
         "total_cows": total_cows,
@@ -89,47 +70,20 @@ def home():
 @home_bp.route('/healthsummary', methods=['GET'])
 @auth_required
 @role_required('farmer')
+@conditional_on(lambda: cows_version(g.user['uid']))
 def get_farmer_cows_health_summary():
     try:
         user_id = g.user['uid']   
-        logging.info(f"Fetching cow health summary for user: {user_id}")
-
-        cows_ref = db.reference(f'users/{user_id}/cows')
-        cows = cows_ref.get()
-
-        if not cows:
-            return jsonify({
-                "total_healthy_cows": 0,
-                "total_pregnant_cows": 0,
-                "total_low_milk_cows": 0,
-                "total_unhealthy_cows": 0
-            }), 200
-
-
-        healthy_count = 0
-        pregnant_count = 0
-        low_milk_count = 0
-        unhealthy_count = 0
-
-        for cow_id, cow_data in cows.items():
-            status = cow_data.get('health_status', '').lower()
-
-            if status == "healthy":
-                healthy_count += 1
-            elif status == "pregnant":
-                pregnant_count += 1
-            elif status in ["low milk", "low_milk"]:
-                low_milk_count += 1
-            elif status == "unhealthy":
-                unhealthy_count += 1
+        logging.debug("Fetching cow health summary for user: %s", user_id)
 
+        health = get_user_aggregates(user_id)['health']
         result = {
-            "total_healthy_cows": healthy_count,
-            "total_pregnant_cows": pregnant_count,
-            "total_low_milk_cows": low_milk_count,
-            "total_unhealthy_cows": unhealthy_count
+            "total_healthy_cows": health['healthy'],
+            "total_pregnant_cows": health['pregnant'],
+            "total_low_milk_cows": health['low_milk'],
+            "total_unhealthy_cows": health['unhealthy']
         }
-        logging.info(f"Cow health summary for user {user_id}: {result}")
+        logging.info("Cow health summary for user %s: %s", user_id, result)
         return jsonify(result), 200
 
     except Exception as e:
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, g
 from app.utils.decorators import auth_required
 from app.mLmodel.milk_prediction_model import predict_milk_yield
+from app.metrics import INFERENCE_SECONDS
 import logging
 
 predict_bp = Blueprint('predict_bp', __name__)
@@ -67,10 +68,11 @@ def predict():
     user_id = g.user['uid']
     try:
         data = request.get_json()
-        logging.info(f"User {user_id} sent data for prediction: {data}")
+        logging.debug("User %s sent data for prediction: %s", user_id, data)
         
-        prediction = predict_milk_yield(data)
-        logging.info(f"Prediction result for user {user_id}: {prediction:.2f} ")
+        with INFERENCE_SECONDS.time('milk_yield'):
+            prediction = predict_milk_yield(data)
+        logging.info("Prediction result for user %s: %.2f", user_id, prediction)
 
         return jsonify({
             'predicted_milk_yield': round(prediction, 2),
@@ -0,0 +1,272 @@
+"""Process-local metrics in the Prometheus text exposition format.
+
+Histograms and counters are plain dicts of per-label-set cells, updated under one short lock
+per metric, so recording costs a few microseconds. Each worker process keeps its own values
+and /metrics reports the worker that served the scrape.
+"""
+import os
+import hmac
+import time
+import inspect
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from dotenv import load_dotenv
+from flask import Response, g, has_request_context, jsonify, request
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+# When set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>".
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+JOB_BUCKETS = (0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+# Database path segments that name a subtree rather than a user, cow or timestamp. Every
+# other segment after the first becomes '*', which keeps the path label's cardinality small.
+SCHEMA_SEGMENTS = frozenset((
+    'details', 'cows', 'readings', 'aggregates', 'reading_blocks', 'retention', 'stats',
+    '_built', 'minute', 'hour', 'day',
+))
+MAX_PATH_DEPTH = 5
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._cells = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            cell = self._cells.get(labels)
+            if cell is None:
+                # Per-bucket (not cumulative) counts, then sum and count.
+                cell = self._cells[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            cell[index] += 1
+            cell[-2] += value
+            cell[-1] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            cells = sorted((labels, list(cell)) for labels, cell in self._cells.items())
+        for labels, cell in cells:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), cell):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(round(cell[-2], 6))}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cell[-1]}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Time to produce a response, by route pattern.',
+    ('blueprint', 'route', 'method', 'status'),
+)
+DATABASE_SECONDS = Histogram(
+    'firebase_db_call_duration_seconds', 'Realtime Database call latency, by operation and path pattern.',
+    ('operation', 'path'),
+)
+DATABASE_CALLS_PER_REQUEST = Histogram(
+    'firebase_db_calls_per_request', 'Realtime Database calls made while serving one request.',
+    ('blueprint', 'route'), buckets=COUNT_BUCKETS,
+)
+AUTH_SECONDS = Histogram('firebase_auth_call_duration_seconds', 'Firebase Auth call latency.', ('operation',))
+INFERENCE_SECONDS = Histogram(
+    'model_inference_duration_seconds', 'Time spent in model prediction.', ('model',),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+JOB_SECONDS = Histogram('scheduler_job_duration_seconds', 'Scheduled job run time.', ('job',), buckets=JOB_BUCKETS)
+JOB_FAILURES = Counter('scheduler_job_failures_total', 'Scheduled job runs that raised.', ('job',))
+
+
+def path_pattern(path):
+    segments = [segment for segment in str(path or '').split('/') if segment][:MAX_PATH_DEPTH]
+    if not segments:
+        return '/'
+    return '/'.join(segments[:1] + [segment if segment in SCHEMA_SEGMENTS else '*' for segment in segments[1:]])
+
+
+class _TimedReference:
+    """Wraps a database reference or query so get/set/update/... calls are timed and counted."""
+
+    TIMED = frozenset(('get', 'set', 'update', 'delete', 'push', 'transaction', 'get_if_changed', 'set_if_unchanged'))
+
+    def __init__(self, target, path):
+        self._target = target
+        self._path = path
+        self._pattern = path_pattern(path)
+
+    def child(self, path):
+        return _TimedReference(self._target.child(path), f"{self._path}/{path}")
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+        if name in self.TIMED:
+            def timed(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return attribute(*args, **kwargs)
+                finally:
+                    elapsed = time.perf_counter() - started
+                    DATABASE_SECONDS.observe(elapsed, name, self._pattern)
+                    if has_request_context():
+                        g._database_calls = g.get('_database_calls', 0) + 1
+                        # Set only while app.profiling is capturing this request.
+                        trace = g.get('_database_trace')
+                        if trace is not None:
+                            trace.append((name, self._path, elapsed))
+            return timed
+        if name.startswith(('order_by_', 'start_at', 'end_at', 'equal_to', 'limit_to_')):
+            # Query builders return a query (or the same query); keep timing its get().
+            def chained(*args, **kwargs):
+                return _TimedReference(attribute(*args, **kwargs), self._path)
+            return chained
+        return attribute
+
+
+def timed_reference(reference, path):
+    if not METRICS_ENABLED:
+        return reference
+    return _TimedReference(reference, path)
+
+
+def timed_auth(name, attribute):
+    # Exception classes are callable too; only functions are timed.
+    if not METRICS_ENABLED or not inspect.isroutine(attribute):
+        return attribute
+
+    @wraps(attribute)
+    def timed(*args, **kwargs):
+        with AUTH_SECONDS.time(name):
+            return attribute(*args, **kwargs)
+    return timed
+
+
+def timed_job(name):
+    """Decorator for scheduler jobs: records run time, and failures before re-raising."""
+    def decorator(job):
+        @wraps(job)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return job(*args, **kwargs)
+            except Exception:
+                JOB_FAILURES.inc(name)
+                raise
+            finally:
+                JOB_SECONDS.observe(time.perf_counter() - started, name)
+        return wrapper
+    return decorator
+
+
+def _route():
+    rule = request.url_rule
+    return request.blueprint or '', rule.rule if rule is not None else 'unmatched'
+
+
+def _start_timer():
+    g._request_started = time.perf_counter()
+
+
+def _record(status):
+    started = g.pop('_request_started', None)
+    if started is None:
+        return
+    blueprint, route = _route()
+    REQUEST_SECONDS.observe(time.perf_counter() - started, blueprint, route, request.method, str(status))
+    DATABASE_CALLS_PER_REQUEST.observe(g.pop('_database_calls', 0), blueprint, route)
+
+
+def _after_request(response):
+    _record(response.status_code)
+    return response
+
+
+def _teardown_request(exc):
+    # Only still pending when an unhandled exception skipped after_request.
+    if exc is not None:
+        _record(500)
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view():
+    if METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '').replace('Bearer ', '')
+        if not hmac.compare_digest(supplied, METRICS_TOKEN):
+            return jsonify({'error': 'Unauthorized'}), 401
+    return Response(render(), mimetype='text/plain; version=0.0.4')
+
+
+def register_metrics(app):
+    if not METRICS_ENABLED:
+        return
+    app.before_request(_start_timer)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
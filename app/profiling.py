@@ -0,0 +1,165 @@
+"""Opt-in cProfile capture of individual requests.
+
+A request is profiled when PROFILING_ENABLED is true and one of these applies:
+- an admin sends the X-Profile header;
+- the caller is listed in PROFILE_USER_IDS;
+- it is picked at PROFILE_SAMPLE_RATE.
+
+Each capture writes a pstats dump (<id>.prof) and a JSON summary (<id>.json). The summary
+holds the route, timings, every Realtime Database call and the top functions. Only the newest
+PROFILE_MAX_FILES captures are kept. The response carries X-Profile-Id, and admins can fetch
+captures under /admin/profiles. When disabled, no hooks are registered.
+
+cProfile hooks the whole OS thread, which gevent workers share between requests, so only one
+capture runs per process at a time and requests selected meanwhile are served unprofiled. A
+capture still counts functions of other greenlets that run while it is active.
+"""
+import os
+import io
+import re
+import json
+import time
+import uuid
+import random
+import pstats
+import cProfile
+import logging
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+from flask import g, request
+from app.utils.decorators import _current_user
+from app.utils.roles import get_role
+
+load_dotenv()
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILE_HEADER = 'X-Profile'
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_USER_IDS = frozenset(uid.strip() for uid in os.getenv('PROFILE_USER_IDS', '').split(',') if uid.strip())
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(os.path.dirname(__file__), 'profiles'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 200))
+PROFILE_TOP_FUNCTIONS = int(os.getenv('PROFILE_TOP_FUNCTIONS', 40))
+
+PROFILE_ID_RE = re.compile(r'^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$')
+
+_active = threading.Lock()
+
+
+def _reason():
+    if request.headers.get(PROFILE_HEADER) or PROFILE_USER_IDS:
+        user = _current_user()
+        if user:
+            if request.headers.get(PROFILE_HEADER) and get_role(user['uid']) == 'admin':
+                return 'header'
+            if user['uid'] in PROFILE_USER_IDS:
+                return 'user'
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return 'sampled'
+    return None
+
+
+def _start():
+    reason = _reason()
+    if reason is None:
+        return
+    if not _active.acquire(blocking=False):
+        logging.info("Profile of %s %s skipped: another capture is running", request.method, request.path)
+        return
+    g._database_trace = []
+    g._profile = {'reason': reason, 'profiler': cProfile.Profile(), 'started': time.perf_counter()}
+    g._profile['profiler'].enable()
+
+
+def _top_functions(stats):
+    buffer = io.StringIO()
+    stats.stream = buffer
+    stats.sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+    return buffer.getvalue()
+
+
+def _prune():
+    names = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith('.json'))
+    for name in names[:max(len(names) - PROFILE_MAX_FILES, 0)]:
+        for suffix in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name[:-5] + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def _save(state, status):
+    profile_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    profiler = state['profiler']
+    stats = pstats.Stats(profiler)
+    trace = g.pop('_database_trace', None) or []
+    user = g.get('user') or {}
+    summary = {
+        'id': profile_id,
+        'reason': state['reason'],
+        'method': request.method,
+        'path': request.path,
+        'route': request.url_rule.rule if request.url_rule is not None else None,
+        'user_id': user.get('uid'),
+        'status': status,
+        'duration_ms': round((time.perf_counter() - state['started']) * 1000, 2),
+        'database_calls': [
+            {'operation': operation, 'path': path, 'ms': round(elapsed * 1000, 2)} for operation, path, elapsed in trace
+        ],
+        'database_ms': round(sum(elapsed for _, _, elapsed in trace) * 1000, 2),
+        'top_functions': _top_functions(stats),
+        'created_at': datetime.utcnow().isoformat() + 'Z',
+    }
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profiler.dump_stats(os.path.join(PROFILE_DIR, f'{profile_id}.prof'))
+    with open(os.path.join(PROFILE_DIR, f'{profile_id}.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f)
+    _prune()
+    logging.info("Request profiled: %s %s took %sms (%s)", request.method, request.path, summary['duration_ms'], profile_id)
+    return profile_id
+
+
+def _finish(response):
+    state = g.pop('_profile', None)
+    if state is None:
+        return response
+    state['profiler'].disable()
+    _active.release()
+    try:
+        response.headers['X-Profile-Id'] = _save(state, response.status_code)
+    except Exception:
+        logging.exception("Failed to save request profile")
+    return response
+
+
+def list_profiles(limit=100):
+    """Newest first: the JSON summaries without their function listings."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    summaries = []
+    for name in sorted((name for name in os.listdir(PROFILE_DIR) if name.endswith('.json')), reverse=True)[:limit]:
+        try:
+            with open(os.path.join(PROFILE_DIR, name), encoding='utf-8') as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            continue
+        summary.pop('top_functions', None)
+        summary['database_calls'] = len(summary.get('database_calls', []))
+        summaries.append(summary)
+    return summaries
+
+
+def profile_file(profile_id, suffix):
+    """Path of a capture's .json or .prof file, or None if the id is malformed or unknown."""
+    if not PROFILE_ID_RE.match(profile_id or ''):
+        return None
+    path = os.path.join(PROFILE_DIR, profile_id + suffix)
+    return path if os.path.isfile(path) else None
+
+
+def register_profiling(app):
+    if not PROFILING_ENABLED:
+        return
+    app.before_request(_start)
+    app.after_request(_finish)
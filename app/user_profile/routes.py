@@ -1,10 +1,15 @@
 from flask import Blueprint,request,jsonify,g
-from firebase_admin import auth as firebase_auth, db
+from app.datastore import auth as firebase_auth
 from app.utils.auth_helper import generate_token, verify_token
 from datetime import datetime
 from app.utils.decorators import auth_required ,role_required
+from app.datastore.scoped import cached_get, update_if_present
+from app.utils.directory import record_user_updated
 import logging
 user_bp = Blueprint('user', __name__)
+# The only details users may change about themselves; the role and password hash are not among them.
+PROFILE_FIELDS = ('name', 'email')
+
 @user_bp.route('/profile', methods=['GET'])
 @auth_required
 @role_required(['farmer'])
@@ -57,11 +62,10 @@ def get_user_profile():
               example: Failed to fetch profile
     """
     user_id = g.user['uid']
-    logging.info(f"Fetching profile for user_id: {user_id}")
+    logging.debug("Fetching profile for user_id: %s", user_id)
 
     try:
-        user_ref = db.reference(f'users/{user_id}/details')
-        user_profile = user_ref.get()
+        user_profile = cached_get(f'users/{user_id}/details')
 
         if not user_profile:
             logging.warning(f"User profile not found for user_id: {user_id}")
@@ -74,7 +78,7 @@ def get_user_profile():
             'user_id': user_profile.get('user_id')
         }
 
-        logging.info(f"Profile fetched successfully for user_id: {user_id}")
+        logging.info("Profile fetched successfully for user_id: %s", user_id)
         return jsonify({'profile': profile_data}), 200
 
     except Exception as e:
@@ -94,12 +98,17 @@ def update_user_profile():
             logging.warning(f"Invalid input data for user_id: {user_id} | Data: {data}")
             return jsonify({'error': 'Invalid input data'}), 400
 
-        user_ref = db.reference(f'users/{user_id}/details')
-        if not user_ref.get():
+        if 'role' in data:
+            logging.warning(f"Profile update rejected: user_id {user_id} tried to set role {data['role']!r}")
+            return jsonify({'error': 'Role cannot be changed through a profile update'}), 403
+
+        changes = {field: data[field] for field in PROFILE_FIELDS}
+        current_details = update_if_present(f'users/{user_id}/details', changes)
+        if not current_details:
             logging.warning(f"User not found during profile update | user_id: {user_id}")
             return jsonify({'error': 'User not found'}), 404
 
-        user_ref.update(data)
+        record_user_updated(user_id, current_details, changes)
         logging.info(f"Profile updated successfully for user_id: {user_id}")
         return jsonify({'message': 'Profile updated successfully'}), 200
 
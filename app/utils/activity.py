@@ -0,0 +1,117 @@
+import os
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ACCEL_THRESHOLD = float(os.getenv('ACCEL_THRESHOLD', 1.5))
+GYRO_THRESHOLD = float(os.getenv('GYRO_THRESHOLD', 0.8))
+# A sample is assumed to describe the cow until the next one, but never for longer than this.
+MAX_SAMPLE_GAP_SECONDS = float(os.getenv('ACTIVITY_MAX_GAP_SECONDS', 60))
+MIN_BOUT_SECONDS = float(os.getenv('ACTIVITY_MIN_BOUT_SECONDS', 60))
+
+ACTIVITY_LEVELS = ('Low', 'Medium', 'High')
+LOW, MEDIUM, HIGH = range(3)
+
+
+def magnitude(x, y, z):
+    x, y, z = np.asarray(x), np.asarray(y), np.asarray(z)
+    return np.sqrt(x * x + y * y + z * z)
+
+
+def classify_activity(accel_magnitude, gyro_magnitude, accel_threshold=ACCEL_THRESHOLD, gyro_threshold=GYRO_THRESHOLD):
+    """Classify every sample as LOW/MEDIUM/HIGH in one vectorized pass."""
+    accel = np.asarray(accel_magnitude)
+    gyro = np.asarray(gyro_magnitude)
+    high = (accel > accel_threshold) | (gyro > gyro_threshold)
+    medium = (accel > accel_threshold * 0.5) | (gyro > gyro_threshold * 0.5)
+    return np.where(high, HIGH, np.where(medium, MEDIUM, LOW)).astype(np.int8)
+
+
+def activity_level(accel_magnitude, gyro_magnitude):
+    return ACTIVITY_LEVELS[int(classify_activity(accel_magnitude, gyro_magnitude))]
+
+
+def _iso(epoch_ms):
+    """Format epoch milliseconds (scalar or array) as ISO-8601 UTC strings without a Python loop."""
+    text = np.datetime_as_string(np.asarray(epoch_ms, dtype='datetime64[ms]'), unit='s')
+    return np.char.add(text, 'Z')
+
+
+def _runs(values, breaks):
+    """Start/end (exclusive) indices of runs of equal values, also split wherever breaks is True."""
+    change = (values[1:] != values[:-1]) | breaks
+    starts = np.r_[0, np.flatnonzero(change) + 1]
+    ends = np.r_[starts[1:], values.size]
+    return starts, ends
+
+
+def _segments(timestamps, durations, seconds, labels, starts, ends):
+    last = ends - 1
+    start_text = _iso(timestamps[starts]).tolist()
+    end_text = _iso(timestamps[last] + (durations[last] * 1000).astype(np.int64)).tolist()
+    samples = (ends - starts).tolist()
+    seconds = np.round(seconds, 1).tolist()
+    return [
+        {
+            'level': labels[i],
+            'start': start_text[i],
+            'end': end_text[i],
+            'duration_seconds': seconds[i],
+            'samples': samples[i],
+        }
+        for i in range(len(samples))
+    ]
+
+
+def activity_timeline(arrays, max_gap_seconds=MAX_SAMPLE_GAP_SECONDS, min_bout_seconds=MIN_BOUT_SECONDS):
+    """Build an activity timeline from reading arrays (see block_storage.load_readings).
+
+    Returns per-state totals, the run-length encoded timeline and active bouts: stretches of
+    Medium or High activity lasting at least min_bout_seconds without a data gap.
+    """
+    timestamps = arrays['timestamp']
+    if timestamps.size == 0:
+        return {
+            'samples': 0,
+            'time_in_state': {level: 0.0 for level in ACTIVITY_LEVELS},
+            'timeline': [],
+            'bouts': [],
+        }
+
+    levels = classify_activity(
+        magnitude(arrays['accel_x'], arrays['accel_y'], arrays['accel_z']),
+        magnitude(arrays['gyro_x'], arrays['gyro_y'], arrays['gyro_z']),
+    )
+
+    gaps = np.diff(timestamps) / 1000.0
+    typical = float(np.median(gaps)) if gaps.size else 0.0
+    durations = np.minimum(np.r_[gaps, typical], max_gap_seconds)
+    breaks = gaps > max_gap_seconds
+
+    totals = np.bincount(levels, weights=durations, minlength=len(ACTIVITY_LEVELS))
+
+    starts, ends = _runs(levels, breaks)
+    run_labels = [ACTIVITY_LEVELS[level] for level in levels[starts]]
+    timeline = _segments(timestamps, durations, np.add.reduceat(durations, starts), run_labels, starts, ends)
+
+    active = levels >= MEDIUM
+    bout_starts, bout_ends = _runs(active, breaks)
+    is_active = active[bout_starts]
+    bout_seconds = np.add.reduceat(durations, bout_starts)
+    keep = is_active & (bout_seconds >= min_bout_seconds)
+    peak = np.maximum.reduceat(levels, bout_starts)
+    bouts = _segments(
+        timestamps, durations, bout_seconds[keep],
+        [ACTIVITY_LEVELS[level] for level in peak[keep]],
+        bout_starts[keep], bout_ends[keep],
+    )
+
+    return {
+        'samples': int(timestamps.size),
+        'start': str(_iso(timestamps[0])),
+        'end': str(_iso(timestamps[-1])),
+        'time_in_state': {level: round(float(total), 1) for level, total in zip(ACTIVITY_LEVELS, totals)},
+        'timeline': timeline,
+        'bouts': bouts,
+    }
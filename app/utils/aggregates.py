@@ -0,0 +1,120 @@
+import logging
+from datetime import datetime
+from app.datastore import db
+from app.datastore.scoped import cached_get, invalidate, remember
+
+HEALTH_BUCKETS = ('healthy', 'pregnant', 'low_milk', 'unhealthy', 'other')
+
+
+def aggregates_path(user_id):
+    return f"users/{user_id}/aggregates"
+
+
+def health_bucket(status):
+    status = str(status or '').strip().lower()
+    if status in ('low milk', 'low_milk'):
+        return 'low_milk'
+    return status if status in HEALTH_BUCKETS else 'other'
+
+
+def _milk(cow):
+    milk = cow.get('milk_production', 0)
+    return milk if isinstance(milk, (int, float)) and not isinstance(milk, bool) else 0
+
+
+def empty_aggregates():
+    return {'cow_count': 0, 'total_milk': 0, 'health': {bucket: 0 for bucket in HEALTH_BUCKETS}}
+
+
+def _apply(aggregates, cow, sign):
+    aggregates['cow_count'] += sign
+    aggregates['total_milk'] = round(aggregates['total_milk'] + sign * _milk(cow), 3)
+    bucket = health_bucket(cow.get('health_status'))
+    aggregates['health'][bucket] = aggregates['health'].get(bucket, 0) + sign
+
+
+def _normalize(aggregates):
+    normalized = empty_aggregates()
+    normalized['cow_count'] = aggregates.get('cow_count', 0)
+    normalized['total_milk'] = aggregates.get('total_milk', 0)
+    normalized['health'].update(aggregates.get('health') or {})
+    return normalized
+
+
+def compute_aggregates(cows):
+    aggregates = empty_aggregates()
+    if isinstance(cows, list):
+        cows = {str(index): cow for index, cow in enumerate(cows) if cow is not None}
+    for cow in (cows or {}).values():
+        if isinstance(cow, dict):
+            _apply(aggregates, cow, 1)
+    return aggregates
+
+
+def rebuild_user_aggregates(user_id):
+    aggregates = compute_aggregates(db.reference(f'users/{user_id}/cows').get())
+    aggregates['updated_at'] = datetime.utcnow().isoformat() + 'Z'
+    db.reference(aggregates_path(user_id)).set(aggregates)
+    remember(aggregates_path(user_id), aggregates)
+    logging.info(f"Aggregates rebuilt for user {user_id}: {aggregates}")
+    return aggregates
+
+
+class _NotMaterialized(Exception):
+    pass
+
+
+def apply_cow_change(user_id, old_cow=None, new_cow=None):
+    """Transactionally move a cow's contribution from old_cow to new_cow (either may be None)."""
+    apply_cow_changes(user_id, [(old_cow, new_cow)])
+
+
+def apply_cow_changes(user_id, changes):
+    """Apply several (old_cow, new_cow) changes to the user's aggregates in a single transaction."""
+    def transaction(current):
+        if current is None:
+            # Raising aborts the transaction without writing; firebase_admin refuses to write None.
+            raise _NotMaterialized()
+        aggregates = _normalize(current)
+        for old_cow, new_cow in changes:
+            if old_cow:
+                _apply(aggregates, old_cow, -1)
+            if new_cow:
+                _apply(aggregates, new_cow, 1)
+        aggregates['updated_at'] = datetime.utcnow().isoformat() + 'Z'
+        return aggregates
+
+    try:
+        invalidate(aggregates_path(user_id))
+        try:
+            db.reference(aggregates_path(user_id)).transaction(transaction)
+        except _NotMaterialized:
+            # Never materialized for this user: count from scratch, which already includes this change.
+            rebuild_user_aggregates(user_id)
+    except Exception:
+        logging.exception(f"Failed to update aggregates for user {user_id}; invalidating")
+        invalidate(aggregates_path(user_id))
+        try:
+            # The next read rebuilds them from the cows subtree.
+            db.reference(aggregates_path(user_id)).delete()
+        except Exception:
+            logging.exception(f"Failed to invalidate aggregates for user {user_id}")
+
+
+def _stored_aggregates(user_id):
+    aggregates = cached_get(aggregates_path(user_id))
+    if aggregates is not None:
+        return aggregates
+    if not cached_get(f'users/{user_id}/details'):
+        # Unknown user (or an orphaned subtree): count without materializing anything under users/{uid}.
+        return compute_aggregates(db.reference(f'users/{user_id}/cows').get())
+    return rebuild_user_aggregates(user_id)
+
+
+def get_user_aggregates(user_id):
+    return _normalize(_stored_aggregates(user_id))
+
+
+def cows_version(user_id):
+    """Changes whenever any of the user's cows is added, updated or deleted through the API."""
+    return _stored_aggregates(user_id).get('updated_at')
@@ -0,0 +1,157 @@
+import os
+import copy
+import math
+import logging
+import threading
+from dotenv import load_dotenv
+from app.datastore import db
+from app.utils.readings import parse_timestamp, vector_magnitude
+
+load_dotenv()
+
+EWMA_ALPHA = float(os.getenv('ANOMALY_EWMA_ALPHA', 0.2))
+# Welford counts are capped at this many samples, so the baseline keeps adapting
+# (older samples decay with weight ~1/window) while state stays O(1) per cow.
+BASELINE_WINDOW = int(os.getenv('ANOMALY_BASELINE_WINDOW', 720))
+WARMUP_SAMPLES = int(os.getenv('ANOMALY_WARMUP_SAMPLES', 60))
+Z_THRESHOLD = float(os.getenv('ANOMALY_Z_THRESHOLD', 3.0))
+CUSUM_K = float(os.getenv('ANOMALY_CUSUM_K', 0.5))
+CUSUM_H = float(os.getenv('ANOMALY_CUSUM_H', 5.0))
+# After this many flags in one excursion (the CUSUMs never settling back to zero in between),
+# the shift is taken as the cow's new level and the baseline is relearned, instead of
+# alerting on it every cooldown forever.
+ADAPT_AFTER_FLAGS = int(os.getenv('ANOMALY_ADAPT_AFTER_FLAGS', 60))
+FEVER_TEMPERATURE = float(os.getenv('FEVER_TEMPERATURE', 39.5))
+ALERT_COOLDOWN_SECONDS = int(os.getenv('ANOMALY_ALERT_COOLDOWN_SECONDS', 1800))
+MIN_STD = {'temperature': 0.05, 'activity': 0.05}
+
+SIGNALS = ('temperature', 'activity')
+
+_states = {}
+_lock = threading.Lock()
+
+
+def state_path(user_id, cow_id):
+    return f"anomaly_state/{user_id}/{cow_id}"
+
+
+def alerts_path(user_id, cow_id):
+    return f"alerts/{user_id}/{cow_id}"
+
+
+def forget_cow(user_id, cow_id):
+    with _lock:
+        _states.pop((user_id, cow_id), None)
+
+
+def _new_signal():
+    return {'n': 0, 'mean': 0.0, 'm2': 0.0, 'ewma': None, 'cusum_pos': 0.0, 'cusum_neg': 0.0, 'flagged': 0}
+
+
+def _state_from(stored):
+    state = {signal: {**_new_signal(), **(stored.get(signal) or {})} for signal in SIGNALS}
+    state['last_alert'] = stored.get('last_alert') or {}
+    return state
+
+
+def _std(stats, signal):
+    variance = stats['m2'] / (stats['n'] - 1) if stats['n'] > 1 else 0.0
+    return max(math.sqrt(variance), MIN_STD[signal])
+
+
+def _welford(stats, value):
+    stats['n'] = min(stats['n'] + 1, BASELINE_WINDOW)
+    delta = value - stats['mean']
+    stats['mean'] += delta / stats['n']
+    stats['m2'] += delta * (value - stats['mean'])
+    if stats['n'] == BASELINE_WINDOW:
+        # Keep m2 consistent with the capped count so the variance also forgets old samples.
+        stats['m2'] *= (BASELINE_WINDOW - 1) / BASELINE_WINDOW
+
+
+def update_signal(stats, signal, value):
+    """Feed one value through EWMA, CUSUM and the Welford baseline; return (direction, detector, score) or None."""
+    stats['ewma'] = value if stats['ewma'] is None else EWMA_ALPHA * value + (1 - EWMA_ALPHA) * stats['ewma']
+
+    finding = None
+    if stats['n'] >= WARMUP_SAMPLES:
+        std = _std(stats, signal)
+        z = (value - stats['mean']) / std
+        ewma_z = (stats['ewma'] - stats['mean']) / std
+        stats['cusum_pos'] = max(0.0, stats['cusum_pos'] + z - CUSUM_K)
+        stats['cusum_neg'] = max(0.0, stats['cusum_neg'] - z - CUSUM_K)
+
+        if abs(ewma_z) > Z_THRESHOLD:
+            finding = ('high' if ewma_z > 0 else 'low', 'ewma', ewma_z)
+        elif stats['cusum_pos'] > CUSUM_H:
+            finding = ('high', 'cusum', stats['cusum_pos'])
+        elif stats['cusum_neg'] > CUSUM_H:
+            finding = ('low', 'cusum', -stats['cusum_neg'])
+
+        if finding:
+            stats['cusum_pos'] = stats['cusum_neg'] = 0.0
+            stats['flagged'] += 1
+            if stats['flagged'] < ADAPT_AFTER_FLAGS:
+                # Anomalous samples are kept out of the baseline so a fever does not become "normal".
+                return finding
+            # The shift has lasted long enough to be the new normal: relearn the baseline from here.
+            stats.update(n=0, mean=0.0, m2=0.0, flagged=0)
+        elif not stats['cusum_pos'] and not stats['cusum_neg']:
+            stats['flagged'] = 0
+
+    _welford(stats, value)
+    return finding
+
+
+def detect_anomalies(user_id, cow_id, data):
+    """Update the cow's online detectors with one reading and persist state plus any alerts."""
+    try:
+        timestamp = parse_timestamp(data['timestamp'])
+        values = {
+            'temperature': float(data['temperature']),
+            'activity': vector_magnitude(data['accelerometer']) + vector_magnitude(data['gyroscope']),
+        }
+
+        cow_key = (user_id, cow_id)
+        # Database round trips happen outside the lock, so one cow's I/O never holds up another's.
+        stored = None if cow_key in _states else _state_from(db.reference(state_path(user_id, cow_id)).get() or {})
+
+        with _lock:
+            state = _states.setdefault(cow_key, stored or _state_from({}))
+            findings = []
+            for signal, value in values.items():
+                result = update_signal(state[signal], signal, value)
+                if result:
+                    findings.append((f"{signal}_{result[0]}", signal, result[1], result[2]))
+            if values['temperature'] >= FEVER_TEMPERATURE:
+                findings.append(('fever', 'temperature', 'threshold', values['temperature']))
+
+            alerts = {}
+            epoch = timestamp.timestamp()
+            for alert_type, signal, detector, score in findings:
+                if epoch - state['last_alert'].get(alert_type, 0) < ALERT_COOLDOWN_SECONDS:
+                    continue
+                state['last_alert'][alert_type] = epoch
+                alerts[f"{timestamp.strftime('%Y-%m-%dT%H-%M-%SZ')}_{alert_type}"] = {
+                    'type': alert_type,
+                    'signal': signal,
+                    'detector': detector,
+                    'score': round(score, 3),
+                    'value': round(values[signal], 3),
+                    'baseline_mean': round(state[signal]['mean'], 3),
+                    'baseline_std': round(_std(state[signal], signal), 3),
+                    'timestamp': data['timestamp'],
+                }
+
+            snapshot = copy.deepcopy(state)
+
+        updates = {state_path(user_id, cow_id): snapshot}
+        updates.update({f"{alerts_path(user_id, cow_id)}/{key}": alert for key, alert in alerts.items()})
+        db.reference().update(updates)
+
+        for alert in alerts.values():
+            logging.warning(f"Anomaly detected for cow '{cow_id}' of user {user_id}: {alert}")
+        return list(alerts.values())
+    except Exception:
+        logging.exception(f"Anomaly detection failed for cow '{cow_id}'")
+        return []
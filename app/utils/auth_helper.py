@@ -1,18 +1,50 @@
 import jwt
 import datetime
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
 from dotenv import load_dotenv
+from app.datastore import db
 import os
 import logging
 
 load_dotenv()
 SECRET_KEY = os.getenv('SECRET_KEY')
 
-def generate_token(uid):
+# Verified tokens are cached by digest so repeat requests skip the HMAC check. Entries are
+# re-verified after TOKEN_CACHE_TTL_SECONDS, which also picks up revocations made by other
+# workers through revoked_tokens/{digest}.
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv('TOKEN_CACHE_TTL_SECONDS', 60))
+REVOKED_TOKENS_PATH = 'revoked_tokens'
+
+# Access tokens are short-lived; clients renew them through /auth/refresh with a refresh
+# token, which is opaque, single-use and stored only as a digest under refresh_tokens.
+ACCESS_TOKEN_MINUTES = int(os.getenv('ACCESS_TOKEN_MINUTES', 15))
+REFRESH_TOKEN_DAYS = int(os.getenv('REFRESH_TOKEN_DAYS', 30))
+REFRESH_TOKENS_PATH = 'refresh_tokens'
+
+_verified = OrderedDict()
+_revoked = {}
+_lock = threading.Lock()
+
+
+def token_digest(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def generate_token(uid, role=None):
     try:
         payload = {
             'uid': uid,
-            'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=10),
+            'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=ACCESS_TOKEN_MINUTES),
+            # Unique per token, so revoking one token never revokes another issued in the same second.
+            'jti': secrets.token_hex(8),
         }
+        if role:
+            payload['role'] = role
         token = jwt.encode(payload, SECRET_KEY, algorithm='HS256')
         logging.info(f"Token generated for user_id: {uid}")
         return token
@@ -20,17 +52,135 @@ def generate_token(uid):
         logging.error(f"Failed to generate token for user_id: {uid} | Error: {str(e)}", exc_info=True)
         raise
 
+
+def _cached_claims(digest, now):
+    with _lock:
+        if _revoked.get(digest, 0) > now:
+            raise jwt.InvalidTokenError("Token has been revoked.")
+        entry = _verified.get(digest)
+        if entry is None:
+            return None
+        claims, checked_until = entry
+        if claims['exp'] <= now:
+            del _verified[digest]
+            raise jwt.ExpiredSignatureError("Token has expired.")
+        if checked_until <= now:
+            del _verified[digest]
+            return None
+        _verified.move_to_end(digest)
+        return claims
+
+
+def _remember(digest, claims, now):
+    with _lock:
+        _verified[digest] = (claims, min(claims['exp'], now + TOKEN_CACHE_TTL_SECONDS))
+        _verified.move_to_end(digest)
+        while len(_verified) > TOKEN_CACHE_SIZE:
+            _verified.popitem(last=False)
+
+
 def verify_token(token):
     try:
-        decoded = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-        logging.info(f"Token verified successfully for user_id: {decoded.get('uid')}")
+        digest = token_digest(token)
+        now = time.time()
+        claims = _cached_claims(digest, now)
+        if claims is not None:
+            return claims
+
+        decoded = jwt.decode(token, SECRET_KEY, algorithms=['HS256'], options={'require': ['exp']})
+        try:
+            revoked_until = db.reference(f'{REVOKED_TOKENS_PATH}/{digest}').get()
+        except Exception as e:
+            # Fall back to this process's revocations (already checked above) rather than failing
+            # every authenticated request; the token is not cached, so the next request re-checks.
+            logging.warning(f"Revocation lookup failed; using local revocations only | Error: {str(e)}")
+            return decoded
+        if revoked_until:
+            with _lock:
+                _revoked[digest] = revoked_until
+            raise jwt.InvalidTokenError("Token has been revoked.")
+
+        _remember(digest, decoded, now)
+        logging.debug("Token verified successfully for user_id: %s", decoded.get('uid'))
         return decoded
     except jwt.ExpiredSignatureError as e:
         logging.warning("Token verification failed: Token has expired.")
         raise jwt.ExpiredSignatureError("Token has expired.")
     except jwt.InvalidTokenError as e:
-        logging.warning("Token verification failed: Invalid token.")
-        raise jwt.InvalidTokenError("Invalid token.")
+        logging.warning("Token verification failed: %s", e)
+        raise jwt.InvalidTokenError(str(e) or "Invalid token.")
     except Exception as e:
         logging.error(f"Unexpected error during token verification | Error: {str(e)}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
+
+
+def revoke_token(token):
+    """Invalidate a token until it expires, in this process and (via the database) in every other one."""
+    claims = verify_token(token)
+    digest = token_digest(token)
+    now = time.time()
+    with _lock:
+        _verified.pop(digest, None)
+        _revoked[digest] = claims['exp']
+        for expired in [key for key, exp in _revoked.items() if exp <= now]:
+            del _revoked[expired]
+
+    db.reference(REVOKED_TOKENS_PATH).update({digest: claims['exp']})
+    logging.info(f"Token revoked for user_id: {claims.get('uid')}")
+
+
+def issue_refresh_token(uid):
+    token = secrets.token_urlsafe(32)
+    now = time.time()
+    db.reference(f'{REFRESH_TOKENS_PATH}/{token_digest(token)}').set({
+        'uid': uid,
+        'created_at': now,
+        'expires_at': now + REFRESH_TOKEN_DAYS * 86400,
+    })
+    return token
+
+
+def consume_refresh_token(token):
+    """Atomically mark a refresh token used and return its uid; raise InvalidTokenError if it is unknown, used or expired.
+
+    The node is not deleted, since a transaction cannot write None. It is marked used and
+    expired instead, and prune_expired_tokens removes it later.
+    """
+    now = time.time()
+
+    def consume(current):
+        if not current:
+            raise jwt.InvalidTokenError("Invalid refresh token.")
+        if current.get('used_at'):
+            raise jwt.InvalidTokenError(f"Refresh token for user_id {current['uid']} has already been used.")
+        if current['expires_at'] <= now:
+            raise jwt.ExpiredSignatureError(f"Refresh token for user_id {current['uid']} has expired.")
+        return {**current, 'used_at': now, 'expires_at': now}
+
+    try:
+        node = db.reference(f'{REFRESH_TOKENS_PATH}/{token_digest(token)}').transaction(consume)
+    except jwt.InvalidTokenError as e:
+        logging.warning(f"Refresh token rejected: {e}")
+        raise
+    return node['uid']
+
+
+def revoke_user_refresh_tokens(uid):
+    tokens = db.reference(REFRESH_TOKENS_PATH).order_by_child('uid').equal_to(uid).get() or {}
+    if tokens:
+        db.reference(REFRESH_TOKENS_PATH).update({digest: None for digest in tokens})
+    return len(tokens)
+
+
+def prune_expired_tokens():
+    """Delete expired or used refresh tokens and expired revocations; returns (refresh_tokens, revocations) removed."""
+    now = time.time()
+    refresh_ref = db.reference(REFRESH_TOKENS_PATH)
+    revoked_ref = db.reference(REVOKED_TOKENS_PATH)
+    expired_refresh = refresh_ref.order_by_child('expires_at').end_at(now).get() or {}
+    expired_revoked = revoked_ref.order_by_value().end_at(now).get() or {}
+    if expired_refresh:
+        refresh_ref.update({digest: None for digest in expired_refresh})
+    if expired_revoked:
+        revoked_ref.update({digest: None for digest in expired_revoked})
+    return len(expired_refresh), len(expired_revoked)
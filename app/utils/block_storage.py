@@ -0,0 +1,242 @@
+import base64
+import logging
+import os
+import numpy as np
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from app.datastore import db
+from app.utils.readings import parse_timestamp, readings_path
+
+load_dotenv()
+
+# 'nested' keeps one JSON node per reading (legacy), 'blocked' packs readings into
+# fixed-duration columnar blocks, 'both' writes both layouts during a migration.
+READINGS_STORAGE = os.getenv('READINGS_STORAGE', 'nested')
+BLOCK_SECONDS = int(os.getenv('READINGS_BLOCK_SECONDS', 3600))
+BLOCK_ENCODING = 'delta-ms-i32/f32-le/v1'
+
+COLUMNS = ('temperature', 'accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z')
+
+
+def blocks_path(user_id, cow_id):
+    return f"reading_blocks/{user_id}/{cow_id}"
+
+
+def block_key(epoch_seconds):
+    start = int(epoch_seconds) // BLOCK_SECONDS * BLOCK_SECONDS
+    return f"{start:010d}"
+
+
+def _to_epoch_ms(timestamp):
+    return int(parse_timestamp(timestamp).timestamp() * 1000)
+
+
+def _reading_row(data):
+    accel = data['accelerometer']
+    gyro = data['gyroscope']
+    return (
+        float(data['temperature']),
+        float(accel['x']), float(accel['y']), float(accel['z']),
+        float(gyro['x']), float(gyro['y']), float(gyro['z']),
+    )
+
+
+def _b64(array, dtype):
+    return base64.b64encode(np.ascontiguousarray(array, dtype=dtype).tobytes()).decode('ascii')
+
+
+def _unb64(text, dtype):
+    return np.frombuffer(base64.b64decode(text), dtype=dtype)
+
+
+def encode_block(t0_ms, timestamps_ms, columns):
+    """Pack sorted epoch-ms timestamps and float columns into a compact block node."""
+    timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64)
+    deltas = np.diff(timestamps_ms, prepend=np.int64(t0_ms))
+    node = {
+        'encoding': BLOCK_ENCODING,
+        't0': int(t0_ms),
+        'n': int(timestamps_ms.size),
+        'ts': _b64(deltas, '<i4'),
+    }
+    for name in COLUMNS:
+        node[name] = _b64(columns[name], '<f4')
+    return node
+
+
+def decode_block(node):
+    """Decode a block node into NumPy arrays: 'timestamp' (epoch ms, int64) plus one float32 array per column."""
+    if not node or node.get('encoding') != BLOCK_ENCODING:
+        raise ValueError(f"Unsupported block encoding: {node.get('encoding') if node else None}")
+
+    arrays = {'timestamp': node['t0'] + np.cumsum(_unb64(node['ts'], '<i4'), dtype=np.int64)}
+    for name in COLUMNS:
+        arrays[name] = _unb64(node[name], '<f4')
+    return arrays
+
+
+def empty_arrays():
+    arrays = {'timestamp': np.empty(0, dtype=np.int64)}
+    for name in COLUMNS:
+        arrays[name] = np.empty(0, dtype=np.float32)
+    return arrays
+
+
+def concat_arrays(chunks):
+    if not chunks:
+        return empty_arrays()
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+
+
+def slice_arrays(arrays, start_ms=None, end_ms=None):
+    timestamps = arrays['timestamp']
+    lo = 0 if start_ms is None else int(np.searchsorted(timestamps, start_ms, side='left'))
+    hi = timestamps.size if end_ms is None else int(np.searchsorted(timestamps, end_ms, side='right'))
+    return {name: values[lo:hi] for name, values in arrays.items()}
+
+
+def merge_block(node, t0_ms, arrays):
+    """Merge rows into an encoded block, keeping timestamps sorted; new rows win on duplicate timestamps."""
+    existing = decode_block(node) if node else empty_arrays()
+    merged = concat_arrays([existing, arrays])
+
+    # Stable sort on the reversed rows so the last-written row comes first for each timestamp.
+    reversed_ts = merged['timestamp'][::-1]
+    order = np.argsort(reversed_ts, kind='stable')
+    _, first = np.unique(reversed_ts[order], return_index=True)
+    keep = merged['timestamp'].size - 1 - order[first]
+
+    merged = {name: values[keep] for name, values in merged.items()}
+    return encode_block(t0_ms, merged['timestamp'], merged)
+
+
+def append_reading(user_id, cow_id, data):
+    ts_ms = _to_epoch_ms(data['timestamp'])
+    key = block_key(ts_ms // 1000)
+    arrays = {'timestamp': np.array([ts_ms], dtype=np.int64)}
+    for name, value in zip(COLUMNS, _reading_row(data)):
+        arrays[name] = np.array([value], dtype=np.float32)
+
+    ref = db.reference(f"{blocks_path(user_id, cow_id)}/{key}")
+    ref.transaction(lambda current: merge_block(current, int(key) * 1000, arrays))
+    logging.debug("Reading for cow '%s' appended to block %s", cow_id, key)
+
+
+def split_into_blocks(arrays):
+    """Yield (block_key, arrays) for each block the rows fall into; rows must be sorted by timestamp."""
+    keys = arrays['timestamp'] // 1000 // BLOCK_SECONDS * BLOCK_SECONDS
+    boundaries = np.flatnonzero(np.diff(keys)) + 1
+    for lo, hi in zip(np.r_[0, boundaries], np.r_[boundaries, keys.size]):
+        if hi > lo:
+            yield f"{int(keys[lo]):010d}", {name: values[lo:hi] for name, values in arrays.items()}
+
+
+def read_blocks(user_id, cow_id, start=None, end=None):
+    """Read the blocks overlapping [start, end] and return one set of concatenated arrays."""
+    start_ms = _to_epoch_ms(start) if start else None
+    end_ms = _to_epoch_ms(end) if end else None
+
+    query = db.reference(blocks_path(user_id, cow_id)).order_by_key()
+    if start_ms is not None:
+        query = query.start_at(block_key(start_ms // 1000))
+    if end_ms is not None:
+        query = query.end_at(block_key(end_ms // 1000))
+    blocks = query.get() or {}
+
+    chunks = [decode_block(blocks[key]) for key in sorted(blocks)]
+    return slice_arrays(concat_arrays(chunks), start_ms, end_ms)
+
+
+def nested_to_arrays(readings):
+    """Convert the legacy one-node-per-reading layout into the same arrays read_blocks returns."""
+    rows = []
+    for reading in (readings or {}).values():
+        if not isinstance(reading, dict):
+            continue
+        try:
+            rows.append((_to_epoch_ms(reading['timestamp']),) + _reading_row(reading))
+        except (KeyError, TypeError, ValueError):
+            continue
+    if not rows:
+        return empty_arrays()
+
+    rows.sort(key=lambda row: row[0])
+    table = np.array(rows, dtype=np.float64)
+    arrays = {'timestamp': table[:, 0].astype(np.int64)}
+    for index, name in enumerate(COLUMNS, start=1):
+        arrays[name] = table[:, index].astype(np.float32)
+    return arrays
+
+
+def reading_key(timestamp):
+    return parse_timestamp(timestamp).strftime('%Y-%m-%dT%H-%M-%SZ')
+
+
+def read_nested(user_id, cow_id, start=None, end=None):
+    query = db.reference(readings_path(user_id, cow_id)).order_by_key()
+    if start:
+        query = query.start_at(reading_key(start))
+    if end:
+        query = query.end_at(reading_key(end))
+    arrays = nested_to_arrays(query.get())
+    return slice_arrays(
+        arrays,
+        _to_epoch_ms(start) if start else None,
+        _to_epoch_ms(end) if end else None,
+    )
+
+
+def latest_reading(user_id, cow_id):
+    """Return the most recent reading in the nested dict shape, from whichever layout is configured."""
+    if READINGS_STORAGE == 'nested':
+        latest = db.reference(readings_path(user_id, cow_id)).order_by_key().limit_to_last(1).get()
+        return next(iter(latest.values())) if latest else None
+
+    latest = db.reference(blocks_path(user_id, cow_id)).order_by_key().limit_to_last(1).get()
+    if not latest:
+        return None
+    arrays = decode_block(next(iter(latest.values())))
+    row = {name: float(values[-1]) for name, values in arrays.items() if name != 'timestamp'}
+    timestamp = datetime.fromtimestamp(int(arrays['timestamp'][-1]) / 1000, tz=timezone.utc)
+    return {
+        'temperature': row['temperature'],
+        'accelerometer': {'x': row['accel_x'], 'y': row['accel_y'], 'z': row['accel_z']},
+        'gyroscope': {'x': row['gyro_x'], 'y': row['gyro_y'], 'z': row['gyro_z']},
+        'timestamp': timestamp.strftime('%Y-%m-%dT%H:%M:%SZ'),
+    }
+
+
+def load_readings(user_id, cow_id, start=None, end=None):
+    """Load readings in [start, end] as NumPy arrays from whichever layout is configured."""
+    if READINGS_STORAGE == 'nested':
+        return read_nested(user_id, cow_id, start, end)
+    return read_blocks(user_id, cow_id, start, end)
+
+
+def iter_readings(user_id, cow_id, start=None, end=None, page_size=None):
+    """Yield readings in [start, end] as arrays, oldest first, one bounded page of nodes at a time."""
+    start_ms = _to_epoch_ms(start) if start else None
+    end_ms = _to_epoch_ms(end) if end else None
+    if READINGS_STORAGE == 'nested':
+        path, to_arrays, page_size = readings_path(user_id, cow_id), nested_to_arrays, page_size or 1000
+        cursor, last = (reading_key(start) if start else None), (reading_key(end) if end else None)
+    else:
+        path, page_size = blocks_path(user_id, cow_id), page_size or 24
+        to_arrays = lambda page: concat_arrays([decode_block(page[key]) for key in sorted(page)])
+        cursor = block_key(start_ms // 1000) if start_ms is not None else None
+        last = block_key(end_ms // 1000) if end_ms is not None else None
+
+    while True:
+        query = db.reference(path).order_by_key()
+        if cursor:
+            query = query.start_at(cursor)
+        if last:
+            query = query.end_at(last)
+        page = query.limit_to_first(page_size + 1).get() or {}
+        keys = sorted(page)
+        arrays = slice_arrays(to_arrays({key: page[key] for key in keys[:page_size]}), start_ms, end_ms)
+        if arrays['timestamp'].size:
+            yield arrays
+        if len(keys) <= page_size:
+            return
+        cursor = keys[page_size]
@@ -0,0 +1,163 @@
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from app.datastore import db
+from app.utils.cow_replica import get_cows as get_replicated_cows
+
+# cow_index/{uid}/{field}/{cow_id} = normalized value, queried with order_by_value().
+# Strings are lower-cased (case-insensitive equality and prefix match); numbers stay numeric.
+INDEXED_FIELDS = {
+    'name': 'text',
+    'breed': 'text',
+    'health_status': 'text',
+    'age': 'number',
+    'milk_production': 'number',
+}
+OPERATORS = ('<=', '>=', '^=', '=', '<', '>')
+FETCH_WORKERS = 8
+
+_PREDICATE_RE = re.compile(r'^\s*(\w+)\s*(<=|>=|\^=|=|<|>)\s*(.*?)\s*$')
+_indexed_users = set()
+
+
+class SearchError(ValueError):
+    pass
+
+
+def index_path(user_id, field=None):
+    return f"cow_index/{user_id}" + (f"/{field}" if field else '')
+
+
+def index_value(field, value):
+    if value is None:
+        return None
+    if INDEXED_FIELDS[field] == 'number':
+        if isinstance(value, bool):
+            return None
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    return str(value).strip().lower()
+
+
+def index_updates(user_id, cow_id, old_cow=None, new_cow=None):
+    """Multi-path update entries that move a cow's index entries from old_cow to new_cow."""
+    updates = {}
+    for field in INDEXED_FIELDS:
+        old = index_value(field, (old_cow or {}).get(field))
+        new = index_value(field, (new_cow or {}).get(field))
+        if old != new:
+            updates[f"{index_path(user_id, field)}/{cow_id}"] = new
+    return updates
+
+
+def rebuild_cow_index(user_id):
+    cows = db.reference(f'users/{user_id}/cows').get() or {}
+    index = {field: {} for field in INDEXED_FIELDS}
+    for cow_id, cow in cows.items():
+        if not isinstance(cow, dict):
+            continue
+        for field in INDEXED_FIELDS:
+            value = index_value(field, cow.get(field))
+            if value is not None:
+                index[field][cow_id] = value
+    index['_built'] = True
+    db.reference(index_path(user_id)).set(index)
+    _indexed_users.add(user_id)
+    logging.info(f"Cow index rebuilt for user {user_id}: {len(cows)} cows")
+
+
+def ensure_cow_index(user_id):
+    if user_id in _indexed_users:
+        return
+    if not db.reference(f"{index_path(user_id)}/_built").get():
+        rebuild_cow_index(user_id)
+    _indexed_users.add(user_id)
+
+
+def parse_predicate(text):
+    match = _PREDICATE_RE.match(text or '')
+    if not match:
+        raise SearchError(f"Invalid filter '{text}'. Use <field><op><value> with op in {', '.join(OPERATORS)}")
+    field, op, raw = match.groups()
+    if field not in INDEXED_FIELDS:
+        raise SearchError(f"Field '{field}' is not searchable. Use one of: {', '.join(INDEXED_FIELDS)}")
+    if op == '^=' and INDEXED_FIELDS[field] != 'text':
+        raise SearchError("Prefix match is only supported on text fields")
+    if op in ('<', '<=', '>', '>=') and INDEXED_FIELDS[field] != 'number':
+        raise SearchError("Range filters are only supported on numeric fields")
+    value = index_value(field, raw)
+    if value is None or value == '':
+        raise SearchError(f"Invalid value for '{field}': '{raw}'")
+    return field, op, value
+
+
+def _matches(op, candidate, value):
+    if isinstance(value, float) and (isinstance(candidate, bool) or not isinstance(candidate, (int, float))):
+        return False
+    if op == '=':
+        return candidate == value
+    if op == '^=':
+        return isinstance(candidate, str) and candidate.startswith(value)
+    return {'<': candidate < value, '<=': candidate <= value, '>': candidate > value, '>=': candidate >= value}[op]
+
+
+def _run_predicate(user_id, field, op, value):
+    query = db.reference(index_path(user_id, field)).order_by_value()
+    if op == '=':
+        query = query.equal_to(value)
+    elif op == '^=':
+        query = query.start_at(value).end_at(value + '\uf8ff')
+    elif op in ('<', '<='):
+        query = query.end_at(value)
+    else:
+        query = query.start_at(value)
+    # The server bounds are inclusive and mix types; re-check each hit locally.
+    return {cow_id: hit for cow_id, hit in (query.get() or {}).items() if _matches(op, hit, value)}
+
+
+def fetch_cows(user_id, cow_ids):
+    def fetch(cow_id):
+        return cow_id, db.reference(f'users/{user_id}/cows/{cow_id}').get()
+
+    if not cow_ids:
+        return {}
+    replica = get_replicated_cows(user_id)
+    if replica is not None:
+        return {cow_id: replica[cow_id] for cow_id in cow_ids if cow_id in replica}
+    with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(cow_ids))) as pool:
+        return {cow_id: cow for cow_id, cow in pool.map(fetch, cow_ids) if isinstance(cow, dict)}
+
+
+def search_cows(user_id, predicates, sort=None, offset=0, limit=50):
+    """Intersect index lookups for every predicate, then sort and page the matching cows.
+
+    Work is proportional to the number of index hits, not to the size of the herd.
+    """
+    ensure_cow_index(user_id)
+
+    matched = None
+    for field, op, value in sorted(predicates, key=lambda p: p[1] != '='):
+        hits = _run_predicate(user_id, field, op, value)
+        matched = set(hits) if matched is None else matched & set(hits)
+        if not matched:
+            return [], 0
+
+    cows = fetch_cows(user_id, sorted(matched))
+    results = [{**cow, 'cow_id': cow_id} for cow_id, cow in cows.items()]
+    results = [{key: value for key, value in cow.items() if key != 'readings'} for cow in results]
+
+    if sort:
+        descending = sort.startswith('-')
+        field = sort.lstrip('-')
+        if field not in INDEXED_FIELDS and field not in ('cow_id', 'created_at'):
+            raise SearchError(f"Cannot sort by '{field}'")
+        key = (lambda cow: index_value(field, cow.get(field))) if field in INDEXED_FIELDS else (lambda cow: cow.get(field))
+        present = [cow for cow in results if key(cow) is not None]
+        missing = [cow for cow in results if key(cow) is None]
+        results = sorted(present, key=key, reverse=descending) + missing
+    else:
+        results.sort(key=lambda cow: cow['cow_id'])
+
+    return results[offset:offset + limit], len(results)
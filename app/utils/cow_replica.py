@@ -0,0 +1,214 @@
+import os
+import time
+import logging
+import itertools
+import threading
+from collections import OrderedDict, deque
+from dotenv import load_dotenv
+from app.datastore import db
+
+load_dotenv()
+
+# Optional in-memory replica of users/{uid}/cows kept current by a database listener per
+# farmer. Only the most recently used farmers are replicated; the rest read directly.
+COW_REPLICA_ENABLED = os.getenv('COW_REPLICA_ENABLED', 'false').lower() == 'true'
+COW_REPLICA_MAX_USERS = int(os.getenv('COW_REPLICA_MAX_USERS', 200))
+COW_REPLICA_SYNC_TIMEOUT = float(os.getenv('COW_REPLICA_SYNC_TIMEOUT', 5))
+# Our own write not echoed by the listener within this long means the stream is stuck.
+COW_REPLICA_MAX_LAG_SECONDS = float(os.getenv('COW_REPLICA_MAX_LAG_SECONDS', 10))
+# Replicas are re-synced from scratch after this long, bounding staleness if a stream dies silently.
+COW_REPLICA_MAX_AGE_SECONDS = float(os.getenv('COW_REPLICA_MAX_AGE_SECONDS', 900))
+
+_replicas = OrderedDict()
+_lock = threading.Lock()
+_counters = {'hits': 0, 'misses': 0, 'fallbacks': 0, 'evictions': 0}
+_lags = deque(maxlen=1000)
+_write_ids = itertools.count(1)
+
+
+def _metadata(cow):
+    return {key: value for key, value in cow.items() if key != 'readings'}
+
+
+def _shows(cow, fields):
+    """True when a replicated cow reflects a write: absent for a delete, else every written field equal."""
+    if fields is None:
+        return cow is None
+    return cow is not None and all(cow.get(field) == value for field, value in fields.items() if field != 'readings')
+
+
+class _Replica:
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.cows = {}
+        self.synced = threading.Event()
+        self.created_at = time.monotonic()
+        self.last_event_at = None
+        # write id -> (noted at, {cow_id: written fields, or None for a delete})
+        self.pending = {}
+        self.registration = None
+
+    def apply(self, event):
+        segments = [segment for segment in event.path.split('/') if segment]
+        with _lock:
+            if event.event_type == 'patch':
+                for key, value in (event.data or {}).items():
+                    self._put(segments + [segment for segment in key.split('/') if segment], value)
+            else:
+                self._put(segments, event.data)
+            self.last_event_at = time.monotonic()
+            # Only the event carrying a write clears it; an echo of an earlier write to the
+            # same cows leaves the replica without it, so reads keep going direct.
+            for write_id, (noted_at, expected) in list(self.pending.items()):
+                if all(_shows(self.cows.get(cow_id), fields) for cow_id, fields in expected.items()):
+                    _lags.append(self.last_event_at - noted_at)
+                    del self.pending[write_id]
+        self.synced.set()
+
+    def pending_since(self):
+        return min((noted_at for noted_at, _ in self.pending.values()), default=None)
+
+    def _put(self, segments, data):
+        if not segments:
+            self.cows = {cow_id: _metadata(cow) for cow_id, cow in (data or {}).items() if isinstance(cow, dict)}
+            return
+
+        cow_id, rest = segments[0], segments[1:]
+        if rest and rest[0] == 'readings':
+            return
+        if not rest:
+            if isinstance(data, dict):
+                self.cows[cow_id] = _metadata(data)
+            else:
+                self.cows.pop(cow_id, None)
+            return
+
+        # Copy on write, so dicts already handed to callers never change underneath them.
+        cow = dict(self.cows.get(cow_id) or {})
+        node = cow
+        for segment in rest[:-1]:
+            child = dict(node[segment]) if isinstance(node.get(segment), dict) else {}
+            node[segment] = child
+            node = child
+        if data is None:
+            node.pop(rest[-1], None)
+        else:
+            node[rest[-1]] = data
+        if cow:
+            self.cows[cow_id] = cow
+        else:
+            self.cows.pop(cow_id, None)
+
+    def close(self):
+        if self.registration is not None:
+            try:
+                self.registration.close()
+            except Exception:
+                logging.exception(f"Failed to close cow replica listener for user {self.user_id}")
+
+
+def _acquire(user_id):
+    created, evicted = False, []
+    with _lock:
+        replica = _replicas.get(user_id)
+        if replica and time.monotonic() - replica.created_at > COW_REPLICA_MAX_AGE_SECONDS:
+            evicted.append(_replicas.pop(user_id))
+            replica = None
+        if replica:
+            _replicas.move_to_end(user_id)
+        else:
+            _counters['misses'] += 1
+            replica, created = _Replica(user_id), True
+            _replicas[user_id] = replica
+            while len(_replicas) > COW_REPLICA_MAX_USERS:
+                evicted.append(_replicas.popitem(last=False)[1])
+                _counters['evictions'] += 1
+    for stale in evicted:
+        stale.close()
+
+    # Only the thread that created the replica subscribes; the others wait for its first sync.
+    if created:
+        try:
+            replica.registration = db.reference(f'users/{user_id}/cows').listen(replica.apply)
+        except Exception:
+            logging.exception(f"Failed to start cow replica listener for user {user_id}")
+            evict(user_id)
+            return None
+    return replica
+
+
+def get_cows(user_id):
+    """Return {cow_id: metadata} from the replica, or None when the caller should read the database."""
+    if not COW_REPLICA_ENABLED:
+        return None
+
+    replica = _acquire(user_id)
+    if replica is None or not replica.synced.wait(COW_REPLICA_SYNC_TIMEOUT):
+        logging.warning(f"Cow replica for user {user_id} not synced; reading directly")
+        _counters['fallbacks'] += 1
+        return None
+
+    with _lock:
+        pending = replica.pending_since()
+        if pending is None:
+            _counters['hits'] += 1
+            return dict(replica.cows)
+        _counters['fallbacks'] += 1
+
+    # A write from this process is not visible yet: read directly so callers see their own writes.
+    if time.monotonic() - pending > COW_REPLICA_MAX_LAG_SECONDS:
+        logging.warning(f"Cow replica for user {user_id} lagging by more than {COW_REPLICA_MAX_LAG_SECONDS}s; resyncing")
+        evict(user_id)
+    return None
+
+
+def note_write(user_id, expected):
+    """Call before writing the user's cows: reads go direct until the listener delivers the change.
+
+    expected maps each written cow_id to the fields written, or None for a delete. Returns a
+    write id for cancel_write.
+    """
+    if not COW_REPLICA_ENABLED:
+        return None
+    with _lock:
+        replica = _replicas.get(user_id)
+        if not replica:
+            return None
+        write_id = next(_write_ids)
+        replica.pending[write_id] = (time.monotonic(), dict(expected))
+        return write_id
+
+
+def cancel_write(user_id, write_id):
+    """Undo note_write when the write turned out not to happen (e.g. the cow did not exist)."""
+    if write_id is None:
+        return
+    with _lock:
+        replica = _replicas.get(user_id)
+        if replica:
+            replica.pending.pop(write_id, None)
+
+
+def evict(user_id):
+    with _lock:
+        replica = _replicas.pop(user_id, None)
+    if replica:
+        replica.close()
+
+
+def replica_stats():
+    now = time.monotonic()
+    with _lock:
+        lags = sorted(_lags)
+        event_ages = [now - replica.last_event_at for replica in _replicas.values() if replica.last_event_at]
+        return {
+            'enabled': COW_REPLICA_ENABLED,
+            'users': len(_replicas),
+            'max_users': COW_REPLICA_MAX_USERS,
+            **_counters,
+            # Time from a local write until its change event arrived: the replica's staleness.
+            'lag_p50_ms': round(lags[len(lags) // 2] * 1000, 1) if lags else None,
+            'lag_max_ms': round(lags[-1] * 1000, 1) if lags else None,
+            'pending_writes': sum(len(replica.pending) for replica in _replicas.values()),
+            'oldest_event_age_seconds': round(max(event_ages), 1) if event_ages else None,
+        }
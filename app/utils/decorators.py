@@ -1,38 +1,54 @@
 from functools import wraps
+import jwt
 from flask import request, jsonify,g
 from app.utils.auth_helper import generate_token ,verify_token
-from firebase_admin import db
+from app.utils.roles import get_role
+
+
+def _current_user():
+    """Decode the bearer token once per request; stacked decorators reuse g.user."""
+    if g.get('user'):
+        return g.user
+    token = request.headers.get('Authorization')
+    if not token:
+        return None
+    try:
+        g.user = verify_token(token.replace('Bearer ', ''))
+    except jwt.InvalidTokenError:
+        g.user = None
+    return g.user
+
+
 def auth_required(f):
     @wraps(f)
     def decorated_function(*args , **kwargs):
-        token= request.headers.get('Authorization')
-        if not token:
+        if not request.headers.get('Authorization'):
             return jsonify({'message':'Token is missing!'}), 401
-        token = token.replace('Bearer ', '')
 
-        user_data = verify_token(token)
+        user_data = _current_user()
         if not user_data:
             return jsonify({'message':'token is invalid!'}), 401
-        g.user = user_data 
 
         return f(*args, **kwargs)
     return decorated_function
 
 def role_required(required_roles):
+    if isinstance(required_roles, str):
+        required_roles = [required_roles]
+
     def decorator(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
-            token = request.headers.get('Authorization')
-            if not token:
+            if not request.headers.get('Authorization'):
                 return jsonify({'message': 'Token is missing!'}), 401
-            token = token.replace('Bearer ', '')
 
-            user_data = verify_token(token)
+            user_data = _current_user()
             if not user_data:
                 return jsonify({'message': 'Token is invalid!'}), 401
 
-            user_id = user_data['uid']
-            role = db.reference(f'users/{user_id}/details/role').get()
+            # The database decides, not the token's role claim: a role change or a deleted user
+            # takes effect on live tokens once the role cache is invalidated or expires.
+            role = get_role(user_data['uid'])
 
             if role not in required_roles:
                 return jsonify({'message': f'{", ".join(required_roles)} access required!'}), 403
@@ -40,5 +56,3 @@ def role_required(required_roles):
             return f(*args, **kwargs)
         return wrapper
     return decorator
-
-
@@ -0,0 +1,125 @@
+import logging
+from datetime import datetime
+from app.datastore import db
+from app.datastore.local import key_order
+from app.utils.aggregates import get_user_aggregates
+
+STATS_PATH = 'platform/stats'
+DIRECTORY_PATH = 'user_directory'
+# roles/{role}/{uid} holds a copy of the directory entry so a page of users is one key-ordered query.
+ROLES_PATH = 'roles'
+DIRECTORY_FIELDS = ('user_id', 'email', 'name', 'role')
+
+
+def _increment(amount):
+    # Server-side increment: a single write with no read and no transaction contention.
+    return {'.sv': {'increment': amount}}
+
+
+def directory_entry(user_id, details):
+    entry = {field: details.get(field) for field in DIRECTORY_FIELDS}
+    entry['user_id'] = user_id
+    return entry
+
+
+def record_user_registered(user_id, details):
+    entry = directory_entry(user_id, details)
+    updates = {
+        f'{DIRECTORY_PATH}/{user_id}': entry,
+        f'{STATS_PATH}/total_users': _increment(1),
+    }
+    if entry['role']:
+        updates[f'{ROLES_PATH}/{entry["role"]}/{user_id}'] = entry
+    if details.get('role') == 'farmer':
+        updates[f'{STATS_PATH}/total_farmers'] = _increment(1)
+    db.reference().update(updates)
+
+
+def record_user_updated(user_id, old_details, new_details):
+    entry = directory_entry(user_id, {**old_details, **new_details})
+    updates = {f'{DIRECTORY_PATH}/{user_id}': entry}
+    if entry['role']:
+        updates[f'{ROLES_PATH}/{entry["role"]}/{user_id}'] = entry
+
+    old_role = old_details.get('role')
+    if old_role and old_role != entry['role']:
+        updates[f'{ROLES_PATH}/{old_role}/{user_id}'] = None
+    if (old_role == 'farmer') != (entry['role'] == 'farmer'):
+        updates[f'{STATS_PATH}/total_farmers'] = _increment(1 if entry['role'] == 'farmer' else -1)
+    db.reference().update(updates)
+
+
+def record_user_deleted(user_id, details, cow_count):
+    updates = {
+        f'{DIRECTORY_PATH}/{user_id}': None,
+        f'{STATS_PATH}/total_users': _increment(-1),
+    }
+    role = (details or {}).get('role')
+    if role:
+        updates[f'{ROLES_PATH}/{role}/{user_id}'] = None
+    if role == 'farmer':
+        updates[f'{STATS_PATH}/total_farmers'] = _increment(-1)
+    if cow_count:
+        updates[f'{STATS_PATH}/total_cows'] = _increment(-cow_count)
+    db.reference().update(updates)
+
+
+def record_cow_count_change(delta):
+    if delta:
+        db.reference().update({f'{STATS_PATH}/total_cows': _increment(delta)})
+
+
+def rebuild_platform_index():
+    """Recompute platform counters and the user directory from the users tree, one small read per user."""
+    user_ids = sorted((db.reference('users').get(shallow=True) or {}).keys())
+    directory = {}
+    roles = {}
+    stats = {'total_users': 0, 'total_farmers': 0, 'total_cows': 0}
+
+    for user_id in user_ids:
+        details = db.reference(f'users/{user_id}/details').get() or {}
+        directory[user_id] = directory_entry(user_id, details)
+        if details.get('role'):
+            roles.setdefault(details['role'], {})[user_id] = directory[user_id]
+        stats['total_users'] += 1
+        if details.get('role') == 'farmer':
+            stats['total_farmers'] += 1
+        stats['total_cows'] += get_user_aggregates(user_id)['cow_count']
+
+    stats['rebuilt_at'] = datetime.utcnow().isoformat() + 'Z'
+    db.reference().update({DIRECTORY_PATH: directory, ROLES_PATH: roles, STATS_PATH: stats})
+    logging.info(f"Platform index rebuilt: {stats}")
+    return stats
+
+
+def get_platform_stats():
+    """Return the platform counters, or None until `flask platform rebuild` has seeded them."""
+    stats = db.reference(STATS_PATH).get() or {}
+    if 'rebuilt_at' not in stats:
+        # Increments alone would undercount existing data, and a rebuild reads every user,
+        # which is too slow and too large for a request.
+        return None
+    return stats
+
+
+def list_users_by_role(role, limit, start_after=None, fields=None):
+    """Return one page of users with the given role, ordered by user ID, plus the cursor for the next page."""
+    query = db.reference(f'{ROLES_PATH}/{role}').order_by_key()
+    if start_after:
+        # start_at is inclusive, so fetch one extra row and drop the cursor itself.
+        query = query.start_at(start_after).limit_to_first(limit + 2)
+    else:
+        query = query.limit_to_first(limit + 1)
+    rows = query.get() or {}
+
+    # Same order as order_by_key(), which puts integer-like keys first, numerically.
+    user_ids = [user_id for user_id in sorted(rows, key=key_order) if user_id != start_after]
+    page, has_more = user_ids[:limit], len(user_ids) > limit
+
+    users = []
+    for user_id in page:
+        entry = {**rows[user_id], 'user_id': user_id}
+        if fields:
+            entry = {field: entry.get(field) for field in ('user_id', *fields)}
+        users.append(entry)
+    return users, (page[-1] if has_more and page else None)
@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from dotenv import load_dotenv
+from app.datastore import db
+from app.utils.activity import activity_level
+from app.utils.anomaly import alerts_path
+from app.utils.readings import readings_path, vector_magnitude
+
+load_dotenv()
+
+# Fan-out of new readings and alerts to /cows/<cow_id>/live subscribers.
+# 'listener': one database listener per watched cow, shared by all of its subscribers in this process.
+# 'ingest': ingest_and_save publishes in-process, so subscribers must reach the process that ingests.
+# Only use it where the ingest job is scheduled; the default scheduler does not run it.
+LIVE_SOURCE = os.getenv('LIVE_SOURCE', 'listener')
+LIVE_QUEUE_SIZE = int(os.getenv('LIVE_QUEUE_SIZE', 32))
+LIVE_HEARTBEAT_SECONDS = float(os.getenv('LIVE_HEARTBEAT_SECONDS', 15))
+LIVE_MAX_SUBSCRIBERS = int(os.getenv('LIVE_MAX_SUBSCRIBERS', 1000))
+LIVE_RETRY_MS = int(os.getenv('LIVE_RETRY_MS', 5000))
+
+_topics = {}
+_lock = threading.Lock()
+_counters = {'published': 0, 'delivered': 0, 'dropped_subscribers': 0}
+
+
+class Subscriber:
+    def __init__(self, user_id, cow_id):
+        self.key = (user_id, cow_id)
+        self.queue = queue.Queue(maxsize=LIVE_QUEUE_SIZE)
+        self.dropped = False
+
+
+class _Topic:
+    def __init__(self):
+        self.subscribers = set()
+        self.registrations = []
+
+    def close(self):
+        for registration in self.registrations:
+            try:
+                registration.close()
+            except Exception:
+                logging.exception("Failed to close live listener")
+
+
+def reading_event(cow_id, data):
+    """The payload sent for one reading: the raw values plus the derived activity level."""
+    return {
+        'cow_id': cow_id,
+        'timestamp': data['timestamp'],
+        'temperature': data['temperature'],
+        'accelerometer': data['accelerometer'],
+        'gyroscope': data['gyroscope'],
+        'activity_level': activity_level(vector_magnitude(data['accelerometer']), vector_magnitude(data['gyroscope'])),
+    }
+
+
+def _listen(user_id, cow_id, topic):
+    def forward(event_name, build):
+        def callback(event):
+            # The first event is the current contents of the node, which subscribers do not want replayed.
+            if event.path == '/' and event.event_type == 'put':
+                return
+            if event.event_type == 'patch':
+                items = (event.data or {}).values()
+            else:
+                items = [event.data] if event.path.strip('/').count('/') == 0 else []
+            for item in items:
+                if isinstance(item, dict):
+                    try:
+                        publish(user_id, cow_id, event_name, build(item), source='listener')
+                    except (KeyError, TypeError, ValueError):
+                        logging.warning(f"Skipping malformed live {event_name} for cow '{cow_id}' of user {user_id}")
+        return callback
+
+    for path, event_name, build in (
+        (readings_path(user_id, cow_id), 'reading', lambda item: reading_event(cow_id, item)),
+        (alerts_path(user_id, cow_id), 'alert', lambda item: item),
+    ):
+        topic.registrations.append(db.reference(path).listen(forward(event_name, build)))
+
+
+def subscribe(user_id, cow_id):
+    """Register a subscriber for one cow, or return None when the process is at LIVE_MAX_SUBSCRIBERS."""
+    subscriber = Subscriber(user_id, cow_id)
+    with _lock:
+        if sum(len(topic.subscribers) for topic in _topics.values()) >= LIVE_MAX_SUBSCRIBERS:
+            return None
+        topic = _topics.get(subscriber.key)
+        created = topic is None
+        if created:
+            topic = _topics[subscriber.key] = _Topic()
+        topic.subscribers.add(subscriber)
+
+    if created and LIVE_SOURCE == 'listener':
+        try:
+            _listen(user_id, cow_id, topic)
+        except Exception:
+            logging.exception(f"Failed to start live listener for cow '{cow_id}' of user {user_id}")
+            unsubscribe(subscriber)
+            return None
+    return subscriber
+
+
+def unsubscribe(subscriber):
+    with _lock:
+        topic = _topics.get(subscriber.key)
+        if topic is None:
+            return
+        topic.subscribers.discard(subscriber)
+        if topic.subscribers:
+            return
+        del _topics[subscriber.key]
+    topic.close()
+
+
+def publish(user_id, cow_id, event, data, source='ingest'):
+    """Queue an event for every subscriber of the cow; subscribers whose queue is full are dropped."""
+    if source != LIVE_SOURCE:
+        return
+    with _lock:
+        topic = _topics.get((user_id, cow_id))
+        subscribers = list(topic.subscribers) if topic else []
+        _counters['published'] += 1
+    if not subscribers:
+        return
+
+    # Serialized once, however many subscribers there are.
+    message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    delivered, dropped = 0, []
+    for subscriber in subscribers:
+        try:
+            subscriber.queue.put_nowait(message)
+            delivered += 1
+        except queue.Full:
+            # A consumer this far behind would only see stale data; it reconnects and starts fresh.
+            subscriber.dropped = True
+            dropped.append(subscriber)
+    for subscriber in dropped:
+        unsubscribe(subscriber)
+    with _lock:
+        _counters['delivered'] += delivered
+        _counters['dropped_subscribers'] += len(dropped)
+    if dropped:
+        logging.warning(f"Dropped {len(dropped)} slow live subscribers for cow '{cow_id}' of user {user_id}")
+
+
+def stream(subscriber, initial=None, expires_at=None):
+    """Generate the SSE body: an optional initial reading, queued events and heartbeats.
+
+    Ends when the subscriber is dropped or its access token expires; the client reconnects
+    after LIVE_RETRY_MS with a fresh token.
+    """
+    try:
+        yield f"retry: {LIVE_RETRY_MS}\n\n"
+        if initial is not None:
+            yield f"event: reading\ndata: {json.dumps(initial)}\n\n"
+        while True:
+            timeout = LIVE_HEARTBEAT_SECONDS
+            if expires_at is not None:
+                timeout = min(timeout, max(expires_at - time.time(), 0))
+            try:
+                message = subscriber.queue.get(timeout=timeout)
+            except queue.Empty:
+                message = None
+            if subscriber.dropped:
+                yield "event: dropped\ndata: {}\n\n"
+                return
+            if expires_at is not None and time.time() >= expires_at:
+                yield "event: expired\ndata: {}\n\n"
+                return
+            # Comment lines keep proxies from closing an idle connection and surface disconnects.
+            yield message if message is not None else ": heartbeat\n\n"
+    finally:
+        unsubscribe(subscriber)
+
+
+def live_stats():
+    with _lock:
+        return {
+            'source': LIVE_SOURCE,
+            'cows': len(_topics),
+            'subscribers': sum(len(topic.subscribers) for topic in _topics.values()),
+            'max_subscribers': LIVE_MAX_SUBSCRIBERS,
+            **_counters,
+        }
@@ -1,9 +1,113 @@
 import os
+import json
+import time
+import queue
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from logging import StreamHandler
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# 'json' writes one object per line for log shippers; 'text' keeps the human-readable format.
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+# At most this many records per call site (logger, level, file and line) per window;
+# the rest are counted and reported on the next record that gets through. Errors are never limited.
+LOG_RATE_LIMIT = int(os.getenv('LOG_RATE_LIMIT', 20))
+LOG_RATE_WINDOW_SECONDS = float(os.getenv('LOG_RATE_WINDOW_SECONDS', 60))
+
+# Attributes every LogRecord has; anything else was passed through extra= and is emitted as a field.
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'suppressed'}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    converter = time.gmtime
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most `limit` records per call site (logger, level, file and line) per window.
+
+    ERROR and CRITICAL records always pass: they are rare, and each one may be the only trace of a failure.
+    """
+
+    def __init__(self, limit=LOG_RATE_LIMIT, window=LOG_RATE_WINDOW_SECONDS):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.limit <= 0 or record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.levelno, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            started, count, suppressed = self._sites.get(key, (now, 0, 0))
+            if now - started >= self.window:
+                started, count = now, 0
+            if count >= self.limit:
+                self._sites[key] = (started, count, suppressed + 1)
+                return False
+            self._sites[key] = (started, count + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread without waiting for space."""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # %-style arguments may be mutable objects the caller keeps changing, so the message is
+        # rendered here, on the calling thread. Everything else (timestamp, JSON, the traceback of
+        # exc_info) is immutable by now and is formatted on the listener thread.
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+
+class _SuppressedCountFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        return f"{text} ({suppressed} similar messages suppressed)" if suppressed else text
+
 
 def setup_logger():
+    global _listener
     log_dir = os.path.join(os.path.dirname(__file__), '..', 'logs')
     os.makedirs(log_dir, exist_ok=True)
 
@@ -12,18 +116,32 @@ def setup_logger():
     # Clear existing handlers
     for handler in logging.root.handlers[:]:
         logging.root.removeHandler(handler)
+    if _listener is not None:
+        _listener.stop()
 
-    formatter = logging.Formatter('[%(asctime)s] %(levelname)s in %(module)s: %(message)s')
+    if LOG_FORMAT == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = _SuppressedCountFormatter('[%(asctime)s] %(levelname)s in %(module)s: %(message)s')
 
     file_handler = RotatingFileHandler(log_file, maxBytes=1_000_000, backupCount=5)
     file_handler.setFormatter(formatter)
-    file_handler.setLevel(logging.INFO)
 
     console_handler = StreamHandler()
     console_handler.setFormatter(formatter)
-    console_handler.setLevel(logging.INFO)
+
+    # Request threads only enqueue; the listener thread formats and does the file and console I/O.
+    queue_handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RateLimitFilter())
+    _listener = QueueListener(queue_handler.queue, file_handler, console_handler)
+    _listener.start()
 
     logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(queue_handler)
+
+
+@atexit.register
+def _flush_logs():
+    if _listener is not None:
+        _listener.stop()
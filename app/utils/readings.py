@@ -0,0 +1,44 @@
+import math
+from datetime import datetime, timezone
+
+
+# Time series live outside users/{uid}/cows so listing or reading cow metadata never
+# downloads sensor history.
+def readings_path(user_id, cow_id):
+    return f"readings/{user_id}/{cow_id}"
+
+
+def legacy_readings_path(user_id, cow_id):
+    return f"users/{user_id}/cows/{cow_id}/readings"
+
+
+# Every tree keyed by {uid}/{cow_id} that holds sensor-derived data.
+TIMESERIES_ROOTS = ('readings', 'reading_blocks', 'archive/reading_blocks', 'rollups', 'anomaly_state', 'alerts')
+
+
+def timeseries_paths(user_id, cow_id=None):
+    suffix = f"/{cow_id}" if cow_id else ''
+    return [f"{root}/{user_id}{suffix}" for root in TIMESERIES_ROOTS]
+
+
+def parse_timestamp(value):
+    """Parse a ThingSpeak/ISO-8601 timestamp (or a mangled reading key) into an aware UTC datetime."""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+    text = str(value).strip()
+    # Reading keys are stored with ':' replaced by '-', e.g. 2025-08-14T10-00-00Z
+    if 'T' in text:
+        date_part, time_part = text.split('T', 1)
+        time_part = time_part.replace('-', ':', 2) if time_part.count(':') == 0 else time_part
+        text = f"{date_part}T{time_part}"
+    text = text.replace('Z', '+00:00')
+
+    parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def vector_magnitude(vector):
+    return math.sqrt(vector['x'] ** 2 + vector['y'] ** 2 + vector['z'] ** 2)
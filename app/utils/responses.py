@@ -0,0 +1,113 @@
+import gzip
+import hashlib
+import os
+from functools import wraps
+from dotenv import load_dotenv
+from flask import g, make_response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+load_dotenv()
+
+# Bodies smaller than this are sent as-is: below roughly one packet compression saves nothing.
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+# ETag, Vary and Cache-Control add ~150 bytes of headers, more than a tiny body saves on a 304.
+ETAG_MIN_BYTES = int(os.getenv('ETAG_MIN_BYTES', 512))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 5))
+COMPRESSIBLE_TYPES = ('application/json', 'text/csv', 'text/plain', 'text/html', 'application/x-ndjson')
+
+
+def _accepted_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def conditional_and_compressed(response):
+    """Add a strong ETag to buffered GET responses, answer If-None-Match with 304, and compress large bodies."""
+    if (request.method not in ('GET', 'HEAD') or response.status_code != 200 or response.direct_passthrough
+            or response.is_streamed or 'Content-Encoding' in response.headers):
+        return response
+
+    body = response.get_data()
+    version_etag = response.get_etag()[0]
+    if len(body) < ETAG_MIN_BYTES and not version_etag:
+        return response
+    compressible = response.mimetype in COMPRESSIBLE_TYPES and len(body) >= COMPRESS_MIN_BYTES
+    encoding = _accepted_encoding() if compressible else None
+
+    # Each encoding is a different representation, so it needs its own strong ETag.
+    etag = (version_etag or hashlib.sha256(body).hexdigest()[:32]) + (f'-{encoding}' if encoding else '')
+    response.set_etag(etag)
+    _cache_headers(response)
+
+    response.make_conditional(request)
+    if response.status_code == 304 or not encoding:
+        return response
+
+    response.set_data(_compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def _cache_headers(response):
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.update(('Authorization', 'Accept-Encoding'))
+
+
+def conditional_on(version):
+    """Answer If-None-Match before the view runs, from a cheap version of the data it returns.
+
+    version() must change whenever the view's output would. The ETag combines it with the user
+    and the full URL, so an unchanged poll costs one small read instead of building the response.
+    Stack below auth_required so g.user is set.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            seed = f"{g.user['uid']}|{request.full_path}|{version()}"
+            etag = 'v' + hashlib.sha256(seed.encode('utf-8')).hexdigest()[:32]
+            for candidate in (etag, f'{etag}-gzip', f'{etag}-br'):
+                if request.if_none_match.contains(candidate):
+                    response = make_response('', 304)
+                    response.set_etag(candidate)
+                    _cache_headers(response)
+                    return response
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator
+
+
+def always_etag(f):
+    """Give the view's 200 responses a body-hash ETag even below ETAG_MIN_BYTES.
+
+    For small responses that clients poll, where a 304 saves a round of work rather than bytes.
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        response = make_response(f(*args, **kwargs))
+        if response.status_code == 200 and not response.direct_passthrough and not response.is_streamed:
+            response.set_etag(hashlib.sha256(response.get_data()).hexdigest()[:32])
+        return response
+    return wrapper
+
+
+def register_response_hooks(app):
+    app.after_request(conditional_and_compressed)
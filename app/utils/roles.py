@@ -0,0 +1,39 @@
+import os
+import time
+import threading
+from dotenv import load_dotenv
+from app.datastore.scoped import cached_get
+
+load_dotenv()
+
+# Roles only change through the profile and admin endpoints, which invalidate explicitly;
+# the TTL bounds staleness for changes made elsewhere (console edits, other instances).
+ROLE_CACHE_TTL_SECONDS = float(os.getenv('ROLE_CACHE_TTL_SECONDS', 60))
+
+_roles = {}
+_lock = threading.Lock()
+
+
+def get_role(user_id):
+    """Return the user's role from the in-process cache, reading users/{uid}/details/role on a miss."""
+    now = time.monotonic()
+    with _lock:
+        cached = _roles.get(user_id)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    # Read through the request cache: handlers that go on to read the profile reuse this read.
+    role = (cached_get(f'users/{user_id}/details') or {}).get('role')
+    with _lock:
+        _roles[user_id] = (role, now + ROLE_CACHE_TTL_SECONDS)
+    return role
+
+
+def invalidate_role(user_id):
+    with _lock:
+        _roles.pop(user_id, None)
+
+
+def clear_role_cache():
+    with _lock:
+        _roles.clear()
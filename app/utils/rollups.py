@@ -0,0 +1,88 @@
+import logging
+import numpy as np
+from app.datastore import db
+from app.utils.readings import parse_timestamp, vector_magnitude
+
+# Bucket keys sort lexicographically in time order, so range queries can use order_by_key().
+RESOLUTIONS = {
+    'minute': '%Y-%m-%dT%H-%M',
+    'hour': '%Y-%m-%dT%H',
+    'day': '%Y-%m-%d',
+}
+BUCKET_SECONDS = {'minute': 60, 'hour': 3600, 'day': 86400}
+METRICS = ('temperature', 'accel_magnitude', 'gyro_magnitude')
+
+
+def rollup_path(user_id, cow_id, resolution=None):
+    return f"rollups/{user_id}/{cow_id}" + (f"/{resolution}" if resolution else '')
+
+
+def bucket_key(timestamp, resolution):
+    return parse_timestamp(timestamp).strftime(RESOLUTIONS[resolution])
+
+
+def reading_metrics(data):
+    return {
+        'temperature': float(data['temperature']),
+        'accel_magnitude': vector_magnitude(data['accelerometer']),
+        'gyro_magnitude': vector_magnitude(data['gyroscope']),
+    }
+
+
+def merge_sample(bucket, values):
+    bucket = dict(bucket or {})
+    for metric, value in values.items():
+        stats = dict(bucket.get(metric) or {'count': 0, 'min': value, 'max': value, 'sum': 0.0, 'sum_sq': 0.0})
+        stats['count'] += 1
+        stats['min'] = min(stats['min'], value)
+        stats['max'] = max(stats['max'], value)
+        stats['sum'] += value
+        stats['sum_sq'] += value * value
+        stats['mean'] = stats['sum'] / stats['count']
+        bucket[metric] = stats
+    return bucket
+
+
+def summarize_arrays(arrays):
+    """Build the bucket merge_sample would produce for every row of block_storage-style arrays."""
+    magnitude = lambda prefix: np.sqrt(sum(arrays[f'{prefix}_{axis}'].astype(np.float64) ** 2 for axis in 'xyz'))
+    columns = {
+        'temperature': arrays['temperature'].astype(np.float64),
+        'accel_magnitude': magnitude('accel'),
+        'gyro_magnitude': magnitude('gyro'),
+    }
+    bucket = {}
+    for metric, values in columns.items():
+        total = float(values.sum())
+        bucket[metric] = {
+            'count': int(values.size),
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'sum': total,
+            'sum_sq': float((values * values).sum()),
+            'mean': total / values.size,
+        }
+    return bucket
+
+
+def update_rollups(user_id, cow_id, data):
+    try:
+        values = reading_metrics(data)
+        for resolution in RESOLUTIONS:
+            key = bucket_key(data['timestamp'], resolution)
+            ref = db.reference(f"{rollup_path(user_id, cow_id, resolution)}/{key}")
+            ref.transaction(lambda current: merge_sample(current, values))
+        logging.debug("Rollups updated for cow '%s' at %s", cow_id, data['timestamp'])
+    except Exception:
+        logging.exception(f"Failed to update rollups for cow '{cow_id}'")
+
+
+def get_rollups(user_id, cow_id, resolution, start=None, end=None, limit=None):
+    query = db.reference(rollup_path(user_id, cow_id, resolution)).order_by_key()
+    if start:
+        query = query.start_at(bucket_key(start, resolution))
+    if end:
+        query = query.end_at(bucket_key(end, resolution))
+    if limit:
+        query = query.limit_to_last(limit)
+    return query.get() or {}
@@ -3,7 +3,12 @@ import requests
 import logging
 from dotenv import load_dotenv
 from datetime import datetime
-from firebase_admin import db
+from app.datastore import db
+from app.utils.readings import legacy_readings_path, readings_path
+from app.utils.block_storage import READINGS_STORAGE, append_reading
+from app.utils.rollups import update_rollups
+from app.utils.anomaly import detect_anomalies
+from app.utils.live import publish, reading_event
 
 
 load_dotenv()
@@ -26,7 +31,7 @@ def fetch_thingspeak_data():
 
     try:
         feed = response.json()['feeds'][0]
-        logging.debug(f"📥 Raw Feed: {feed}")
+        logging.debug("📥 Raw Feed: %s", feed)
 
         required_fields = ["field1", "field2", "field3", "field4", "field5", "field6", "field7"]
         for field in required_fields:
@@ -50,7 +55,7 @@ def fetch_thingspeak_data():
         }
 
         logging.info(" Successfully parsed ThingSpeak data.")
-        print (f"Data fetched: {data}")
+        logging.debug("Data fetched: %s", data)
         return data
 
     except (KeyError, TypeError, ValueError) as e:
@@ -60,13 +65,18 @@ def fetch_thingspeak_data():
 def save_data_to_firebase(user_id, cow_id, data):
     try:
         timestamp = data["timestamp"].replace(":", "-")
-        ref_path = f"users/{user_id}/cows/{cow_id}/readings"
-        logging.info(f" Saving data to Firebase path: {ref_path}")
-        ref = db.reference(ref_path)
-        ref.child(timestamp).set(data)
-        logging.info(f" Data successfully saved for cow '{cow_id}' at {timestamp}")
+        if READINGS_STORAGE in ('nested', 'both'):
+            ref_path = readings_path(user_id, cow_id)
+            logging.debug(" Saving data to Firebase path: %s", ref_path)
+            ref = db.reference(ref_path)
+            ref.child(timestamp).set(data)
+        if READINGS_STORAGE in ('blocked', 'both'):
+            append_reading(user_id, cow_id, data)
+        logging.info(" Data successfully saved for cow '%s' at %s", cow_id, timestamp)
+        return True
     except Exception as e:
         logging.exception(" Failed to save data to Firebase.")
+        return False
 
 
 def ingest_and_save():
@@ -74,4 +84,26 @@ def ingest_and_save():
     if data:
         user_id = os.getenv("USER_ID")
         cow_id = os.getenv("COW_ID")
-        save_data_to_firebase(user_id, cow_id, data)
+        if save_data_to_firebase(user_id, cow_id, data):
+            update_rollups(user_id, cow_id, data)
+            publish(user_id, cow_id, 'reading', reading_event(cow_id, data))
+            for alert in detect_anomalies(user_id, cow_id, data):
+                publish(user_id, cow_id, 'alert', alert)
+
+
+def migrate_legacy_readings(user_id, cow_id, batch_size=500):
+    """Move readings stored under the cow's metadata node to readings/{uid}/{cow_id}, one batch at a time."""
+    legacy = legacy_readings_path(user_id, cow_id)
+    target = readings_path(user_id, cow_id)
+    moved = 0
+    while True:
+        batch = db.reference(legacy).order_by_key().limit_to_first(batch_size).get()
+        if not batch:
+            break
+        updates = {f"{target}/{key}": reading for key, reading in batch.items()}
+        updates.update({f"{legacy}/{key}": None for key in batch})
+        db.reference().update(updates)
+        moved += len(batch)
+    if moved:
+        logging.info(f" Migrated {moved} readings for cow '{cow_id}' of user {user_id}")
+    return moved
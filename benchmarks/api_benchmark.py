@@ -0,0 +1,369 @@
+"""End-to-end API benchmark: synthetic farms, every blueprint, concurrent clients.
+
+Builds a reproducible data set (farmers x cows x readings, plus one admin) directly in the
+in-memory datastore, runs create_app() in process and drives a weighted mix of auth, cows,
+home, user, admin and predict requests from --threads client threads for --duration seconds.
+DATA_LATENCY_MS-style simulated round trips (--latency-ms) make requests I/O-bound the way
+they are against Firebase. Results are per endpoint throughput and p50/p95/p99 latency as JSON.
+
+With --baseline, endpoints whose p95 grew by more than --max-regression compared to an
+earlier --output file are listed on stderr and the exit status is 1, for use in CI.
+
+Usage:
+    python -m benchmarks.api_benchmark --farmers 20 --cows 100 --readings 500 --threads 16 --duration 30 --output bench.json
+    python -m benchmarks.api_benchmark ... --baseline bench.json --max-regression 0.25
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault('SECRET_KEY', 'benchmark-secret')
+os.environ['DATA_BACKEND'] = 'memory'
+os.environ['DATA_LATENCY_MS'] = '0'  # --latency-ms applies it after seeding
+# Console logging from many threads would dominate what is being measured.
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import numpy as np
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from app import datastore
+from app.datastore import auth, use_backend
+from app.utils import block_storage
+from app.utils.aggregates import rebuild_user_aggregates
+from app.utils.cow_index import rebuild_cow_index
+from app.utils.directory import rebuild_platform_index
+
+PASSWORD = 'benchmark-password'
+BREEDS = ('Holstein', 'Jersey', 'Guernsey', 'Ayrshire')
+HEALTH_STATUSES = ('Healthy', 'Healthy', 'Healthy', 'Pregnant', 'Low Milk', 'Sick')
+READING_INTERVAL_SECONDS = 60
+MILK_INPUT = {'feed_intake': 25.5, 'weight': 550, 'temperature': 38.6, 'days_in_milk': 120}
+DISEASE_INPUT = {
+    'Age': 5, 'Breed': 'Holstein', 'Milk_Production_Liters': 22.5, 'Temperature_C': 38.9,
+    'Heart_Rate_BPM': 72, 'Respiratory_Rate_BPM': 30, 'Appetite_Score': 4, 'Mobility_Score': 4, 'isolated': 'No',
+}
+
+
+def farmer_id(index):
+    return f'farmer_{index:04d}'
+
+
+def cow_id(index):
+    return f'cow_{index:05d}'
+
+
+def synthetic_readings(rng, count, end):
+    """count readings, one per READING_INTERVAL_SECONDS, ending at end."""
+    start = end - timedelta(seconds=READING_INTERVAL_SECONDS * (count - 1))
+    readings = []
+    for i in range(count):
+        moving = rng.random() < 0.3
+        spread = 2.0 if moving else 0.3
+        readings.append({
+            'timestamp': (start + timedelta(seconds=READING_INTERVAL_SECONDS * i)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'temperature': round(rng.gauss(38.6, 0.3), 2),
+            'accelerometer': {axis: round(rng.uniform(-spread, spread), 3) for axis in 'xyz'},
+            'gyroscope': {axis: round(rng.uniform(-spread / 2, spread / 2), 3) for axis in 'xyz'},
+        })
+    return readings
+
+
+def reading_nodes(readings):
+    """Readings in the layouts READINGS_STORAGE writes: {'nested': {...}, 'blocked': {...}}."""
+    nodes = {}
+    if block_storage.READINGS_STORAGE in ('nested', 'both'):
+        nodes['nested'] = {block_storage.reading_key(reading['timestamp']): reading for reading in readings}
+    if block_storage.READINGS_STORAGE in ('blocked', 'both'):
+        arrays = block_storage.nested_to_arrays({block_storage.reading_key(r['timestamp']): r for r in readings})
+        nodes['blocked'] = {
+            key: block_storage.encode_block(int(key) * 1000, rows['timestamp'], rows)
+            for key, rows in block_storage.split_into_blocks(arrays)
+        }
+    return nodes
+
+
+def build_farms(farmers, cows, readings, seed):
+    rng = random.Random(seed)
+    password_hash = generate_password_hash(PASSWORD)
+    end = datetime.now(timezone.utc).replace(microsecond=0)
+    data = {'users': {}, 'readings': {}, 'reading_blocks': {}}
+    accounts = []
+
+    for f in range(farmers):
+        uid = farmer_id(f)
+        email = f'{uid}@example.com'
+        herd = {}
+        for c in range(cows):
+            herd[cow_id(c)] = {
+                'name': f'Cow {c}',
+                'breed': rng.choice(BREEDS),
+                'age': rng.randint(2, 12),
+                'health_status': rng.choice(HEALTH_STATUSES),
+                'milk_production': round(rng.uniform(5, 35), 1),
+                'created_at': end.isoformat().replace('+00:00', 'Z'),
+            }
+            if readings:
+                nodes = reading_nodes(synthetic_readings(rng, readings, end))
+                if 'nested' in nodes:
+                    data['readings'].setdefault(uid, {})[cow_id(c)] = nodes['nested']
+                if 'blocked' in nodes:
+                    data['reading_blocks'].setdefault(uid, {})[cow_id(c)] = nodes['blocked']
+        data['users'][uid] = {
+            'details': {'name': f'Farmer {f}', 'email': email, 'role': 'farmer', 'password': password_hash},
+            'cows': herd,
+        }
+        accounts.append((uid, email))
+
+    admin = ('admin_0000', 'admin@example.com')
+    data['users'][admin[0]] = {'details': {'name': 'Admin', 'email': admin[1], 'role': 'admin', 'password': password_hash}}
+    return data, accounts, admin
+
+
+def seed(data, accounts, admin):
+    use_backend('memory', data)
+    for uid, email in accounts + [admin]:
+        auth.create_user(email=email, password=PASSWORD, uid=uid)
+    for uid, _ in accounts:
+        rebuild_user_aggregates(uid)
+        rebuild_cow_index(uid)
+    rebuild_platform_index()
+
+
+class Session:
+    """One simulated client: a test client, the farmer it acts as and its tokens."""
+
+    def __init__(self, app, email, cows, admin_headers, rng):
+        self.client = app.test_client()
+        self.email = email
+        self.cows = cows
+        self.admin_headers = admin_headers
+        self.rng = rng
+        self.created = []
+        self.counter = 0
+        self.login()
+
+    def login(self):
+        response = self.client.post('/auth/login', json={'email': self.email, 'password': PASSWORD})
+        body = response.get_json() or {}
+        self.headers = {'Authorization': f"Bearer {body.get('token')}"}
+        self.refresh_token = body.get('refresh_token')
+        return response
+
+    def refresh(self):
+        response = self.client.post('/auth/refresh', json={'refresh_token': self.refresh_token})
+        body = response.get_json() or {}
+        if response.status_code == 200:
+            self.headers = {'Authorization': f"Bearer {body['token']}"}
+            self.refresh_token = body['refresh_token']
+        return response
+
+    def cow(self):
+        return cow_id(self.rng.randrange(self.cows))
+
+    def get(self, path, admin=False):
+        return self.client.get(path, headers=self.admin_headers if admin else self.headers)
+
+    def add_cow(self):
+        self.counter += 1
+        new_id = f'bench_{threading.get_ident() % 100000}_{self.counter}'
+        response = self.client.post('/cows/addcow', headers=self.headers, json={
+            'cow_id': new_id, 'name': 'Bench', 'breed': 'Jersey', 'age': 3,
+            'health_status': 'Healthy', 'milk_production': 12.5,
+        })
+        if response.status_code in (200, 201):
+            self.created.append(new_id)
+        return response
+
+    def delete_cow(self):
+        return self.client.delete(f'/cows/delete/{self.created.pop()}', headers=self.headers)
+
+
+# name -> (weight, request, accepted status codes)
+SCENARIO = {
+    'POST /auth/login': (1, lambda s: s.login(), (200,)),
+    'POST /auth/refresh': (1, lambda s: s.refresh(), (200,)),
+    'GET /cows/getall': (10, lambda s: s.get('/cows/getall'), (200,)),
+    'GET /cows/getall?limit': (4, lambda s: s.get('/cows/getall?limit=50&fields=name,health_status'), (200,)),
+    'GET /cows/search': (4, lambda s: s.get('/cows/search?filter=health_status%3DHealthy&filter=age%3E%3D5'), (200,)),
+    'GET /cows/<id>/profile': (8, lambda s: s.get(f'/cows/{s.cow()}/profile'), (200, 404)),
+    'GET /cows/<id>/activity': (3, lambda s: s.get(f'/cows/{s.cow()}/activity'), (200, 404)),
+    'GET /cows/<id>/rollups': (2, lambda s: s.get(f'/cows/{s.cow()}/rollups?resolution=hour'), (200,)),
+    'GET /cows/<id>/alerts': (2, lambda s: s.get(f'/cows/{s.cow()}/alerts'), (200,)),
+    'GET /cows/export': (1, lambda s: s.get('/cows/export?what=cows&format=ndjson'), (200,)),
+    'POST /cows/addcow': (2, lambda s: s.add_cow(), (200, 201)),
+    'PATCH /cows/update/<id>': (2, lambda s: s.client.patch(
+        f'/cows/update/{s.cow()}', headers=s.headers, json={'milk_production': round(s.rng.uniform(5, 35), 1)}), (200,)),
+    'DELETE /cows/delete/<id>': (2, lambda s: s.delete_cow() if s.created else None, (200,)),
+    'GET /home/': (8, lambda s: s.get('/home/'), (200,)),
+    'GET /home/healthsummary': (4, lambda s: s.get('/home/healthsummary'), (200,)),
+    'GET /user/profile': (4, lambda s: s.get('/user/profile'), (200,)),
+    'PUT /user/update': (1, lambda s: s.client.put(
+        '/user/update', headers=s.headers, json={'name': f'Farmer {s.rng.randrange(1000)}', 'email': s.email}), (200,)),
+    'GET /admin/dashboard': (1, lambda s: s.get('/admin/dashboard', admin=True), (200,)),
+    'GET /admin/users': (1, lambda s: s.get('/admin/users?limit=50', admin=True), (200,)),
+    # Raw body: the test client's json= sorts keys, and the milk model needs its training column order.
+    'POST /predict/milk': (1, lambda s: s.client.post(
+        '/predict/milk', headers=s.headers, data=json.dumps(MILK_INPUT), content_type='application/json'), (200,)),
+    'POST /predict/disease': (1, lambda s: s.client.post('/predict/disease', headers=s.headers, json=dict(DISEASE_INPUT)), (200,)),
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)] * 1000, 2)
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+    }
+
+
+def run(app, accounts, admin, args, scenario):
+    admin_client = app.test_client()
+    admin_token = admin_client.post('/auth/login', json={'email': admin[1], 'password': PASSWORD}).get_json()['token']
+    admin_headers = {'Authorization': f'Bearer {admin_token}'}
+
+    names = list(scenario)
+    weights = [scenario[name][0] for name in names]
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    failures = {}
+    lock = threading.Lock()
+    start = threading.Barrier(args.threads + 1)
+    stop_at = [None]
+
+    def client(index):
+        rng = random.Random(args.seed * 1000 + index)
+        session = Session(app, accounts[index % len(accounts)][1], args.cows, admin_headers, rng)
+        # Warm up once per endpoint so one-off costs (model loading, index building) are excluded.
+        for name in names:
+            scenario[name][1](session)
+        mine = {name: [] for name in names}
+        failed = {name: 0 for name in names}
+        start.wait()
+        while time.perf_counter() < stop_at[0]:
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            response = scenario[name][1](session)
+            if response is None:
+                continue
+            response.get_data()
+            elapsed = time.perf_counter() - started
+            if response.status_code in scenario[name][2]:
+                mine[name].append(elapsed)
+            else:
+                failed[name] += 1
+                with lock:
+                    failures.setdefault(name, response.status_code)
+        with lock:
+            for name in names:
+                latencies[name].extend(mine[name])
+                errors[name] += failed[name]
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    stop_at[0] = time.perf_counter() + 3600
+    start.wait()
+    began = time.perf_counter()
+    stop_at[0] = began + args.duration
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        'total': summarize(everything, sum(errors.values()), elapsed),
+        'endpoints': {name: summarize(latencies[name], errors[name], elapsed) for name in names if latencies[name] or errors[name]},
+        'first_error_status': failures,
+    }
+
+
+def regressions(result, baseline, max_regression):
+    found = []
+    for name, current in result['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if not previous or not previous.get('p95_ms') or not current.get('p95_ms'):
+            continue
+        # Ignore sub-millisecond noise on very fast endpoints.
+        if current['p95_ms'] > previous['p95_ms'] * (1 + max_regression) and current['p95_ms'] - previous['p95_ms'] > 1:
+            found.append(f"{name}: p95 {previous['p95_ms']} ms -> {current['p95_ms']} ms")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--farmers', type=int, default=10)
+    parser.add_argument('--cows', type=int, default=50, help='Cows per farmer.')
+    parser.add_argument('--readings', type=int, default=200, help='Readings per cow.')
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent clients.')
+    parser.add_argument('--duration', type=float, default=20, help='Measured seconds, after warm-up.')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Simulated round trip per database call.')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--endpoints', nargs='+', help='Only these scenario names (e.g. "GET /home/").')
+    parser.add_argument('--no-predict', action='store_true', help='Leave out the model inference endpoints.')
+    parser.add_argument('--output', help='Also write the JSON report to this file.')
+    parser.add_argument('--baseline', help='Earlier report to compare p95 latencies against.')
+    parser.add_argument('--max-regression', type=float, default=0.25)
+    args = parser.parse_args()
+
+    scenario = {name: entry for name, entry in SCENARIO.items()
+                if (not args.endpoints or name in args.endpoints) and not (args.no_predict and name.startswith('POST /predict'))}
+    if not scenario:
+        parser.error(f"No matching endpoints. Choose from: {', '.join(SCENARIO)}")
+
+    started = time.perf_counter()
+    data, accounts, admin = build_farms(args.farmers, args.cows, args.readings, args.seed)
+    app = create_app()
+    seed(data, accounts, admin)
+    # Seeding runs without delays; the simulated round trips only apply to measured requests.
+    store, local_auth = datastore._local_backend()
+    store.latency = local_auth.latency = args.latency_ms / 1000
+    seed_seconds = time.perf_counter() - started
+
+    # Keras prints a progress bar per prediction; keep stdout for the report.
+    with contextlib.redirect_stdout(sys.stderr):
+        result = run(app, accounts, admin, args, scenario)
+    report = {
+        'config': {
+            'farmers': args.farmers, 'cows_per_farmer': args.cows, 'readings_per_cow': args.readings,
+            'threads': args.threads, 'duration_seconds': args.duration, 'latency_ms': args.latency_ms,
+            'seed': args.seed, 'readings_storage': block_storage.READINGS_STORAGE,
+            'python': sys.version.split()[0], 'numpy': np.__version__,
+        },
+        'seed_seconds': round(seed_seconds, 2),
+        **result,
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            found = regressions(result, json.load(f), args.max_regression)
+        if found:
+            print(f"p95 regressions over {args.max_regression:.0%}:", *found, sep='\n  ', file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Compare the legacy nested readings layout with blocked columnar storage.
+
+Measures the serialized JSON size of one cow's readings in both layouts and the time
+to turn the downloaded JSON into NumPy arrays.
+
+Usage:
+    python -m benchmarks.bench_block_storage --readings 17280 --interval 5
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.utils import block_storage
+
+
+def synthetic_readings(count, interval_seconds, seed=7):
+    rng = random.Random(seed)
+    start = datetime(2025, 8, 14, tzinfo=timezone.utc)
+    readings = []
+    for i in range(count):
+        timestamp = (start + timedelta(seconds=i * interval_seconds)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        readings.append({
+            'accelerometer': {'x': rng.uniform(-2, 2), 'y': rng.uniform(-2, 2), 'z': rng.uniform(-2, 2)},
+            'gyroscope': {'x': rng.uniform(-1, 1), 'y': rng.uniform(-1, 1), 'z': rng.uniform(-1, 1)},
+            'temperature': round(rng.gauss(38.6, 0.3), 2),
+            'timestamp': timestamp,
+        })
+    return readings
+
+
+def nested_layout(readings):
+    return {reading['timestamp'].replace(':', '-'): reading for reading in readings}
+
+
+def blocked_layout(readings):
+    arrays = block_storage.nested_to_arrays(nested_layout(readings))
+    return {
+        key: block_storage.encode_block(int(key) * 1000, columns['timestamp'], columns)
+        for key, columns in block_storage.split_into_blocks(arrays)
+    }
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readings', type=int, default=17280, help='samples per cow (default: one day at 5s)')
+    parser.add_argument('--interval', type=int, default=5, help='seconds between samples')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    readings = synthetic_readings(args.readings, args.interval)
+    nested_json = json.dumps(nested_layout(readings))
+    blocked_json = json.dumps(blocked_layout(readings))
+
+    def decode_nested():
+        return block_storage.nested_to_arrays(json.loads(nested_json))
+
+    def decode_blocked():
+        blocks = json.loads(blocked_json)
+        return block_storage.concat_arrays([block_storage.decode_block(blocks[key]) for key in sorted(blocks)])
+
+    assert np.array_equal(decode_nested()['timestamp'], decode_blocked()['timestamp'])
+
+    nested_seconds = best_of(decode_nested, args.repeat)
+    blocked_seconds = best_of(decode_blocked, args.repeat)
+    print(json.dumps({
+        'readings': args.readings,
+        'block_seconds': block_storage.BLOCK_SECONDS,
+        'nested': {'bytes': len(nested_json), 'decode_ms': round(nested_seconds * 1000, 2)},
+        'blocked': {'bytes': len(blocked_json), 'decode_ms': round(blocked_seconds * 1000, 2)},
+        'size_ratio': round(len(nested_json) / len(blocked_json), 2),
+        'decode_speedup': round(nested_seconds / blocked_seconds, 2),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Measure bytes on the wire and server CPU per poll with and without ETags and compression.
+
+Runs the real app on the in-memory datastore with one synthetic farm and polls the read
+endpoints mobile clients hit most, in three modes: the response layer disabled, a first poll
+with gzip, and a repeat poll sending If-None-Match for unchanged data.
+
+Usage:
+    python -m benchmarks.bench_http_cache --cows 500 --polls 200
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault('SECRET_KEY', 'benchmark-secret')
+os.environ['DATA_BACKEND'] = 'memory'
+
+from app import create_app
+from app.datastore import use_backend
+from app.utils.responses import conditional_and_compressed
+
+ENDPOINTS = ('/cows/getall', '/home/', '/home/healthsummary')
+HEALTH_STATUSES = ('Healthy', 'Healthy', 'Healthy', 'Pregnant', 'Low Milk', 'Sick')
+
+
+def build_farm(client, cows, seed=7):
+    rng = random.Random(seed)
+    client.post('/auth/register', json={'email': 'bench@example.com', 'password': 'bench', 'name': 'Bench', 'role': 'farmer'})
+    token = client.post('/auth/login', json={'email': 'bench@example.com', 'password': 'bench'}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    operations = [{
+        'op': 'create',
+        'cow_id': f'cow_{i:05d}',
+        'name': f'Cow {i}',
+        'breed': rng.choice(('Holstein', 'Jersey', 'Guernsey', 'Ayrshire')),
+        'age': rng.randint(2, 12),
+        'health_status': rng.choice(HEALTH_STATUSES),
+        'milk_production': round(rng.uniform(5, 35), 1),
+    } for i in range(cows)]
+    for start in range(0, len(operations), 500):
+        client.post('/cows/bulk', json={'operations': operations[start:start + 500]}, headers=headers)
+    return headers
+
+
+def poll(client, path, headers, count):
+    sent, cpu = 0, 0.0
+    for _ in range(count):
+        started = time.process_time()
+        response = client.get(path, headers=headers)
+        cpu += time.process_time() - started
+        sent += len(response.get_data()) + sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+    return response, sent / count, cpu / count * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cows', type=int, default=500)
+    parser.add_argument('--polls', type=int, default=200)
+    args = parser.parse_args()
+
+    use_backend('memory')
+    app = create_app()
+    client = app.test_client()
+    auth = build_farm(client, args.cows)
+    hooks = app.after_request_funcs.setdefault(None, [])
+
+    print(f"{args.cows} cows, {args.polls} polls per mode (bytes include headers; CPU is server+client in-process)")
+    for path in ENDPOINTS:
+        hooks.remove(conditional_and_compressed)
+        _, before_bytes, before_cpu = poll(client, path, auth, args.polls)
+        hooks.append(conditional_and_compressed)
+
+        gzip_headers = {**auth, 'Accept-Encoding': 'gzip'}
+        response, first_bytes, first_cpu = poll(client, path, gzip_headers, args.polls)
+        etag = response.headers.get('ETag')
+
+        print(f"  {path}")
+        print(f"    before                 {before_bytes:10.0f} B   {before_cpu:7.3f} ms")
+        print(f"    after, changed data    {first_bytes:10.0f} B   {first_cpu:7.3f} ms")
+        if etag:
+            response, repeat_bytes, repeat_cpu = poll(client, path, {**gzip_headers, 'If-None-Match': etag}, args.polls)
+            assert response.status_code == 304, response.status_code
+            print(f"    after, unchanged (304) {repeat_bytes:10.0f} B   {repeat_cpu:7.3f} ms")
+        else:
+            print("    after, unchanged        body below ETAG_MIN_BYTES, sent as before")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Measure what logging costs the calling (request) thread, before and after the queue pipeline.
+
+"before" is the old setup_logger: RotatingFileHandler and a console StreamHandler formatting
+and writing on the caller's thread. "after" is the current setup_logger: the caller only
+enqueues, and a listener thread formats JSON and writes. Console output goes to a temporary
+file so the terminal does not dominate the numbers.
+
+Usage:
+    python -m benchmarks.bench_logging --records 20000
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from logging import StreamHandler
+from logging.handlers import RotatingFileHandler
+
+from app.utils import logger as app_logger
+
+PAYLOAD = {'age': 4, 'breed': 'Holstein Friesian', 'health_status': 'Healthy', 'feed_intake': 25.5}
+
+
+def legacy_setup(log_file, console):
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+    formatter = logging.Formatter('[%(asctime)s] %(levelname)s in %(module)s: %(message)s')
+    for handler in (RotatingFileHandler(log_file, maxBytes=1_000_000, backupCount=5), StreamHandler(console)):
+        handler.setFormatter(formatter)
+        logging.root.addHandler(handler)
+    logging.root.setLevel(logging.INFO)
+
+
+def per_call_us(records, call):
+    started = time.perf_counter()
+    for i in range(records):
+        call(i)
+    return (time.perf_counter() - started) / records * 1e6
+
+
+def run(records):
+    results = {}
+    calls = {
+        'info, hot path': lambda i: logging.info("Fetched %d cows for user %s", i, 'uid_123'),
+        'debug payload (disabled), f-string': lambda i: logging.debug(f"User uid_123 sent data for prediction: {PAYLOAD}"),
+        'debug payload (disabled), lazy': lambda i: logging.debug("User %s sent data for prediction: %s", 'uid_123', PAYLOAD),
+    }
+    with tempfile.TemporaryDirectory() as tmp, open(os.path.join(tmp, 'console.log'), 'w') as console:
+        legacy_setup(os.path.join(tmp, 'legacy.log'), console)
+        results['before'] = {name: per_call_us(records, call) for name, call in calls.items()}
+
+        stderr, sys.stderr = sys.stderr, console
+        try:
+            app_logger.setup_logger()
+            # Rate limiting would hide the formatting cost being measured.
+            for handler in logging.root.handlers:
+                handler.filters.clear()
+            results['after'] = {name: per_call_us(records, call) for name, call in calls.items()}
+            app_logger._listener.stop()
+            app_logger._listener = None
+        finally:
+            sys.stderr = stderr
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=20000)
+    args = parser.parse_args()
+
+    results = run(args.records)
+    print(f"{args.records} records, microseconds per call on the calling thread")
+    for name in results['before']:
+        print(f"  {name:38} before {results['before'][name]:7.2f}   after {results['after'][name]:7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Compare per-request auth overhead of the old and new role_required decorators.
+
+The old decorator decoded the token a second time and read users/{uid}/details/role from
+the database on every request. The new one reuses g.user and takes the role from the token
+claim, falling back to a TTL cache for tokens issued without one. Database latency is
+simulated with a sleep so results do not depend on network conditions.
+
+Usage:
+    python -m benchmarks.bench_role_lookup --requests 200 --db-latency-ms 30
+"""
+import argparse
+import os
+import statistics
+import time
+from functools import wraps
+from unittest import mock
+
+os.environ.setdefault('SECRET_KEY', 'benchmark-secret')
+
+from flask import Flask, g, jsonify, request
+
+from app.utils import auth_helper, roles
+from app.utils.decorators import auth_required, role_required
+
+
+def legacy_role_required(required_roles, db_get):
+    """The decorator as it was: second token decode plus a database read per request."""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            token = request.headers.get('Authorization', '').replace('Bearer ', '')
+            user_data = auth_helper.verify_token(token)
+            if db_get(f"users/{user_data['uid']}/details/role") not in required_roles:
+                return jsonify({'message': 'access required!'}), 403
+            return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def build_app(db_get):
+    app = Flask(__name__)
+
+    def handler():
+        return jsonify({'uid': g.user['uid']})
+
+    app.add_url_rule('/legacy', 'legacy', auth_required(legacy_role_required(['farmer'], db_get)(handler)))
+    app.add_url_rule('/current', 'current', auth_required(role_required('farmer')(handler)))
+    return app
+
+
+def measure(client, path, token, count):
+    headers = {'Authorization': f'Bearer {token}'}
+    timings = []
+    for _ in range(count):
+        started = time.perf_counter()
+        response = client.get(path, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.get_json()
+    timings.sort()
+    return {
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'p50_ms': round(timings[len(timings) // 2], 3),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--db-latency-ms', type=float, default=30.0, help='simulated Firebase round trip')
+    args = parser.parse_args()
+
+    auth_helper.SECRET_KEY = os.environ['SECRET_KEY']
+    reads = []
+
+    def db_get(path):
+        reads.append(path)
+        time.sleep(args.db_latency_ms / 1000)
+        return 'farmer'
+
+
+    # No token is revoked; the revocation check is a database read on each token-cache miss.
+    revocations = mock.Mock()
+    revocations.reference.return_value.get.return_value = None
+
+    with mock.patch.object(roles, 'cached_get', lambda path: {'role': db_get(path)}), \
+            mock.patch.object(auth_helper, 'db', revocations), \
+            mock.patch.object(auth_helper.logging, 'info'):
+        client = build_app(db_get).test_client()
+        claim_token = auth_helper.generate_token('bench-user', 'farmer')
+        legacy_token = auth_helper.generate_token('bench-user')
+
+        results = {}
+        for name, path, token in (
+            ('before (double decode + db read)', '/legacy', legacy_token),
+            ('after (role claim)', '/current', claim_token),
+            ('after (no claim, cached role)', '/current', legacy_token),
+        ):
+            reads.clear()
+            roles.clear_role_cache()
+            results[name] = {**measure(client, path, token, args.requests), 'db_reads': len(reads)}
+
+    print(f"{args.requests} requests, simulated database latency {args.db_latency_ms} ms")
+    for name, result in results.items():
+        print(f"  {name:34s} mean {result['mean_ms']:8.3f} ms  p50 {result['p50_ms']:8.3f} ms  "
+              f"p95 {result['p95_ms']:8.3f} ms  db reads {result['db_reads']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""Compare how many concurrent requests one gunicorn worker sustains in each serving mode.
+
+Starts a single-worker gunicorn (gunicorn.conf.py) per worker class on the in-memory datastore
+with DATA_LATENCY_MS of simulated round-trip time per database call, then drives the farmer
+read endpoints from many client threads at several concurrency levels. Parallelism is
+throughput relative to a single client: how many requests the worker effectively serves at once.
+
+Usage:
+    python -m benchmarks.load_test --modes sync gthread gevent --concurrency 1 16 64 256
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+os.environ.setdefault('SECRET_KEY', 'benchmark-secret')
+
+from app.utils.auth_helper import generate_token
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USER_ID = 'loadtest_farmer'
+PATHS = ('/cows/getall?limit=50', '/home/', '/home/healthsummary', '/user/profile')
+
+
+def build_seed(cows, seed=7):
+    rng = random.Random(seed)
+    herd = {
+        f'cow_{i:05d}': {
+            'name': f'Cow {i}',
+            'breed': rng.choice(('Holstein', 'Jersey', 'Guernsey', 'Ayrshire')),
+            'age': rng.randint(2, 12),
+            'health_status': rng.choice(('Healthy', 'Healthy', 'Pregnant', 'Sick')),
+            'milk_production': round(rng.uniform(5, 35), 1),
+        } for i in range(cows)
+    }
+    return {'users': {USER_ID: {
+        'details': {'name': 'Load Test', 'email': 'load@example.com', 'role': 'farmer'},
+        'cows': herd,
+    }}}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, port, seed_file, args):
+    env = {
+        **os.environ,
+        'DATA_BACKEND': 'memory',
+        'DATA_SEED_FILE': seed_file,
+        'DATA_LATENCY_MS': str(args.latency_ms),
+        'PORT': str(port),
+        'WEB_CONCURRENCY': '1',
+        'GUNICORN_WORKER_CLASS': mode,
+        'GUNICORN_THREADS': str(args.threads),
+        'GUNICORN_TIMEOUT': '120',
+    }
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', 'run:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/', timeout=1)
+            return server
+        except requests.RequestException:
+            time.sleep(0.5)
+    stop_server(server)
+    raise RuntimeError(f"gunicorn ({mode}) did not start within {args.startup_timeout}s")
+
+
+def stop_server(server):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def drive(base_url, token, concurrency, duration):
+    stop_at = time.monotonic() + duration
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def client(index):
+        session = requests.Session()
+        session.headers['Authorization'] = f'Bearer {token}'
+        mine, failed, turn = [], 0, index
+        while time.monotonic() < stop_at:
+            path = PATHS[turn % len(PATHS)]
+            turn += 1
+            started = time.perf_counter()
+            try:
+                ok = session.get(base_url + path, timeout=60).status_code == 200
+            except requests.RequestException:
+                ok = False
+            if ok:
+                mine.append(time.perf_counter() - started)
+            else:
+                failed += 1
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    started = time.monotonic()
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    throughput = len(latencies) / elapsed
+    percentile = lambda p: round(latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000, 1) if latencies else None
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': round(throughput, 1),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modes', nargs='+', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 16, 64, 256])
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per concurrency level.')
+    parser.add_argument('--latency-ms', type=float, default=50, help='Simulated database round trip.')
+    parser.add_argument('--cows', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8, help='GUNICORN_THREADS for gthread.')
+    parser.add_argument('--startup-timeout', type=float, default=120)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+    args = parser.parse_args()
+
+    token = generate_token(USER_ID, 'farmer')
+    results = {}
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(build_seed(args.cows), f)
+        seed_file = f.name
+    try:
+        for mode in args.modes:
+            port = free_port()
+            server = start_server(mode, port, seed_file, args)
+            try:
+                drive(f'http://127.0.0.1:{port}', token, 4, 2)  # warm up caches and lazy imports
+                results[mode] = [drive(f'http://127.0.0.1:{port}', token, level, args.duration) for level in args.concurrency]
+            finally:
+                stop_server(server)
+    finally:
+        os.unlink(seed_file)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"1 worker, {args.latency_ms:g} ms per database call, {args.duration:g}s per level")
+    print(f"{'mode':8} {'clients':>7} {'req/s':>8} {'parallel':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6}")
+    for mode, rows in results.items():
+        single = rows[0]['rps'] / rows[0]['concurrency'] or 1
+        for row in rows:
+            print(f"{mode:8} {row['concurrency']:7d} {row['rps']:8.1f} {row['rps'] / single:8.1f} "
+                  f"{row['p50_ms']!s:>8} {row['p95_ms']!s:>8} {row['errors']:6d}")
+
+
+if __name__ == '__main__':
+    main()
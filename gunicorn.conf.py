@@ -0,0 +1,26 @@
+"""Gunicorn settings. Every value can be overridden from the environment.
+
+GUNICORN_WORKER_CLASS selects the serving mode:
+  gevent   many requests per worker on greenlets (default). Firebase REST calls, Firebase
+           Auth and outbound HTTP all go through requests/urllib3, which gevent's monkey
+           patching makes cooperative. /cows/<cow_id>/live streams also need this mode.
+  gthread  GUNICORN_THREADS requests per worker on OS threads.
+  sync     one request per worker at a time.
+
+benchmarks/load_test.py measures how many concurrent requests each mode sustains.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+# Gunicorn silently turns sync into gthread when threads > 1, so only gthread gets threads.
+threads = int(os.getenv('GUNICORN_THREADS', 8)) if worker_class == 'gthread' else 1
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# The app is loaded in each worker after gevent has patched the standard library. Preloading
+# it in the master would create locks, sockets and the scheduler's threads unpatched.
+preload_app = False
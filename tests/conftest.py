@@ -0,0 +1,37 @@
+import os
+
+os.environ['DATA_BACKEND'] = 'memory'
+os.environ['DATA_LATENCY_MS'] = '0'
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import pytest
+
+from app import create_app
+from app.datastore import use_backend
+from app.utils.auth_helper import generate_token
+from app.utils.roles import clear_role_cache
+
+
+@pytest.fixture(scope='session')
+def app():
+    return create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def seed():
+    """Reset the in-memory database; call the fixture with data to start from it instead."""
+    use_backend('memory')
+    clear_role_cache()
+    return lambda data: use_backend('memory', data)
+
+
+@pytest.fixture
+def headers():
+    """Authorization headers carrying a fresh access token for uid."""
+    return lambda uid, role='farmer': {'Authorization': f'Bearer {generate_token(uid, role)}'}
@@ -0,0 +1,66 @@
+from app.datastore import db
+from app.utils.directory import rebuild_platform_index
+
+ADMIN = 'admin_1'
+FARMER = 'farmer_1'
+COW = {'cow_id': 'cow_1', 'name': 'Daisy', 'breed': 'Jersey', 'age': 4, 'health_status': 'Healthy', 'milk_production': 20.5}
+
+
+def platform():
+    return {'users': {
+        ADMIN: {'details': {'name': 'Admin', 'email': 'admin@example.com', 'role': 'admin'}},
+        FARMER: {'details': {'name': 'Farmer', 'email': 'farmer@example.com', 'role': 'farmer'}},
+    }}
+
+
+def test_deleted_user_token_loses_access(client, seed, headers):
+    seed(platform())
+    farmer = headers(FARMER)
+    assert client.get('/home/', headers=farmer).status_code == 200
+
+    assert client.delete(f'/admin/delete_user/{FARMER}', headers=headers(ADMIN, 'admin')).status_code == 200
+
+    assert client.get('/home/', headers=farmer).status_code == 403
+    assert client.post('/cows/addcow', headers=farmer, json=COW).status_code == 403
+    assert db.reference(f'users/{FARMER}').get() is None
+
+
+def test_role_claim_does_not_override_the_database(client, seed, headers):
+    seed(platform())
+
+    assert client.get('/admin/users', headers=headers(FARMER, 'admin')).status_code == 403
+
+
+def test_dashboard_needs_the_platform_index_and_never_builds_it(client, seed, headers):
+    seed(platform())
+    admin = headers(ADMIN, 'admin')
+
+    assert client.get('/admin/dashboard', headers=admin).status_code == 503
+    assert client.get('/admin/users', headers=admin).status_code == 503
+    assert db.reference('platform').get() is None
+
+    rebuild_platform_index()
+
+    assert client.get('/admin/dashboard', headers=admin).get_json() == {'total_cows': 0, 'total_farmers': 1}
+
+
+def test_users_pages_numeric_ids_in_database_key_order(client, seed, headers):
+    user_ids = ['9', '10', '11', 'a1', 'b2']
+    data = platform()
+    data['users'].update({
+        user_id: {'details': {'name': user_id, 'email': f'{user_id}@example.com', 'role': 'farmer'}} for user_id in user_ids
+    })
+    seed(data)
+    rebuild_platform_index()
+    admin = headers(ADMIN, 'admin')
+
+    pages, cursor = [], None
+    while True:
+        url = '/admin/users?limit=2' + (f'&start_after={cursor}' if cursor else '')
+        body = client.get(url, headers=admin).get_json()
+        pages.append([user['user_id'] for user in body['users']])
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+
+    assert pages == [['9', '10'], ['11', 'a1'], ['b2', FARMER]]
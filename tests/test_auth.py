@@ -0,0 +1,79 @@
+import time
+
+from app.datastore import db
+from app.utils.auth_helper import REFRESH_TOKENS_PATH, REVOKED_TOKENS_PATH, issue_refresh_token, prune_expired_tokens, token_digest
+
+FARMER = 'farmer_1'
+
+
+def farmer(seed):
+    seed({'users': {FARMER: {'details': {'name': 'Farmer', 'email': 'farmer@example.com', 'role': 'farmer'}}}})
+
+
+def refresh(client, refresh_token):
+    return client.post('/auth/refresh', json={'refresh_token': refresh_token})
+
+
+def test_refresh_issues_a_new_pair_and_the_old_token_is_single_use(client, seed):
+    farmer(seed)
+    refresh_token = issue_refresh_token(FARMER)
+
+    response = refresh(client, refresh_token)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['refresh_token'] != refresh_token
+    assert client.get('/home/', headers={'Authorization': f"Bearer {body['token']}"}).status_code == 200
+
+    assert refresh(client, refresh_token).status_code == 401
+    assert refresh(client, body['refresh_token']).status_code == 200
+
+
+def test_refresh_rejects_unknown_and_expired_tokens(client, seed):
+    farmer(seed)
+    expired = issue_refresh_token(FARMER)
+    db.reference(f'{REFRESH_TOKENS_PATH}/{token_digest(expired)}/expires_at').set(time.time() - 1)
+
+    assert refresh(client, 'not-a-token').status_code == 401
+    assert refresh(client, expired).status_code == 401
+    assert client.post('/auth/refresh', json={}).status_code == 400
+
+
+def test_used_refresh_tokens_are_pruned(client, seed):
+    farmer(seed)
+    refresh_token = issue_refresh_token(FARMER)
+    refresh(client, refresh_token)
+
+    prune_expired_tokens()
+
+    assert db.reference(f'{REFRESH_TOKENS_PATH}/{token_digest(refresh_token)}').get() is None
+
+
+def test_logout_revokes_the_access_token_and_the_refresh_token(client, seed, headers):
+    farmer(seed)
+    auth = headers(FARMER)
+    other_session = headers(FARMER)
+    refresh_token = issue_refresh_token(FARMER)
+
+    response = client.post('/auth/logout', headers=auth, json={'refresh_token': refresh_token})
+
+    assert response.status_code == 200
+    assert client.get('/home/', headers=auth).status_code == 401
+    assert client.get('/home/', headers=other_session).status_code == 200
+    assert refresh(client, refresh_token).status_code == 401
+
+
+def test_revocation_lookup_failure_falls_back_to_local_revocations(client, seed, headers, monkeypatch):
+    farmer(seed)
+    auth, revoked = headers(FARMER), headers(FARMER)
+    assert client.post('/auth/logout', headers=revoked).status_code == 200
+
+    def unavailable(path='/'):
+        if path.startswith(REVOKED_TOKENS_PATH):
+            raise ConnectionError('database unavailable')
+        return reference(path)
+
+    reference = db.reference
+    monkeypatch.setattr(db, 'reference', unavailable)
+
+    assert client.get('/home/', headers=auth).status_code == 200
+    assert client.get('/home/', headers=revoked).status_code == 401
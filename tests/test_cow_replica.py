@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+import pytest
+
+import app.utils.cow_replica as cow_replica
+
+FARMER = 'farmer_1'
+
+
+def event(path, data, event_type='put'):
+    return SimpleNamespace(event_type=event_type, path=path, data=data)
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    monkeypatch.setattr(cow_replica, 'COW_REPLICA_ENABLED', True)
+    replica = cow_replica._Replica(FARMER)
+    replica.apply(event('/', {'cow_1': {'name': 'Daisy'}}))
+    monkeypatch.setitem(cow_replica._replicas, FARMER, replica)
+    return replica
+
+
+def test_echo_of_an_earlier_write_keeps_reads_direct(replica):
+    cow_replica.note_write(FARMER, {'cow_1': {'name': 'Bella'}})
+    cow_replica.note_write(FARMER, {'cow_1': {'name': 'Clover'}})
+
+    replica.apply(event('/cow_1/name', 'Bella'))
+    assert cow_replica.get_cows(FARMER) is None
+
+    replica.apply(event('/cow_1/name', 'Clover'))
+    assert cow_replica.get_cows(FARMER) == {'cow_1': {'name': 'Clover'}}
+
+
+def test_delete_clears_only_when_the_cow_is_gone(replica):
+    cow_replica.note_write(FARMER, {'cow_1': None})
+
+    replica.apply(event('/', {'cow_1': {'name': 'Daisy', 'age': 5}}, event_type='patch'))
+    assert cow_replica.get_cows(FARMER) is None
+
+    replica.apply(event('/cow_1', None))
+    assert cow_replica.get_cows(FARMER) == {}
+
+
+def test_cancelled_write_does_not_hold_reads(replica):
+    write_id = cow_replica.note_write(FARMER, {'cow_2': {'name': 'Bella'}})
+    cow_replica.cancel_write(FARMER, write_id)
+
+    assert cow_replica.get_cows(FARMER) == {'cow_1': {'name': 'Daisy'}}
@@ -0,0 +1,65 @@
+import pytest
+
+import app.cows.routes as cow_routes
+from app.datastore import db
+
+FARMER = 'farmer_1'
+COW_IDS = ['9', '10', '11', '12', 'a1', 'b2']
+
+
+def cow(name):
+    return {'name': name, 'breed': 'Jersey', 'age': 4, 'health_status': 'Healthy', 'milk_production': 20.5}
+
+
+def farm(cow_ids):
+    return {'users': {FARMER: {
+        'details': {'name': 'Farmer', 'email': 'farmer@example.com', 'role': 'farmer'},
+        'cows': {cow_id: cow(f'Cow {cow_id}') for cow_id in cow_ids},
+    }}}
+
+
+def all_pages(client, headers, limit):
+    pages, cursor = [], None
+    while True:
+        url = f'/cows/getall?limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        body = response.get_json()
+        pages.append(set(body['data']))
+        cursor = body['next_cursor']
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize('replica', [False, True], ids=['query', 'replica'])
+def test_getall_pages_numeric_ids_in_database_key_order(client, seed, headers, monkeypatch, replica):
+    data = farm(COW_IDS)
+    seed(data)
+    if replica:
+        monkeypatch.setattr(cow_routes, 'get_replicated_cows', lambda user_id: data['users'][FARMER]['cows'])
+
+    pages = all_pages(client, headers(FARMER), limit=2)
+
+    # Integer keys sort numerically before string keys, as order_by_key() returns them.
+    assert pages == [{'9', '10'}, {'11', '12'}, {'a1', 'b2'}]
+
+
+def test_getall_without_limit_returns_every_cow(client, seed, headers):
+    seed(farm(COW_IDS))
+
+    body = client.get('/cows/getall', headers=headers(FARMER)).get_json()
+
+    assert set(body['data']) == set(COW_IDS)
+    assert body['next_cursor'] is None
+
+
+def test_delete_removes_the_cow_once(client, seed, headers):
+    seed(farm(['cow_1', 'cow_2']))
+    auth = headers(FARMER)
+
+    assert client.delete('/cows/delete/cow_1', headers=auth).status_code == 200
+    assert client.delete('/cows/delete/cow_1', headers=auth).status_code == 404
+
+    assert db.reference(f'users/{FARMER}/cows/cow_1').get() is None
+    assert set(db.reference(f'users/{FARMER}/cows').get()) == {'cow_2'}
+    assert client.get('/home/', headers=auth).get_json()['total_cows'] == 1
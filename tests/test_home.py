@@ -0,0 +1,53 @@
+from app.datastore import db
+from app.utils import decorators
+
+FARMER = 'farmer_1'
+
+
+def farm():
+    return {'users': {FARMER: {
+        'details': {'name': 'Farmer', 'email': 'farmer@example.com', 'role': 'farmer'},
+        'cows': {'cow_1': {'name': 'Daisy', 'breed': 'Jersey', 'age': 4, 'health_status': 'Healthy', 'milk_production': 20.5}},
+    }}}
+
+
+def revalidate(client, headers, url):
+    first = client.get(url, headers=headers)
+    assert first.status_code == 200
+    assert first.headers.get('ETag')
+    return client.get(url, headers={**headers, 'If-None-Match': first.headers['ETag']})
+
+
+def test_home_views_answer_304_until_cows_change(client, seed, headers):
+    seed(farm())
+    auth = headers(FARMER)
+
+    for url in ('/home/', '/home/healthsummary'):
+        assert revalidate(client, auth, url).status_code == 304
+
+    etag = client.get('/home/', headers=auth).headers['ETag']
+    client.patch('/cows/update/cow_1', headers=auth, json={'milk_production': 25})
+    changed = client.get('/home/', headers={**auth, 'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.get_json()['total_milk_production'] == 25
+
+
+def test_cow_profile_has_an_etag(client, seed, headers):
+    data = farm()
+    data['readings'] = {FARMER: {'cow_1': {'r1': {
+        'temperature': 38.5, 'accelerometer': {'x': 0.1, 'y': 0.2, 'z': 9.8},
+        'gyroscope': {'x': 0.1, 'y': 0.1, 'z': 0.1}, 'timestamp': 1,
+    }}}}
+    seed(data)
+
+    assert revalidate(client, headers(FARMER), '/cows/cow_1/profile').status_code == 304
+
+
+def test_home_is_404_for_an_unknown_user_and_writes_nothing(client, seed, headers, monkeypatch):
+    seed({})
+    # The role cache may still hold a role for a user deleted moments ago.
+    monkeypatch.setattr(decorators, 'get_role', lambda user_id: 'farmer')
+
+    assert client.get('/home/', headers=headers('ghost')).status_code == 404
+    assert client.get('/home/healthsummary', headers=headers('ghost')).get_json()['total_healthy_cows'] == 0
+    assert db.reference('users/ghost').get() is None
@@ -0,0 +1,34 @@
+import logging
+
+from app.utils.logger import NonBlockingQueueHandler, RateLimitFilter
+
+
+def record(level=logging.INFO, msg='reading %s', args=('cow_1',)):
+    return logging.LogRecord('app', level, __file__, 10, msg, args, None)
+
+
+def test_rate_limit_suppresses_repeats_and_reports_them():
+    rate_limit = RateLimitFilter(limit=2, window=60)
+
+    assert [rate_limit.filter(record()) for _ in range(4)] == [True, True, False, False]
+
+    rate_limit.window = 0
+    reported = record()
+    assert rate_limit.filter(reported)
+    assert reported.suppressed == 2
+
+
+def test_rate_limit_never_drops_errors():
+    rate_limit = RateLimitFilter(limit=1, window=60)
+
+    assert all(rate_limit.filter(record(logging.ERROR)) for _ in range(5))
+
+
+def test_queued_message_keeps_arguments_as_they_were_when_logged():
+    handler = NonBlockingQueueHandler(None)
+    cows = ['cow_1']
+
+    queued = handler.prepare(record(msg='cows: %s', args=(cows,)))
+    cows.append('cow_2')
+
+    assert queued.getMessage() == "cows: ['cow_1']"
@@ -0,0 +1,45 @@
+import pytest
+from flask import Flask, g
+
+import app.profiling as profiling
+
+
+@pytest.fixture
+def profiled_app(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, 'PROFILING_ENABLED', True)
+    monkeypatch.setattr(profiling, 'PROFILE_SAMPLE_RATE', 1.0)
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    app = Flask(__name__)
+    profiling.register_profiling(app)
+
+    @app.route('/ok')
+    def ok():
+        return 'ok'
+
+    @app.route('/fail')
+    def fail():
+        raise RuntimeError('boom')
+
+    @app.route('/nested')
+    def nested():
+        # A second request selected while this one is captured runs unprofiled.
+        with app.app_context(), app.test_request_context('/ok'):
+            app.preprocess_request()
+            assert '_profile' not in g
+        return 'nested'
+
+    return app
+
+
+def test_failed_request_is_saved_and_releases_the_capture(profiled_app):
+    client = profiled_app.test_client()
+
+    assert 'X-Profile-Id' in client.get('/fail').headers
+    assert 'X-Profile-Id' in client.get('/ok').headers
+
+
+def test_only_one_capture_runs_at_a_time(profiled_app):
+    response = profiled_app.test_client().get('/nested')
+
+    assert response.status_code == 200
+    assert len(profiling.list_profiles()) == 1
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import app.cronjob.retention as retention
+from app.datastore import db
+from app.utils.block_storage import BLOCK_SECONDS, append_reading, block_key, blocks_path, reading_key
+from app.utils.readings import readings_path
+from app.utils.rollups import RESOLUTIONS, get_rollups, update_rollups
+
+FARMER = 'farmer_1'
+
+
+@pytest.fixture(autouse=True)
+def fast_retention(monkeypatch):
+    monkeypatch.setattr(retention, 'RAW_RETENTION_DAYS', 7)
+    monkeypatch.setattr(retention, 'RETENTION_PAUSE_SECONDS', 0)
+    monkeypatch.setattr(retention, 'RETENTION_ARCHIVE', False)
+
+
+def reading(when, temperature=38.5):
+    return {
+        'timestamp': when.isoformat().replace('+00:00', 'Z'),
+        'temperature': temperature,
+        'accelerometer': {'x': 0.1, 'y': 0.2, 'z': 9.8},
+        'gyroscope': {'x': 0.1, 'y': 0.1, 'z': 0.1},
+    }
+
+
+def farm(cow_ids, readings=None):
+    return {
+        'users': {FARMER: {'cows': {cow_id: {'name': cow_id} for cow_id in cow_ids}}},
+        'readings': {FARMER: readings or {}},
+    }
+
+
+def nested(samples):
+    return {reading_key(sample['timestamp']): sample for sample in samples}
+
+
+def rolled_up_count(cow_id, resolution, start, end):
+    buckets = get_rollups(FARMER, cow_id, resolution, start, end)
+    return sum(bucket['temperature']['count'] for bucket in buckets.values())
+
+
+def expired_start():
+    # Whole hours well before the cutoff, so every bucket holds only expired samples.
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return now - timedelta(days=10)
+
+
+def test_stale_and_missing_rollups_are_rebuilt_before_deleting(seed):
+    start = expired_start()
+    samples = [reading(start + timedelta(seconds=30 * i), 38 + i / 100) for i in range(120)]
+    recent = reading(datetime.now(timezone.utc) - timedelta(days=1))
+    seed(farm(['cow_1'], {'cow_1': nested(samples + [recent])}))
+    # Every other sample of the first half was rolled up: those minute buckets undercount,
+    # and the second half has no rollups at all.
+    for sample in samples[:60:2]:
+        update_rollups(FARMER, 'cow_1', sample)
+
+    retention.compact_raw_readings()
+
+    assert list(db.reference(readings_path(FARMER, 'cow_1')).get()) == [reading_key(recent['timestamp'])]
+    end = start + timedelta(hours=1)
+    for resolution in RESOLUTIONS:
+        assert rolled_up_count('cow_1', resolution, start, end) == len(samples)
+    minutes = get_rollups(FARMER, 'cow_1', 'minute', start, end)
+    assert len(minutes) == 60
+    assert all(bucket['temperature']['count'] == 2 for bucket in minutes.values())
+
+
+def test_run_pauses_after_max_batches_and_resumes_from_the_checkpoint(seed, monkeypatch):
+    monkeypatch.setattr(retention, 'RETENTION_BATCH_SIZE', 5)
+    monkeypatch.setattr(retention, 'RETENTION_MAX_BATCHES', 2)
+    start = expired_start()
+    old = lambda offset: nested([reading(start + timedelta(minutes=offset + i)) for i in range(8)])
+    seed(farm(['cow_0', 'cow_1', 'cow_2'], {'cow_1': old(0), 'cow_2': old(30)}))
+
+    visited = []
+    compact = retention._compact_nested_batch
+    monkeypatch.setattr(retention, '_compact_nested_batch', lambda *args: visited.append(args[1]) or compact(*args))
+
+    assert retention.compact_raw_readings() == {'batches': 2, 'deleted': 8}
+    assert db.reference(retention.CHECKPOINT_PATH).get()['cow_id'] == 'cow_1'
+    assert db.reference(readings_path(FARMER, 'cow_1')).get() is None
+
+    visited.clear()
+    assert retention.compact_raw_readings() == {'batches': 2, 'deleted': 16}
+    # Resumes at the checkpointed cow instead of rescanning cow_0.
+    assert visited[0] == 'cow_1'
+    assert db.reference(readings_path(FARMER, 'cow_2')).get() is None
+
+    retention.compact_raw_readings()
+    assert db.reference(retention.CHECKPOINT_PATH).get() is None
+
+
+def test_block_path_removes_only_blocks_that_end_before_the_cutoff(seed):
+    cutoff = datetime.now(timezone.utc) - timedelta(days=7)
+    cutoff_block = datetime.fromtimestamp(int(block_key(cutoff.timestamp())), tz=timezone.utc)
+    old = cutoff_block - timedelta(seconds=3 * BLOCK_SECONDS)
+    seed(farm(['cow_1']))
+    for when in (old, old + timedelta(minutes=1), cutoff_block):
+        append_reading(FARMER, 'cow_1', reading(when))
+
+    retention.compact_raw_readings()
+
+    # The block holding the cutoff keeps its expired sample until the whole block has expired.
+    assert list(db.reference(blocks_path(FARMER, 'cow_1')).get()) == [block_key(cutoff_block.timestamp())]
+    assert rolled_up_count('cow_1', 'hour', old, old) == 2
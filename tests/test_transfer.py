@@ -0,0 +1,29 @@
+import io
+
+import pytest
+
+from app.cows.transfer import iter_cows, parse_csv, parse_ndjson
+
+
+def test_iter_cows_pages_numeric_ids_without_skipping(seed):
+    cow_ids = ['9', '10', '11', '12', 'a1']
+    seed({'users': {'farmer_1': {'cows': {cow_id: {'name': cow_id} for cow_id in cow_ids}}}})
+
+    exported = [cow_id for cow_id, _ in iter_cows('farmer_1', page_size=2)]
+
+    assert exported == cow_ids
+
+
+@pytest.mark.parametrize('value', ['nan', 'inf', '-Infinity'])
+def test_parse_csv_rejects_non_finite_numbers(value):
+    rows = list(parse_csv(io.BytesIO(f'cow_id,age\ncow_1,{value}\n'.encode())))
+
+    assert len(rows) == 1
+    assert isinstance(rows[0][1], ValueError)
+
+
+def test_parse_ndjson_rejects_non_finite_numbers():
+    rows = list(parse_ndjson(io.BytesIO(b'{"cow_id": "cow_1", "age": NaN}\n{"cow_id": "cow_2", "age": 3}\n')))
+
+    assert isinstance(rows[0][1], ValueError)
+    assert rows[1][1]['age'] == 3
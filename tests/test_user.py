@@ -0,0 +1,29 @@
+from app.datastore import db
+
+FARMER = 'farmer_1'
+DETAILS = {'name': 'Farmer', 'email': 'farmer@example.com', 'role': 'farmer', 'password': 'hash'}
+
+
+def test_update_changes_name_and_email_only(client, seed, headers):
+    seed({'users': {FARMER: {'details': dict(DETAILS)}}})
+
+    response = client.put('/user/update', headers=headers(FARMER), json={
+        'name': 'New Name', 'email': 'new@example.com', 'password': 'overwritten', 'user_id': 'someone_else',
+    })
+
+    assert response.status_code == 200
+    assert 'token' not in response.get_json()
+    assert db.reference(f'users/{FARMER}/details').get() == {**DETAILS, 'name': 'New Name', 'email': 'new@example.com'}
+
+
+def test_update_rejects_role_changes(client, seed, headers):
+    seed({'users': {FARMER: {'details': dict(DETAILS)}}})
+
+    response = client.put('/user/update', headers=headers(FARMER), json={
+        'name': 'Farmer', 'email': 'farmer@example.com', 'role': 'admin',
+    })
+
+    assert response.status_code == 403
+    assert 'token' not in response.get_json()
+    assert db.reference(f'users/{FARMER}/details/role').get() == 'farmer'
+    assert db.reference('roles/admin').get() is None